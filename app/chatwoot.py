@@ -1,24 +1,44 @@
 from typing import Any, Dict, List, Optional
 
-import httpx
-
-from app.http_client import request_with_retries
+from app.http_client import (
+    ConnectionStats,
+    HttpPoolConfig,
+    RetryPolicy,
+    RetryPolicyConfig,
+    create_async_client,
+    request_with_retries,
+    warm_up,
+)
+from app.singleflight import SingleFlight
 
 
 class ChatwootClient:
     def __init__(
-        self, base_url: str, account_id: str, inbox_id: str, api_token: str, timeout: float, retries: int
+        self,
+        base_url: str,
+        account_id: str,
+        inbox_id: str,
+        api_token: str,
+        http: HttpPoolConfig,
+        retries: int,
+        retry_config: Optional[RetryPolicyConfig] = None,
     ) -> None:
         self.base_url = base_url.rstrip("/")
         self.account_id = str(account_id)
         self.inbox_id = str(inbox_id)
         self.api_token = api_token
         self.retries = retries
-        self._client = httpx.AsyncClient(timeout=timeout)
+        self.retry_policy = RetryPolicy("chatwoot", retry_config)
+        self.connection_stats = ConnectionStats("chatwoot")
+        self._client = create_async_client(http, self.connection_stats)
+        self._flights = SingleFlight()
 
     async def close(self) -> None:
         await self._client.aclose()
 
+    async def warm_up(self, connections: int) -> None:
+        await warm_up(self._client, self.base_url, connections, "chatwoot")
+
     def _headers(self) -> Dict[str, str]:
         return {"api_access_token": self.api_token}
 
@@ -28,6 +48,7 @@ class ChatwootClient:
         path: str,
         json: Optional[Dict[str, Any]] = None,
         params: Optional[Dict[str, str]] = None,
+        idempotent: Optional[bool] = None,
     ) -> Any:
         url = f"{self.base_url}{path}"
         response = await request_with_retries(
@@ -35,6 +56,8 @@ class ChatwootClient:
             method,
             url,
             self.retries,
+            policy=self.retry_policy,
+            idempotent=idempotent,
             json=json,
             params=params,
             headers=self._headers(),
@@ -71,6 +94,7 @@ class ChatwootClient:
             "POST",
             f"/api/v1/accounts/{self.account_id}/contacts/filter",
             json=payload,
+            idempotent=True,
         )
         if not data:
             return None
@@ -157,6 +181,11 @@ class ChatwootClient:
         return None
 
     async def get_or_create_contact(self, name: str, email: str, chat_id: str) -> Dict[str, Any]:
+        return await self._flights.do(
+            f"contact:{email}", lambda: self._get_or_create_contact(name, email, chat_id)
+        )
+
+    async def _get_or_create_contact(self, name: str, email: str, chat_id: str) -> Dict[str, Any]:
         contact = await self.filter_contact_by_email(email)
         if contact:
             return contact
@@ -164,6 +193,14 @@ class ChatwootClient:
 
     async def get_or_create_conversation(self, contact: Dict[str, Any]) -> Dict[str, Any]:
         contact_id = str(contact.get("id"))
+        return await self._flights.do(
+            f"conversation:{contact_id}",
+            lambda: self._get_or_create_conversation(contact_id, contact),
+        )
+
+    async def _get_or_create_conversation(
+        self, contact_id: str, contact: Dict[str, Any]
+    ) -> Dict[str, Any]:
         conversations = await self.get_contact_conversations(contact_id)
         conversation = self.pick_conversation_by_inbox(conversations)
         if conversation:
@@ -172,3 +209,6 @@ class ChatwootClient:
         if not source_id:
             raise ValueError("Missing source_id for contact")
         return await self.create_conversation(contact_id=contact_id, source_id=source_id)
+
+    def stats(self) -> Dict[str, int]:
+        return self._flights.stats()
@@ -0,0 +1,127 @@
+import importlib.util
+import json
+from typing import Any, Dict, Optional
+
+
+MSGSPEC_AVAILABLE = importlib.util.find_spec("msgspec") is not None
+
+
+class ChatwootWebhook:
+    __slots__ = (
+        "event",
+        "message_type",
+        "content",
+        "chat_id",
+        "message_id",
+        "conversation_id",
+        "body",
+        "_payload",
+    )
+
+    def __init__(
+        self,
+        event: Any,
+        message_type: Any,
+        content: str,
+        chat_id: Any,
+        message_id: Any,
+        conversation_id: Any,
+        body: bytes,
+        payload: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.event = event
+        self.message_type = message_type
+        self.content = content
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.conversation_id = conversation_id
+        self.body = body
+        self._payload = payload
+
+    @property
+    def payload(self) -> Dict[str, Any]:
+        if self._payload is None:
+            self._payload = json.loads(self.body)
+        return self._payload
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "event": self.event,
+            "message_type": self.message_type,
+            "message_id": self.message_id,
+            "conversation_id": self.conversation_id,
+            "chat_id": self.chat_id,
+        }
+
+
+def _child(value: Any, key: str) -> Dict[str, Any]:
+    child = value.get(key) if isinstance(value, dict) else None
+    return child if isinstance(child, dict) else {}
+
+
+def _decode_stdlib(body: bytes) -> ChatwootWebhook:
+    payload = json.loads(body)
+    if not isinstance(payload, dict):
+        raise ValueError("expected a JSON object")
+    conversation = _child(payload, "conversation")
+    sender = _child(_child(conversation, "meta"), "sender")
+    return ChatwootWebhook(
+        event=payload.get("event"),
+        message_type=payload.get("message_type"),
+        content=payload.get("content") or "",
+        chat_id=_child(sender, "custom_attributes").get("chat_id"),
+        message_id=payload.get("id"),
+        conversation_id=conversation.get("id"),
+        body=body,
+        payload=payload,
+    )
+
+
+if MSGSPEC_AVAILABLE:
+    import msgspec
+
+    class _CustomAttributes(msgspec.Struct):
+        chat_id: Any = None
+
+    class _Sender(msgspec.Struct):
+        custom_attributes: Optional[_CustomAttributes] = None
+
+    class _Meta(msgspec.Struct):
+        sender: Optional[_Sender] = None
+
+    class _Conversation(msgspec.Struct):
+        id: Any = None
+        meta: Optional[_Meta] = None
+
+    class _Webhook(msgspec.Struct):
+        id: Any = None
+        event: Any = None
+        message_type: Any = None
+        content: Any = None
+        conversation: Optional[_Conversation] = None
+
+    _decoder = msgspec.json.Decoder(_Webhook)
+
+    def decode_chatwoot_webhook(body: bytes) -> ChatwootWebhook:
+        try:
+            decoded = _decoder.decode(body)
+        except msgspec.ValidationError:
+            return _decode_stdlib(body)
+        except msgspec.DecodeError as exc:
+            raise ValueError(str(exc)) from exc
+        conversation = decoded.conversation
+        meta = conversation.meta if conversation else None
+        sender = meta.sender if meta else None
+        attributes = sender.custom_attributes if sender else None
+        return ChatwootWebhook(
+            event=decoded.event,
+            message_type=decoded.message_type,
+            content=decoded.content or "",
+            chat_id=attributes.chat_id if attributes else None,
+            message_id=decoded.id,
+            conversation_id=conversation.id if conversation else None,
+            body=body,
+        )
+
+else:
+    decode_chatwoot_webhook = _decode_stdlib
@@ -2,10 +2,35 @@ import os
 
 from dotenv import load_dotenv
 
+from app.http_client import HttpPoolConfig, RetryPolicyConfig
+
 
 load_dotenv()
 
 
+def _env_bool(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _http_pool_config(prefix: str, default_timeout: float) -> HttpPoolConfig:
+    def timeout(name: str) -> float:
+        return float(os.getenv(f"{prefix}_{name}_TIMEOUT", str(default_timeout)))
+
+    return HttpPoolConfig(
+        connect_timeout=timeout("CONNECT"),
+        read_timeout=timeout("READ"),
+        write_timeout=timeout("WRITE"),
+        pool_timeout=timeout("POOL"),
+        max_connections=int(os.getenv(f"{prefix}_HTTP_MAX_CONNECTIONS", "20")),
+        max_keepalive_connections=int(os.getenv(f"{prefix}_HTTP_MAX_KEEPALIVE", "10")),
+        keepalive_expiry=float(os.getenv(f"{prefix}_HTTP_KEEPALIVE_EXPIRY", "60")),
+        http2=_env_bool(f"{prefix}_HTTP2"),
+    )
+
+
 class Settings:
     def __init__(self) -> None:
         self.chatwoot_base_url = os.getenv("CHATWOOT_BASE_URL", "").rstrip("/")
@@ -22,9 +47,59 @@ class Settings:
         self.supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
 
         self.webhook_secret = os.getenv("WEBHOOK_SECRET", "")
+        self.max_webhook_body_bytes = int(os.getenv("MAX_WEBHOOK_BODY_BYTES", "1048576"))
+        self.unipile_parse_thread_bytes = int(os.getenv("UNIPILE_PARSE_THREAD_BYTES", "65536"))
+        self.unipile_parse_budget_ms = float(os.getenv("UNIPILE_PARSE_BUDGET_MS", "50"))
         self.dedupe_ttl_seconds = int(os.getenv("DEDUPE_TTL_SECONDS", "120"))
+        self.dedupe_cache_size = int(os.getenv("DEDUPE_CACHE_SIZE", "10000"))
+        self.dedupe_echo_recheck_ms = float(os.getenv("DEDUPE_ECHO_RECHECK_MS", "0"))
+        self.dedupe_backend = os.getenv("DEDUPE_BACKEND", "supabase").strip().lower()
+        self.dedupe_sqlite_path = os.getenv("DEDUPE_SQLITE_PATH", "")
+        self.dedupe_redis_url = os.getenv("DEDUPE_REDIS_URL", "")
+        self.idempotency_ttl_seconds = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+        self.idempotency_cache_size = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+        self.resolution_cache_size = int(os.getenv("RESOLUTION_CACHE_SIZE", "10000"))
+        self.resolution_cache_ttl_seconds = int(os.getenv("RESOLUTION_CACHE_TTL_SECONDS", "3600"))
+        self.mapping_backend = os.getenv("MAPPING_BACKEND", "supabase").strip().lower()
+        self.mapping_sqlite_path = os.getenv("MAPPING_SQLITE_PATH", "")
         self.request_timeout_seconds = float(os.getenv("REQUEST_TIMEOUT_SECONDS", "10"))
         self.request_retries = int(os.getenv("REQUEST_RETRIES", "2"))
+        self.chatwoot_http = _http_pool_config("CHATWOOT", self.request_timeout_seconds)
+        self.unipile_http = _http_pool_config("UNIPILE", self.request_timeout_seconds)
+        self.supabase_http = _http_pool_config("SUPABASE", self.request_timeout_seconds)
+        self.http_warm_connections = int(os.getenv("HTTP_WARM_CONNECTIONS", "1"))
+        self.retry_policy = RetryPolicyConfig(
+            base_delay=float(os.getenv("RETRY_BASE_DELAY_MS", "200")) / 1000,
+            max_delay=float(os.getenv("RETRY_MAX_DELAY_SECONDS", "10")),
+            budget_ratio=float(os.getenv("RETRY_BUDGET_RATIO", "0.2")),
+            budget_min_per_second=float(os.getenv("RETRY_BUDGET_MIN_PER_SECOND", "1")),
+            breaker_failure_rate=float(os.getenv("BREAKER_FAILURE_RATE", "0.5")),
+            breaker_min_calls=int(os.getenv("BREAKER_MIN_CALLS", "20")),
+            breaker_window_seconds=float(os.getenv("BREAKER_WINDOW_SECONDS", "30")),
+            breaker_cooldown_seconds=float(os.getenv("BREAKER_COOLDOWN_SECONDS", "15")),
+        )
+
+        self.unipile_async_processing = _env_bool("UNIPILE_ASYNC_PROCESSING")
+        self.unipile_speculative_resolution = _env_bool("UNIPILE_SPECULATIVE_RESOLUTION")
+        self.dispatch_lanes = int(os.getenv("DISPATCH_LANES", "8"))
+        self.lane_queue_size = int(os.getenv("LANE_QUEUE_SIZE", "200"))
+
+        self.inbox_path = os.getenv("INBOX_PATH", "")
+        self.inbox_commit_window_ms = float(os.getenv("INBOX_COMMIT_WINDOW_MS", "2"))
+        self.inbox_retention_seconds = int(os.getenv("INBOX_RETENTION_SECONDS", "3600"))
+
+        self.event_log_batch_size = int(os.getenv("EVENT_LOG_BATCH_SIZE", "50"))
+        self.event_log_flush_ms = float(os.getenv("EVENT_LOG_FLUSH_MS", "500"))
+        self.event_log_buffer_size = int(os.getenv("EVENT_LOG_BUFFER_SIZE", "5000"))
+        self.event_log_overflow = os.getenv("EVENT_LOG_OVERFLOW", "drop_oldest")
+        self.event_log_drain_timeout_seconds = float(os.getenv("EVENT_LOG_DRAIN_TIMEOUT_SECONDS", "10"))
+        self.spool_path = os.getenv("SPOOL_PATH", "")
+        self.spool_segment_bytes = int(os.getenv("SPOOL_SEGMENT_BYTES", "1048576"))
+        self.spool_max_bytes = int(os.getenv("SPOOL_MAX_BYTES", "104857600"))
+        self.spool_drain_rate = float(os.getenv("SPOOL_DRAIN_RATE", "200"))
+        self.spool_drain_interval_seconds = float(os.getenv("SPOOL_DRAIN_INTERVAL_SECONDS", "5"))
+        self.ignored_event_policy = os.getenv("IGNORED_EVENT_POLICY", "summary").strip().lower()
+        self.ignored_event_sample_rate = float(os.getenv("IGNORED_EVENT_SAMPLE_RATE", "0.01"))
 
         self.log_level = os.getenv("LOG_LEVEL", "INFO")
 
@@ -1,5 +1,12 @@
+import asyncio
+import datetime as dt
 import hashlib
 import re
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from app.cache import TTLCache
+from app.dedupe_store import DedupeEntry, DedupeStore
+from app.spool import DiskSpool
 
 
 OLD_MARKER = "\u200BLI_ECHO\u200B"
@@ -34,3 +41,134 @@ def normalize_text(text: str) -> str:
 def build_dedupe_key(chat_id: str, normalized_text: str) -> str:
     digest = hashlib.sha256(normalized_text.encode("utf-8")).hexdigest()
     return f"{chat_id}|{digest}"
+
+
+class DedupeGuard:
+    def __init__(
+        self,
+        store: Optional[DedupeStore],
+        ttl_seconds: int,
+        max_size: int,
+        spool: Optional[DiskSpool] = None,
+        echo_recheck_ms: float = 0.0,
+    ) -> None:
+        self.store = store
+        self.ttl_seconds = ttl_seconds
+        self.echo_recheck = max(0.0, echo_recheck_ms) / 1000
+        self.spool = spool
+        self._local: TTLCache[bool] = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self._sent: TTLCache[str] = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self._writes: Set[asyncio.Task] = set()
+        self._local_hits = 0
+        self._local_misses = 0
+        self._remote_hits = 0
+        self._remote_misses = 0
+        self._remote_writes = 0
+        self._remote_write_errors = 0
+        self._message_id_hits = 0
+        self._spooled = 0
+        self._restored = 0
+        self._echo_rechecks = 0
+        self._echo_recheck_hits = 0
+
+    def remember(
+        self,
+        dedupe_key: str,
+        chat_id: str,
+        normalized_text: str,
+        on_error: Optional[Callable[[Exception], Awaitable[None]]] = None,
+    ) -> None:
+        self._local.set(dedupe_key, True)
+        if not self.store:
+            return
+        entry = DedupeEntry(
+            dedupe_key=dedupe_key,
+            chat_id=chat_id,
+            normalized_text=normalized_text,
+            expires_at=dt.datetime.now(tz=dt.timezone.utc) + dt.timedelta(seconds=self.ttl_seconds),
+        )
+        task = asyncio.create_task(self._write_through(entry, on_error))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def _write_through(
+        self,
+        entry: DedupeEntry,
+        on_error: Optional[Callable[[Exception], Awaitable[None]]],
+    ) -> None:
+        try:
+            await self.store.set_many([entry])
+            self._remote_writes += 1
+        except Exception as exc:  # noqa: BLE001
+            self._remote_write_errors += 1
+            if self.spool:
+                self._spooled += 1
+                self.spool.put("dedupe", [entry.as_row()])
+            if on_error:
+                await on_error(exc)
+
+    async def restore(self, rows: List[Dict[str, Any]]) -> None:
+        now = dt.datetime.now(tz=dt.timezone.utc)
+        entries = [DedupeEntry.from_row(row) for row in rows]
+        live = [entry for entry in entries if entry.expires_at > now]
+        if live:
+            await self.store.set_many(live)
+        self._restored += len(live)
+
+    def remember_sent(self, chat_id: str, message_ids: Iterable[Optional[str]]) -> None:
+        for message_id in message_ids:
+            if message_id:
+                self._sent.set(str(message_id), chat_id)
+
+    def is_sent(self, *message_ids: Optional[str]) -> bool:
+        for message_id in message_ids:
+            if message_id and self._sent.get(str(message_id)) is not None:
+                self._message_id_hits += 1
+                return True
+        return False
+
+    async def seen(self, dedupe_key: str) -> bool:
+        if self._local.get(dedupe_key):
+            self._local_hits += 1
+            return True
+        self._local_misses += 1
+        if not self.store:
+            return False
+        deduped = await self.store.contains(dedupe_key)
+        if not deduped and self.echo_recheck:
+            self._echo_rechecks += 1
+            await asyncio.sleep(self.echo_recheck)
+            deduped = bool(self._local.get(dedupe_key)) or await self.store.contains(dedupe_key)
+            if deduped:
+                self._echo_recheck_hits += 1
+        if deduped:
+            self._remote_hits += 1
+            self._local.set(dedupe_key, True)
+        else:
+            self._remote_misses += 1
+        return deduped
+
+    async def close(self) -> None:
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+        if self.store:
+            await self.store.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.store.name if self.store else None,
+            "local_entries": len(self._local),
+            "sent_message_ids": len(self._sent),
+            "message_id_hits": self._message_id_hits,
+            "local_hits": self._local_hits,
+            "local_misses": self._local_misses,
+            "remote_hits": self._remote_hits,
+            "remote_misses": self._remote_misses,
+            "remote_writes": self._remote_writes,
+            "remote_write_errors": self._remote_write_errors,
+            "pending_writes": len(self._writes),
+            "spooled_writes": self._spooled,
+            "restored_writes": self._restored,
+            "echo_rechecks": self._echo_rechecks,
+            "echo_recheck_hits": self._echo_recheck_hits,
+        }
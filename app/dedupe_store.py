@@ -0,0 +1,380 @@
+import asyncio
+import datetime as dt
+import json
+import sqlite3
+import time
+import urllib.parse
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from app.supabase_client import SupabaseClient
+
+
+@dataclass
+class DedupeEntry:
+    dedupe_key: str
+    chat_id: str
+    normalized_text: str
+    expires_at: dt.datetime
+
+    def as_row(self) -> Dict[str, Any]:
+        return {
+            "dedupe_key": self.dedupe_key,
+            "chat_id": self.chat_id,
+            "normalized_text": self.normalized_text,
+            "expires_at": self.expires_at.isoformat(),
+        }
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "DedupeEntry":
+        expires_at = row["expires_at"]
+        if not isinstance(expires_at, dt.datetime):
+            expires_at = dt.datetime.fromisoformat(expires_at)
+        return cls(
+            dedupe_key=row["dedupe_key"],
+            chat_id=row.get("chat_id") or "",
+            normalized_text=row.get("normalized_text") or "",
+            expires_at=expires_at,
+        )
+
+
+class DedupeStore(ABC):
+    name = "base"
+
+    @abstractmethod
+    async def check_and_set(self, entry: DedupeEntry) -> bool:
+        ...
+
+    async def contains(self, dedupe_key: str) -> bool:
+        return bool(await self.contains_many([dedupe_key]))
+
+    @abstractmethod
+    async def contains_many(self, dedupe_keys: Sequence[str]) -> Set[str]:
+        ...
+
+    @abstractmethod
+    async def set_many(self, entries: Sequence[DedupeEntry]) -> None:
+        ...
+
+    async def check_and_set_many(self, entries: Sequence[DedupeEntry]) -> List[bool]:
+        return [await self.check_and_set(entry) for entry in entries]
+
+    async def close(self) -> None:
+        return None
+
+
+class MemoryDedupeStore(DedupeStore):
+    name = "memory"
+
+    def __init__(self, max_size: int = 100000) -> None:
+        self.max_size = max(1, max_size)
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+
+    def _live(self, dedupe_key: str, now: float) -> bool:
+        expires_at = self._entries.get(dedupe_key)
+        if expires_at is None:
+            return False
+        if expires_at <= now:
+            del self._entries[dedupe_key]
+            return False
+        return True
+
+    def _store(self, entry: DedupeEntry) -> None:
+        self._entries[entry.dedupe_key] = entry.expires_at.timestamp()
+        self._entries.move_to_end(entry.dedupe_key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def check_and_set(self, entry: DedupeEntry) -> bool:
+        if self._live(entry.dedupe_key, time.time()):
+            return True
+        self._store(entry)
+        return False
+
+    async def contains_many(self, dedupe_keys: Sequence[str]) -> Set[str]:
+        now = time.time()
+        return {key for key in dedupe_keys if self._live(key, now)}
+
+    async def set_many(self, entries: Sequence[DedupeEntry]) -> None:
+        for entry in entries:
+            self._store(entry)
+
+
+_SQLITE_SCHEMA = """
+create table if not exists dedupe_cache (
+  dedupe_key text primary key,
+  chat_id text not null,
+  normalized_text text not null,
+  expires_at real not null
+);
+create index if not exists dedupe_cache_expires_at_idx on dedupe_cache (expires_at);
+"""
+
+_SQLITE_UPSERT = (
+    "insert into dedupe_cache (dedupe_key, chat_id, normalized_text, expires_at) values (?, ?, ?, ?) "
+    "on conflict(dedupe_key) do update set chat_id = excluded.chat_id, "
+    "normalized_text = excluded.normalized_text, expires_at = excluded.expires_at"
+)
+
+
+class SqliteDedupeStore(DedupeStore):
+    name = "sqlite"
+
+    def __init__(self, path: str, purge_every: int = 1000) -> None:
+        self.path = path
+        self.purge_every = max(1, purge_every)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dedupe-store")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("pragma journal_mode=wal")
+            conn.execute("pragma synchronous=normal")
+            conn.execute("pragma busy_timeout=5000")
+            conn.executescript(_SQLITE_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    async def _call(self, fn: Any, *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def _params(self, entry: DedupeEntry) -> Tuple[Any, ...]:
+        return (entry.dedupe_key, entry.chat_id, entry.normalized_text, entry.expires_at.timestamp())
+
+    def _wrote(self, conn: sqlite3.Connection, count: int) -> None:
+        self._writes += count
+        if self._writes >= self.purge_every:
+            self._writes = 0
+            conn.execute("delete from dedupe_cache where expires_at <= ?", (time.time(),))
+
+    def _check_and_set_sync(self, entries: Sequence[DedupeEntry]) -> List[bool]:
+        conn = self._connection()
+        results = []
+        conn.execute("begin immediate")
+        try:
+            for entry in entries:
+                cursor = conn.execute(
+                    f"{_SQLITE_UPSERT} where dedupe_cache.expires_at <= ?",
+                    (*self._params(entry), time.time()),
+                )
+                results.append(cursor.rowcount == 0)
+            self._wrote(conn, len(entries))
+            conn.execute("commit")
+        except Exception:
+            conn.execute("rollback")
+            raise
+        return results
+
+    def _contains_many_sync(self, dedupe_keys: Sequence[str]) -> Set[str]:
+        conn = self._connection()
+        found: Set[str] = set()
+        now = time.time()
+        for start in range(0, len(dedupe_keys), 500):
+            chunk = list(dedupe_keys[start : start + 500])
+            rows = conn.execute(
+                "select dedupe_key from dedupe_cache where expires_at > ? "
+                f"and dedupe_key in ({', '.join('?' for _ in chunk)})",
+                (now, *chunk),
+            ).fetchall()
+            found.update(row[0] for row in rows)
+        return found
+
+    def _set_many_sync(self, entries: Sequence[DedupeEntry]) -> None:
+        conn = self._connection()
+        conn.execute("begin immediate")
+        try:
+            conn.executemany(_SQLITE_UPSERT, [self._params(entry) for entry in entries])
+            self._wrote(conn, len(entries))
+            conn.execute("commit")
+        except Exception:
+            conn.execute("rollback")
+            raise
+
+    def _close_sync(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def check_and_set(self, entry: DedupeEntry) -> bool:
+        return (await self._call(self._check_and_set_sync, [entry]))[0]
+
+    async def check_and_set_many(self, entries: Sequence[DedupeEntry]) -> List[bool]:
+        if not entries:
+            return []
+        return await self._call(self._check_and_set_sync, entries)
+
+    async def contains_many(self, dedupe_keys: Sequence[str]) -> Set[str]:
+        if not dedupe_keys:
+            return set()
+        return await self._call(self._contains_many_sync, dedupe_keys)
+
+    async def set_many(self, entries: Sequence[DedupeEntry]) -> None:
+        if entries:
+            await self._call(self._set_many_sync, entries)
+
+    async def close(self) -> None:
+        await self._call(self._close_sync)
+        self._executor.shutdown(wait=True)
+
+
+class SupabaseDedupeStore(DedupeStore):
+    name = "supabase"
+
+    def __init__(self, supabase: SupabaseClient) -> None:
+        self.supabase = supabase
+
+    async def check_and_set(self, entry: DedupeEntry) -> bool:
+        return await self.supabase.check_and_set_dedupe(
+            entry.dedupe_key,
+            chat_id=entry.chat_id,
+            normalized_text=entry.normalized_text,
+            expires_at=entry.expires_at,
+        )
+
+    async def contains(self, dedupe_key: str) -> bool:
+        return await self.supabase.is_deduped(dedupe_key, now=dt.datetime.now(tz=dt.timezone.utc))
+
+    async def contains_many(self, dedupe_keys: Sequence[str]) -> Set[str]:
+        now = dt.datetime.now(tz=dt.timezone.utc)
+        return set(await self.supabase.deduped_keys(list(dedupe_keys), now=now))
+
+    async def set_many(self, entries: Sequence[DedupeEntry]) -> None:
+        await self.supabase.upsert_dedupe_rows([entry.as_row() for entry in entries])
+
+
+class RespError(Exception):
+    pass
+
+
+def _encode_command(args: Iterable[Any]) -> bytes:
+    parts = [arg if isinstance(arg, bytes) else str(arg).encode("utf-8") for arg in args]
+    chunks = [b"*%d\r\n" % len(parts)]
+    for part in parts:
+        chunks.append(b"$%d\r\n%s\r\n" % (len(part), part))
+    return b"".join(chunks)
+
+
+async def _read_reply(reader: asyncio.StreamReader) -> Any:
+    line = await reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("connection closed by server")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b"+":
+        return payload.decode("utf-8")
+    if kind == b"-":
+        return RespError(payload.decode("utf-8"))
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        length = int(payload)
+        if length < 0:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if kind == b"*":
+        length = int(payload)
+        if length < 0:
+            return None
+        return [await _read_reply(reader) for _ in range(length)]
+    raise RespError(f"unexpected reply type {kind!r}")
+
+
+def _raise_errors(replies: List[Any]) -> None:
+    for reply in replies:
+        if isinstance(reply, RespError):
+            raise reply
+
+
+class RedisDedupeStore(DedupeStore):
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "dedupe:", timeout_seconds: float = 5.0) -> None:
+        parsed = urllib.parse.urlsplit(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = urllib.parse.unquote(parsed.password) if parsed.password else None
+        self.username = urllib.parse.unquote(parsed.username) if parsed.username else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.prefix = prefix
+        self.timeout = timeout_seconds
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), timeout=self.timeout
+        )
+        setup: List[Sequence[Any]] = []
+        if self.password and self.username:
+            setup.append(("AUTH", self.username, self.password))
+        elif self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            _raise_errors(await self._roundtrip(setup))
+
+    def _reset(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = None
+        self._writer = None
+
+    async def _roundtrip(self, commands: Sequence[Sequence[Any]]) -> List[Any]:
+        self._writer.write(b"".join(_encode_command(command) for command in commands))
+        await self._writer.drain()
+        replies = []
+        for _ in commands:
+            replies.append(await asyncio.wait_for(_read_reply(self._reader), timeout=self.timeout))
+        return replies
+
+    async def execute(self, commands: Sequence[Sequence[Any]]) -> List[Any]:
+        async with self._lock:
+            try:
+                if self._writer is None:
+                    await self._connect()
+                replies = await self._roundtrip(commands)
+            except BaseException:
+                # unread replies would answer the next pipeline on this connection
+                self._reset()
+                raise
+        _raise_errors(replies)
+        return replies
+
+    def _set_command(self, entry: DedupeEntry, only_new: bool) -> Tuple[Any, ...]:
+        ttl_ms = max(1, int((entry.expires_at.timestamp() - time.time()) * 1000))
+        value = json.dumps({"chat_id": entry.chat_id, "normalized_text": entry.normalized_text})
+        command: Tuple[Any, ...] = ("SET", self.prefix + entry.dedupe_key, value, "PX", ttl_ms)
+        return command + ("NX",) if only_new else command
+
+    async def check_and_set(self, entry: DedupeEntry) -> bool:
+        return (await self.check_and_set_many([entry]))[0]
+
+    async def check_and_set_many(self, entries: Sequence[DedupeEntry]) -> List[bool]:
+        if not entries:
+            return []
+        replies = await self.execute([self._set_command(entry, only_new=True) for entry in entries])
+        return [reply is None for reply in replies]
+
+    async def contains_many(self, dedupe_keys: Sequence[str]) -> Set[str]:
+        if not dedupe_keys:
+            return set()
+        replies = await self.execute([("EXISTS", self.prefix + key) for key in dedupe_keys])
+        return {key for key, reply in zip(dedupe_keys, replies) if reply}
+
+    async def set_many(self, entries: Sequence[DedupeEntry]) -> None:
+        if entries:
+            await self.execute([self._set_command(entry, only_new=False) for entry in entries])
+
+    async def close(self) -> None:
+        async with self._lock:
+            writer = self._writer
+            self._reset()
+        if writer is not None:
+            await asyncio.gather(writer.wait_closed(), return_exceptions=True)
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import time
+import zlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.logging_utils import log_structured
+
+
+Job = Callable[[], Awaitable[Any]]
+
+
+class DispatcherFull(Exception):
+    pass
+
+
+class ChatDispatcher:
+    def __init__(self, lanes: int, lane_size: int) -> None:
+        self.lanes = max(1, lanes)
+        self.lane_size = max(1, lane_size)
+        self._queues: List["asyncio.Queue[Tuple[float, Job]]"] = [
+            asyncio.Queue(maxsize=self.lane_size) for _ in range(self.lanes)
+        ]
+        self._tasks: List[asyncio.Task] = []
+        self._enqueued = 0
+        self._rejected = 0
+        self._processed = 0
+        self._failed = 0
+        self._dequeued = 0
+        self._queue_wait_seconds_total = 0.0
+        self._queue_wait_seconds_max = 0.0
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        for index, queue in enumerate(self._queues):
+            self._tasks.append(asyncio.create_task(self._run(index, queue)))
+
+    async def stop(self) -> None:
+        if not self._tasks:
+            return
+        for queue in self._queues:
+            await queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def lane_for(self, key: str) -> int:
+        return zlib.crc32(str(key).encode("utf-8")) % self.lanes
+
+    def submit(self, key: str, job: Job) -> bool:
+        try:
+            self._queues[self.lane_for(key)].put_nowait((time.monotonic(), job))
+        except asyncio.QueueFull:
+            self._rejected += 1
+            return False
+        self._enqueued += 1
+        return True
+
+    async def run(self, key: str, job: Job) -> Any:
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+        async def wrapped() -> None:
+            try:
+                result = await job()
+            except Exception as exc:  # noqa: BLE001
+                if not future.done():
+                    future.set_exception(exc)
+                return
+            except BaseException as exc:
+                if not future.done():
+                    if isinstance(exc, asyncio.CancelledError):
+                        future.cancel()
+                    else:
+                        future.set_exception(exc)
+                raise
+            if not future.done():
+                future.set_result(result)
+
+        if not self.submit(key, wrapped):
+            raise DispatcherFull(f"lane {self.lane_for(key)} is full")
+        return await future
+
+    async def _run(self, index: int, queue: "asyncio.Queue[Tuple[float, Job]]") -> None:
+        while True:
+            queued_at, job = await queue.get()
+            waited = time.monotonic() - queued_at
+            self._dequeued += 1
+            self._queue_wait_seconds_total += waited
+            self._queue_wait_seconds_max = max(self._queue_wait_seconds_max, waited)
+            try:
+                await job()
+                self._processed += 1
+            except asyncio.CancelledError:
+                task = asyncio.current_task()
+                if task is not None and task.cancelling():
+                    raise
+                self._failed += 1
+                log_structured(
+                    logging.ERROR,
+                    "dispatch_job_cancelled",
+                    lane=index,
+                    queued_seconds=round(time.monotonic() - queued_at, 6),
+                )
+            except Exception as exc:  # noqa: BLE001
+                self._failed += 1
+                log_structured(
+                    logging.ERROR,
+                    "dispatch_job_failed",
+                    lane=index,
+                    error=str(exc),
+                    queued_seconds=round(time.monotonic() - queued_at, 6),
+                )
+            finally:
+                queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        avg: Optional[float] = (
+            self._queue_wait_seconds_total / self._dequeued if self._dequeued else None
+        )
+        backlog = [queue.qsize() for queue in self._queues]
+        return {
+            "lanes": self.lanes,
+            "lane_capacity": self.lane_size,
+            "queue_depth": sum(backlog),
+            "lane_backlog": backlog,
+            "enqueued": self._enqueued,
+            "rejected": self._rejected,
+            "processed": self._processed,
+            "failed": self._failed,
+            "queue_wait_avg_seconds": avg,
+            "queue_wait_max_seconds": self._queue_wait_seconds_max,
+        }
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from app.logging_utils import log_structured
+from app.spool import DiskSpool
+from app.supabase_client import SupabaseClient
+
+
+OVERFLOW_POLICIES = {"drop_oldest", "drop_newest"}
+FLUSH_ORDER = ("error", "normal", "ignored")
+SHEDDABLE = ("ignored", "normal")
+
+
+def event_priority(event: Dict[str, Any]) -> str:
+    decision = str(event.get("decision") or "")
+    if decision == "error":
+        return "error"
+    if decision.startswith("ignored_"):
+        return "ignored"
+    return "normal"
+
+
+class EventLogSink:
+    def __init__(
+        self,
+        supabase: SupabaseClient,
+        batch_size: int,
+        flush_interval_ms: float,
+        max_buffer: int,
+        overflow: str = "drop_oldest",
+        drain_timeout_seconds: float = 10.0,
+        spool: Optional[DiskSpool] = None,
+    ) -> None:
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown event log overflow policy: {overflow}")
+        self.supabase = supabase
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.0, flush_interval_ms) / 1000
+        self.max_buffer = max(self.batch_size, max_buffer)
+        self.overflow = overflow
+        self.drain_timeout = max(0.0, drain_timeout_seconds)
+        self.spool = spool
+        self._buffers: Dict[str, Deque[Dict[str, Any]]] = {priority: deque() for priority in FLUSH_ORDER}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._emitted = 0
+        self._written = 0
+        self._batches = 0
+        self._failed = 0
+        self._flush_seconds_total = 0.0
+        self._shed: Dict[str, int] = {priority: 0 for priority in SHEDDABLE}
+        self._over_capacity = 0
+        self._in_flight = 0
+        self._lost_on_shutdown = 0
+        self._spooled = 0
+        self._closing = False
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._closing = True
+        self._wakeup.set()
+        task = self._task or asyncio.create_task(self._drain())
+        done, _ = await asyncio.wait({task}, timeout=self.drain_timeout)
+        if not done:
+            pending = self._buffered() + self._in_flight
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            remaining: List[Dict[str, Any]] = []
+            for priority in FLUSH_ORDER:
+                remaining.extend(self._buffers[priority])
+                self._buffers[priority].clear()
+            self._spool(remaining)
+            lost = 0 if self.spool else pending
+            self._lost_on_shutdown += lost
+            log_structured(logging.ERROR, "event_log_drain_incomplete", pending=pending, lost=lost)
+        self._task = None
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        priority = event_priority(event)
+        if self._buffered() >= self.max_buffer and not self._make_room(priority):
+            return
+        self._buffers[priority].append(event)
+        self._emitted += 1
+        if self._buffered() >= self.batch_size:
+            self._wakeup.set()
+
+    def _make_room(self, priority: str) -> bool:
+        if priority == "error":
+            self._over_capacity += 1
+            return True
+        for victim in SHEDDABLE:
+            if self._buffers[victim] and (victim != priority or self.overflow == "drop_oldest"):
+                self._buffers[victim].popleft()
+                self._shed[victim] += 1
+                return True
+            if victim == priority:
+                break
+        self._shed[priority] += 1
+        return False
+
+    def _buffered(self) -> int:
+        return sum(len(buffer) for buffer in self._buffers.values())
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._buffered():
+                await self._flush()
+                if self._closing or self._buffered() < self.batch_size:
+                    break
+        await self._drain()
+
+    async def _drain(self) -> None:
+        while self._buffered():
+            await self._flush()
+
+    async def _flush(self) -> None:
+        batch: List[Dict[str, Any]] = []
+        for priority in FLUSH_ORDER:
+            buffer = self._buffers[priority]
+            while buffer and len(batch) < self.batch_size:
+                batch.append(buffer.popleft())
+        if not batch:
+            return
+        started = time.perf_counter()
+        self._in_flight = len(batch)
+        try:
+            await self.supabase.log_events(batch)
+        except asyncio.CancelledError:
+            self._spool(batch)
+            raise
+        except Exception as exc:  # noqa: BLE001
+            self._failed += len(batch)
+            log_structured(logging.ERROR, "event_log_failed", error=str(exc), count=len(batch))
+            self._spool(batch)
+            return
+        finally:
+            self._in_flight = 0
+        self._batches += 1
+        self._written += len(batch)
+        self._flush_seconds_total += time.perf_counter() - started
+
+    def _spool(self, batch: List[Dict[str, Any]]) -> None:
+        if self.spool and batch:
+            self._spooled += len(batch)
+            self.spool.put("event_log", batch)
+
+    def stats(self) -> Dict[str, Any]:
+        avg_flush = self._flush_seconds_total / self._batches if self._batches else None
+        return {
+            "buffered": self._buffered(),
+            "buffered_by_priority": {priority: len(buffer) for priority, buffer in self._buffers.items()},
+            "buffer_capacity": self.max_buffer,
+            "emitted": self._emitted,
+            "written": self._written,
+            "batches": self._batches,
+            "dropped": sum(self._shed.values()),
+            "shed": dict(self._shed),
+            "over_capacity": self._over_capacity,
+            "failed": self._failed,
+            "spooled": self._spooled,
+            "lost_on_shutdown": self._lost_on_shutdown,
+            "avg_flush_seconds": avg_flush,
+        }
@@ -1,10 +1,241 @@
 import asyncio
-from typing import Iterable, Optional
+import email.utils
+import importlib.util
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterable, Optional, Tuple
 
 import httpx
 
+from app.logging_utils import log_structured
+from app.metrics import UPSTREAM_DURATION, UPSTREAM_REQUESTS
+
 
 DEFAULT_RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+NOT_PROCESSED_STATUSES = {429, 503}
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+@dataclass
+class HttpPoolConfig:
+    connect_timeout: float
+    read_timeout: float
+    write_timeout: float
+    pool_timeout: float
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 60.0
+    http2: bool = False
+
+
+class ConnectionStats:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.http2 = False
+        self._requests = 0
+        self._new_connections = 0
+        self._tls_handshakes = 0
+        self._reused_connections = 0
+
+    async def on_request(self, request: httpx.Request) -> None:
+        self._requests += 1
+        connected = False
+
+        async def trace(event: str, info: Dict[str, Any]) -> None:
+            nonlocal connected
+            if event == "connection.connect_tcp.complete":
+                connected = True
+                self._new_connections += 1
+            elif event == "connection.start_tls.complete":
+                self._tls_handshakes += 1
+            elif event.endswith(".send_request_headers.started") and not connected:
+                self._reused_connections += 1
+
+        request.extensions["trace"] = trace
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "http2": self.http2,
+            "requests": self._requests,
+            "new_connections": self._new_connections,
+            "reused_connections": self._reused_connections,
+            "tls_handshakes": self._tls_handshakes,
+        }
+
+
+def create_async_client(config: HttpPoolConfig, stats: ConnectionStats) -> httpx.AsyncClient:
+    http2 = config.http2
+    if http2 and not HTTP2_AVAILABLE:
+        log_structured(logging.WARNING, "http2_unavailable", upstream=stats.name)
+        http2 = False
+    stats.http2 = http2
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(
+            connect=config.connect_timeout,
+            read=config.read_timeout,
+            write=config.write_timeout,
+            pool=config.pool_timeout,
+        ),
+        limits=httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive_connections,
+            keepalive_expiry=config.keepalive_expiry,
+        ),
+        http2=http2,
+        event_hooks={"request": [stats.on_request]},
+    )
+
+
+async def warm_up(client: httpx.AsyncClient, url: str, connections: int, name: str) -> None:
+    async def touch() -> None:
+        await client.head(url)
+
+    results = await asyncio.gather(*(touch() for _ in range(max(0, connections))), return_exceptions=True)
+    failures = [str(result) for result in results if isinstance(result, Exception)]
+    if failures:
+        log_structured(logging.WARNING, "http_warm_up_failed", upstream=name, error=failures[0])
+
+
+@dataclass
+class RetryPolicyConfig:
+    base_delay: float = 0.2
+    max_delay: float = 10.0
+    budget_ratio: float = 0.2
+    budget_min_per_second: float = 1.0
+    budget_max_tokens: float = 20.0
+    breaker_failure_rate: float = 0.5
+    breaker_min_calls: int = 20
+    breaker_window_seconds: float = 30.0
+    breaker_cooldown_seconds: float = 15.0
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class RetryPolicy:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, config: Optional[RetryPolicyConfig] = None) -> None:
+        self.name = name
+        self.config = config or RetryPolicyConfig()
+        self.state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._failures = 0
+        self._tokens = self.config.budget_max_tokens
+        self._tokens_at = time.monotonic()
+        self._transitions: Dict[str, int] = {}
+        self._retries = 0
+        self._budget_exhausted = 0
+        self._short_circuited = 0
+
+    def before_request(self) -> None:
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.config.breaker_cooldown_seconds:
+                self._short_circuited += 1
+                raise CircuitOpenError(f"circuit open for {self.name}")
+            self._transition(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                self._short_circuited += 1
+                raise CircuitOpenError(f"circuit half-open for {self.name}")
+            self._probe_in_flight = True
+
+    def record(self, failed: bool) -> None:
+        now = time.monotonic()
+        if self.state == self.HALF_OPEN:
+            self._probe_in_flight = False
+            if failed:
+                self._open(now)
+            else:
+                self._outcomes.clear()
+                self._failures = 0
+                self._transition(self.CLOSED)
+            return
+        self._outcomes.append((now, failed))
+        self._failures += int(failed)
+        horizon = now - self.config.breaker_window_seconds
+        while self._outcomes and self._outcomes[0][0] < horizon:
+            _, old_failed = self._outcomes.popleft()
+            self._failures -= int(old_failed)
+        calls = len(self._outcomes)
+        if (
+            self.state == self.CLOSED
+            and calls >= self.config.breaker_min_calls
+            and self._failures / calls >= self.config.breaker_failure_rate
+        ):
+            self._open(now)
+
+    def abandon(self) -> None:
+        self._probe_in_flight = False
+
+    def _open(self, now: float) -> None:
+        self._opened_at = now
+        self._outcomes.clear()
+        self._failures = 0
+        self._transition(self.OPEN)
+
+    def _transition(self, state: str) -> None:
+        key = f"{self.state}->{state}"
+        self._transitions[key] = self._transitions.get(key, 0) + 1
+        log_structured(logging.WARNING, "circuit_state_changed", upstream=self.name, transition=key)
+        self.state = state
+
+    def deposit(self) -> None:
+        self._refill()
+        self._tokens = min(self.config.budget_max_tokens, self._tokens + self.config.budget_ratio)
+
+    def try_spend(self) -> bool:
+        self._refill()
+        if self._tokens < 1:
+            self._budget_exhausted += 1
+            return False
+        self._tokens -= 1
+        self._retries += 1
+        return True
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        earned = (now - self._tokens_at) * self.config.budget_min_per_second
+        self._tokens = min(self.config.budget_max_tokens, self._tokens + earned)
+        self._tokens_at = now
+
+    def backoff(self, previous: float) -> float:
+        base = self.config.base_delay
+        return min(self.config.max_delay, random.uniform(base, max(base, previous * 3)))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "transitions": dict(self._transitions),
+            "retries": self._retries,
+            "retry_budget_tokens": round(self._tokens, 3),
+            "retry_budget_exhausted": self._budget_exhausted,
+            "short_circuited": self._short_circuited,
+        }
+
+
+def parse_retry_after(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, parsed.timestamp() - time.time())
 
 
 async def request_with_retries(
@@ -13,14 +244,38 @@ async def request_with_retries(
     url: str,
     retries: int,
     retry_statuses: Optional[Iterable[int]] = None,
+    policy: Optional[RetryPolicy] = None,
+    idempotent: Optional[bool] = None,
     **kwargs,
 ) -> httpx.Response:
     statuses = set(retry_statuses or DEFAULT_RETRY_STATUSES)
+    policy = policy or RetryPolicy(url)
+    if idempotent is None:
+        idempotent = method.upper() in IDEMPOTENT_METHODS
     last_exc: Optional[Exception] = None
+    delay = policy.config.base_delay
+    host = httpx.URL(url).host
+    policy.deposit()
 
     for attempt in range(retries + 1):
+        policy.before_request()
+        retry_after: Optional[float] = None
+        started = time.perf_counter()
         try:
             response = await client.request(method, url, **kwargs)
+        except httpx.RequestError as exc:
+            UPSTREAM_DURATION.observe(time.perf_counter() - started, host, method)
+            UPSTREAM_REQUESTS.inc(host, method, "error")
+            policy.record(failed=True)
+            last_exc = exc
+            retryable = idempotent or isinstance(exc, NOT_SENT_ERRORS)
+        except BaseException:
+            policy.abandon()
+            raise
+        else:
+            UPSTREAM_DURATION.observe(time.perf_counter() - started, host, method)
+            UPSTREAM_REQUESTS.inc(host, method, str(response.status_code))
+            policy.record(failed=response.status_code >= 500)
             if response.status_code not in statuses:
                 return response
             last_exc = httpx.HTTPStatusError(
@@ -28,11 +283,17 @@ async def request_with_retries(
                 request=response.request,
                 response=response,
             )
-        except httpx.RequestError as exc:
-            last_exc = exc
+            retryable = idempotent or response.status_code in NOT_PROCESSED_STATUSES
+            retry_after = parse_retry_after(response)
 
-        if attempt < retries:
-            await asyncio.sleep(0.5 * (2 ** attempt))
+        if attempt >= retries or not retryable or policy.state == policy.OPEN:
+            break
+        if retry_after is not None and retry_after > policy.config.max_delay:
+            break
+        if not policy.try_spend():
+            break
+        delay = policy.backoff(delay)
+        await asyncio.sleep(max(delay, retry_after or 0.0))
 
     if last_exc:
         raise last_exc
@@ -0,0 +1,117 @@
+import asyncio
+import datetime as dt
+import logging
+from typing import Dict, Optional, Set
+
+from app.cache import TTLCache
+from app.logging_utils import log_structured
+from app.supabase_client import SupabaseClient
+
+
+CLAIMED = "claimed"
+DELIVERED = "delivered"
+
+
+class IdempotencyGuard:
+    def __init__(self, supabase: Optional[SupabaseClient], ttl_seconds: int, max_size: int) -> None:
+        self.supabase = supabase
+        self.ttl_seconds = ttl_seconds
+        self._local: TTLCache[str] = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self._writes: Set[asyncio.Task] = set()
+        self._claimed = 0
+        self._reclaimed = 0
+        self._delivered = 0
+        self._suppressed_local = 0
+        self._suppressed_remote = 0
+        self._released = 0
+        self._remote_errors = 0
+
+    async def claim(self, key: str, source: str) -> bool:
+        if self._local.get(key):
+            self._suppressed_local += 1
+            return False
+        self._local.set(key, CLAIMED)
+        if self.supabase:
+            now = dt.datetime.now(tz=dt.timezone.utc)
+            expires_at = now + dt.timedelta(seconds=self.ttl_seconds)
+            try:
+                claimed = await self.supabase.claim_webhook(key, source, expires_at=expires_at, now=now)
+            except Exception as exc:  # noqa: BLE001
+                self._remote_errors += 1
+                log_structured(logging.WARNING, "idempotency_claim_failed", key=key, error=str(exc))
+                claimed = True
+            if not claimed:
+                self._suppressed_remote += 1
+                return False
+        self._claimed += 1
+        return True
+
+    async def reclaim(self, key: str, source: str) -> bool:
+        if self._local.get(key) == DELIVERED:
+            self._suppressed_local += 1
+            return False
+        if self.supabase:
+            now = dt.datetime.now(tz=dt.timezone.utc)
+            try:
+                row = await self.supabase.get_webhook_claim(key, now=now)
+            except Exception as exc:  # noqa: BLE001
+                self._remote_errors += 1
+                log_structured(logging.WARNING, "idempotency_lookup_failed", key=key, error=str(exc))
+                row = None
+            if row is not None:
+                if row.get("delivered_at"):
+                    self._local.set(key, DELIVERED)
+                    self._suppressed_remote += 1
+                    return False
+                # the crashed attempt still holds the claim; keep it and finish its work
+                self._local.set(key, CLAIMED)
+                self._reclaimed += 1
+                return True
+        self._local.pop(key)
+        return await self.claim(key, source)
+
+    async def delivered(self, key: str) -> None:
+        self._local.set(key, DELIVERED)
+        self._delivered += 1
+        if not self.supabase:
+            return
+        try:
+            await self.supabase.mark_webhook_delivered(key, dt.datetime.now(tz=dt.timezone.utc))
+        except Exception as exc:  # noqa: BLE001
+            self._remote_errors += 1
+            log_structured(logging.WARNING, "idempotency_deliver_failed", key=key, error=str(exc))
+
+    def deliver_later(self, key: str) -> None:
+        self._local.set(key, DELIVERED)
+        task = asyncio.create_task(self.delivered(key))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def close(self) -> None:
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+
+    async def release(self, key: str) -> None:
+        self._local.pop(key)
+        self._released += 1
+        if not self.supabase:
+            return
+        try:
+            await self.supabase.release_webhook(key)
+        except Exception as exc:  # noqa: BLE001
+            self._remote_errors += 1
+            log_structured(logging.WARNING, "idempotency_release_failed", key=key, error=str(exc))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "local_entries": len(self._local),
+            "claimed": self._claimed,
+            "reclaimed": self._reclaimed,
+            "delivered": self._delivered,
+            "suppressed": self._suppressed_local + self._suppressed_remote,
+            "suppressed_local": self._suppressed_local,
+            "suppressed_remote": self._suppressed_remote,
+            "released": self._released,
+            "remote_errors": self._remote_errors,
+            "pending_writes": len(self._writes),
+        }
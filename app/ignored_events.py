@@ -0,0 +1,39 @@
+import random
+from typing import Any, Dict, Optional
+
+
+IGNORED_EVENT_POLICIES = {"full", "summary", "sample", "count"}
+
+
+class IgnoredEventPolicy:
+    def __init__(self, policy: str = "summary", sample_rate: float = 0.01) -> None:
+        if policy not in IGNORED_EVENT_POLICIES:
+            raise ValueError(f"Unknown ignored event policy: {policy}")
+        self.policy = policy
+        self.sample_rate = min(1.0, max(0.0, sample_rate))
+        self._by_type: Dict[str, int] = {}
+        self._logged_full = 0
+        self._logged_summary = 0
+        self._counted_only = 0
+
+    def record(self, decision: str, event: Any, message_type: Any) -> Optional[str]:
+        key = f"{decision}:{event or '-'}:{message_type or '-'}"
+        self._by_type[key] = self._by_type.get(key, 0) + 1
+        if self.policy == "full" or (self.policy == "sample" and random.random() < self.sample_rate):
+            self._logged_full += 1
+            return "full"
+        if self.policy == "summary":
+            self._logged_summary += 1
+            return "summary"
+        self._counted_only += 1
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "policy": self.policy,
+            "sample_rate": self.sample_rate,
+            "logged_full": self._logged_full,
+            "logged_summary": self._logged_summary,
+            "counted_only": self._counted_only,
+            "by_type": dict(self._by_type),
+        }
@@ -0,0 +1,241 @@
+import asyncio
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+@dataclass
+class InboxEntry:
+    entry_id: str
+    source: str
+    body: bytes
+    content_type: Optional[str]
+    signature: str
+
+
+_SCHEMA = """
+create table if not exists inbox (
+  entry_id text primary key,
+  owner text not null,
+  source text not null,
+  body blob not null,
+  content_type text,
+  signature text,
+  received_at real not null,
+  done_at real
+);
+create index if not exists inbox_pending_idx on inbox (done_at, owner);
+create table if not exists inbox_owners (
+  owner text primary key,
+  heartbeat_at real not null
+);
+"""
+
+
+class WebhookInbox:
+    def __init__(
+        self,
+        path: str,
+        replay: Callable[[List[InboxEntry]], None],
+        commit_window_ms: float = 2.0,
+        retention_seconds: int = 3600,
+        heartbeat_seconds: float = 5.0,
+    ) -> None:
+        self.path = path
+        self.replay = replay
+        self.commit_window = max(0.0, commit_window_ms) / 1000
+        self.retention_seconds = retention_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.owner = uuid.uuid4().hex
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inbox")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._appends: List[Tuple[Tuple[Any, ...], asyncio.Future]] = []
+        self._done: List[str] = []
+        self._wakeup = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+        self._closing = False
+        self._last_heartbeat = 0.0
+        self._appended = 0
+        self._completed = 0
+        self._replayed = 0
+        self._batches = 0
+        self._commit_seconds_total = 0.0
+
+    async def open(self) -> None:
+        loop = asyncio.get_running_loop()
+        orphans = await loop.run_in_executor(self._executor, self._open_sync)
+        self._hand_over(orphans)
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    def _hand_over(self, orphans: List[InboxEntry]) -> None:
+        if not orphans:
+            return
+        self._replayed += len(orphans)
+        self.replay(orphans)
+
+    async def close(self) -> None:
+        self._closing = True
+        self._wakeup.set()
+        if self._flusher:
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self._flush()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._close_sync)
+        self._executor.shutdown(wait=True)
+
+    async def append(
+        self, source: str, body: bytes, content_type: Optional[str], signature: str
+    ) -> str:
+        entry_id = uuid.uuid4().hex
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        row = (entry_id, self.owner, source, body, content_type, signature, time.time())
+        self._appends.append((row, future))
+        self._wakeup.set()
+        await future
+        self._appended += 1
+        return entry_id
+
+    def mark_done(self, entry_id: str) -> None:
+        self._done.append(entry_id)
+        self._wakeup.set()
+
+    async def _flush_loop(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.heartbeat_seconds)
+            except asyncio.TimeoutError:
+                pass
+            if self.commit_window and self._wakeup.is_set():
+                await asyncio.sleep(self.commit_window)
+            self._wakeup.clear()
+            await self._flush()
+
+    async def _flush(self) -> None:
+        heartbeat_due = time.time() - self._last_heartbeat >= self.heartbeat_seconds
+        if not self._appends and not self._done and not heartbeat_due:
+            return
+        appends, self._appends = self._appends, []
+        done, self._done = self._done, []
+        rows = [row for row, _ in appends]
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            orphans = await loop.run_in_executor(self._executor, self._write_sync, rows, done)
+        except Exception as exc:  # noqa: BLE001
+            for _, future in appends:
+                if not future.done():
+                    future.set_exception(exc)
+            self._done = done + self._done
+            return
+        self._batches += 1
+        self._commit_seconds_total += time.perf_counter() - started
+        self._completed += len(done)
+        for _, future in appends:
+            if not future.done():
+                future.set_result(None)
+        self._hand_over(orphans)
+
+    def _open_sync(self) -> List[InboxEntry]:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("pragma journal_mode=wal")
+        conn.execute("pragma synchronous=full")
+        conn.executescript(_SCHEMA)
+        self._conn = conn
+        now = time.time()
+        conn.execute("begin immediate")
+        try:
+            conn.execute(
+                "insert into inbox_owners (owner, heartbeat_at) values (?, ?)", (self.owner, now)
+            )
+            conn.execute(
+                "delete from inbox where done_at is not null and done_at < ?",
+                (now - self.retention_seconds,),
+            )
+            orphans = self._claim_orphans(conn, now)
+            conn.execute("commit")
+        except Exception:
+            conn.execute("rollback")
+            raise
+        self._last_heartbeat = now
+        return orphans
+
+    def _claim_orphans(self, conn: sqlite3.Connection, now: float) -> List[InboxEntry]:
+        orphaned = (
+            "done_at is null and owner != ? and (owner not in (select owner from inbox_owners) "
+            "or owner in (select owner from inbox_owners where heartbeat_at < ?))"
+        )
+        params = (self.owner, now - 3 * self.heartbeat_seconds)
+        rows = conn.execute(
+            "select entry_id, source, body, content_type, signature from inbox "
+            f"where {orphaned} order by received_at",
+            params,
+        ).fetchall()
+        if rows:
+            conn.execute(f"update inbox set owner = ? where {orphaned}", (self.owner, *params))
+        conn.execute(
+            "delete from inbox_owners where owner != ? and heartbeat_at < ?",
+            params,
+        )
+        return [
+            InboxEntry(
+                entry_id=row[0],
+                source=row[1],
+                body=bytes(row[2]),
+                content_type=row[3],
+                signature=row[4] or "",
+            )
+            for row in rows
+        ]
+
+    def _write_sync(self, rows: List[Tuple[Any, ...]], done: List[str]) -> List[InboxEntry]:
+        conn = self._conn
+        if conn is None:
+            raise RuntimeError("inbox is not open")
+        now = time.time()
+        orphans: List[InboxEntry] = []
+        conn.execute("begin immediate")
+        try:
+            if rows:
+                conn.executemany(
+                    "insert into inbox (entry_id, owner, source, body, content_type, signature, "
+                    "received_at) values (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+            if done:
+                conn.executemany(
+                    "update inbox set done_at = ? where entry_id = ?",
+                    [(now, entry_id) for entry_id in done],
+                )
+            if now - self._last_heartbeat >= self.heartbeat_seconds:
+                conn.execute(
+                    "update inbox_owners set heartbeat_at = ? where owner = ?", (now, self.owner)
+                )
+                orphans = self._claim_orphans(conn, now)
+                self._last_heartbeat = now
+            conn.execute("commit")
+        except Exception:
+            conn.execute("rollback")
+            raise
+        return orphans
+
+    def _close_sync(self) -> None:
+        if self._conn is None:
+            return
+        self._conn.execute("delete from inbox_owners where owner = ?", (self.owner,))
+        self._conn.close()
+        self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        avg_commit = self._commit_seconds_total / self._batches if self._batches else None
+        return {
+            "appended": self._appended,
+            "completed": self._completed,
+            "replayed": self._replayed,
+            "in_flight": self._appended + self._replayed - self._completed,
+            "batches": self._batches,
+            "avg_batch_commit_seconds": avg_commit,
+        }
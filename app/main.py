@@ -1,21 +1,66 @@
-import datetime as dt
+import asyncio
 import logging
+import time
 from contextlib import asynccontextmanager
-from typing import Any, Dict, Optional
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, NoReturn, Optional, Set, Tuple
 
-from fastapi import FastAPI, HTTPException, Request
+import httpx
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.background import BackgroundTask
 
 from app.chatwoot import ChatwootClient
+from app.chatwoot_payload import ChatwootWebhook, decode_chatwoot_webhook
 from app.config import settings
-from app.dedupe import MARKER, build_dedupe_key, has_marker, normalize_text, strip_marker
+from app.dedupe import (
+    MARKER,
+    DedupeGuard,
+    build_dedupe_key,
+    has_marker,
+    normalize_text,
+    strip_marker,
+)
+from app.dedupe_store import (
+    DedupeStore,
+    MemoryDedupeStore,
+    RedisDedupeStore,
+    SqliteDedupeStore,
+    SupabaseDedupeStore,
+)
+from app.dispatcher import ChatDispatcher, DispatcherFull, Job
+from app.event_sink import EventLogSink
+from app.idempotency import IdempotencyGuard
+from app.ignored_events import IgnoredEventPolicy
+from app.inbox import InboxEntry, WebhookInbox
 from app.logging_utils import configure_logging, log_structured
+from app.mapping_store import ChatMappingStore, SqliteMappingStore, SupabaseMappingStore
+from app.metrics import (
+    EVENTS,
+    PARSE_DURATION,
+    PARSE_MODES,
+    PROMETHEUS_CONTENT_TYPE,
+    SENDER_DURATION,
+    WEBHOOK_DURATION,
+    CallbackGauge,
+    flatten_stats,
+    registry,
+)
+from app.models import ChatResolution, ParsedUnipileEvent
+from app.resolver import STALE_STATUSES, ConversationResolver
+from app.spool import DiskSpool
 from app.supabase_client import SupabaseClient
-from app.unipile import UnipileClient, parse_unipile_webhook
+from app.timing import StageTimer, current_timer, timed
+from app.unipile import UnipileClient, parse_unipile_webhook, sent_message_ids
 
 
 configure_logging(settings.log_level)
 
 
+async def _warm_up(upstreams: Iterable[Any]) -> None:
+    await asyncio.gather(*(upstream.warm_up(settings.http_warm_connections) for upstream in upstreams))
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     app.state.chatwoot = ChatwootClient(
@@ -23,14 +68,16 @@ async def lifespan(app: FastAPI):
         account_id=settings.chatwoot_account_id,
         inbox_id=settings.chatwoot_inbox_id,
         api_token=settings.chatwoot_api_token,
-        timeout=settings.request_timeout_seconds,
+        http=settings.chatwoot_http,
         retries=settings.request_retries,
+        retry_config=settings.retry_policy,
     )
     app.state.unipile = UnipileClient(
         base_url=settings.unipile_base_url,
         api_key=settings.unipile_api_key,
-        timeout=settings.request_timeout_seconds,
+        http=settings.unipile_http,
         retries=settings.request_retries,
+        retry_config=settings.retry_policy,
     )
 
     supabase: Optional[SupabaseClient] = None
@@ -38,11 +85,114 @@ async def lifespan(app: FastAPI):
         supabase = SupabaseClient(
             base_url=settings.supabase_url,
             api_key=settings.supabase_key,
-            timeout=settings.request_timeout_seconds,
+            http=settings.supabase_http,
             retries=settings.request_retries,
+            retry_config=settings.retry_policy,
         )
     app.state.supabase = supabase
+
+    upstreams = [app.state.chatwoot, app.state.unipile] + ([supabase] if supabase else [])
+    warm_up = asyncio.create_task(
+        _warm_up(upstream for upstream in upstreams if upstream.base_url)
+    )
+
+    mapping_store: Optional[ChatMappingStore] = None
+    if settings.mapping_backend == "sqlite" and settings.mapping_sqlite_path:
+        mapping_store = SqliteMappingStore(settings.mapping_sqlite_path)
+    elif settings.mapping_backend == "supabase" and supabase:
+        mapping_store = SupabaseMappingStore(supabase)
+    app.state.resolver = ConversationResolver(
+        app.state.chatwoot,
+        max_size=settings.resolution_cache_size,
+        ttl_seconds=settings.resolution_cache_ttl_seconds,
+        store=mapping_store,
+    )
+    spool: Optional[DiskSpool] = None
+    if supabase and settings.spool_path:
+        spool = DiskSpool(
+            settings.spool_path,
+            segment_bytes=settings.spool_segment_bytes,
+            max_bytes=settings.spool_max_bytes,
+            drain_rate=settings.spool_drain_rate,
+            drain_interval_seconds=settings.spool_drain_interval_seconds,
+        )
+    app.state.spool = spool
+    dedupe_store: Optional[DedupeStore] = None
+    if settings.dedupe_backend == "memory":
+        dedupe_store = MemoryDedupeStore(max_size=settings.dedupe_cache_size)
+    elif settings.dedupe_backend == "sqlite" and settings.dedupe_sqlite_path:
+        dedupe_store = SqliteDedupeStore(settings.dedupe_sqlite_path)
+    elif settings.dedupe_backend == "redis" and settings.dedupe_redis_url:
+        dedupe_store = RedisDedupeStore(settings.dedupe_redis_url)
+    elif settings.dedupe_backend == "supabase" and supabase:
+        dedupe_store = SupabaseDedupeStore(supabase)
+    app.state.dedupe = DedupeGuard(
+        dedupe_store,
+        ttl_seconds=settings.dedupe_ttl_seconds,
+        max_size=settings.dedupe_cache_size,
+        spool=spool,
+        echo_recheck_ms=settings.dedupe_echo_recheck_ms,
+    )
+    app.state.idempotency = IdempotencyGuard(
+        supabase,
+        ttl_seconds=settings.idempotency_ttl_seconds,
+        max_size=settings.idempotency_cache_size,
+    )
+
+    event_sink: Optional[EventLogSink] = None
+    if supabase:
+        event_sink = EventLogSink(
+            supabase,
+            batch_size=settings.event_log_batch_size,
+            flush_interval_ms=settings.event_log_flush_ms,
+            max_buffer=settings.event_log_buffer_size,
+            overflow=settings.event_log_overflow,
+            drain_timeout_seconds=settings.event_log_drain_timeout_seconds,
+            spool=spool,
+        )
+        await event_sink.start()
+    app.state.event_sink = event_sink
+    if spool:
+        spool.register("event_log", supabase.log_events)
+        if dedupe_store is not None:
+            spool.register("dedupe", app.state.dedupe.restore)
+        await spool.open()
+    app.state.ignored_events = IgnoredEventPolicy(
+        policy=settings.ignored_event_policy, sample_rate=settings.ignored_event_sample_rate
+    )
+
+    app.state.dispatcher = ChatDispatcher(
+        lanes=settings.dispatch_lanes, lane_size=settings.lane_queue_size
+    )
+    await app.state.dispatcher.start()
+
+    app.state.replay_tasks = set()
+    inbox: Optional[WebhookInbox] = None
+    if settings.inbox_path:
+        inbox = WebhookInbox(
+            path=settings.inbox_path,
+            replay=_schedule_replay,
+            commit_window_ms=settings.inbox_commit_window_ms,
+            retention_seconds=settings.inbox_retention_seconds,
+        )
+    app.state.inbox = inbox
+    if inbox:
+        await inbox.open()
     yield
+    warm_up.cancel()
+    await asyncio.gather(warm_up, return_exceptions=True)
+    if app.state.replay_tasks:
+        await asyncio.gather(*app.state.replay_tasks, return_exceptions=True)
+    await app.state.dispatcher.stop()
+    if app.state.inbox:
+        await app.state.inbox.close()
+    await app.state.dedupe.close()
+    await app.state.idempotency.close()
+    await app.state.resolver.close()
+    if app.state.event_sink:
+        await app.state.event_sink.stop()
+    if app.state.spool:
+        await app.state.spool.close()
     await app.state.chatwoot.close()
     await app.state.unipile.close()
     if app.state.supabase:
@@ -64,15 +214,123 @@ def _verify_webhook_secret(request: Request) -> None:
         raise HTTPException(status_code=401, detail="invalid webhook secret")
 
 
-async def _log_event(app: FastAPI, event: Dict[str, Any]) -> None:
-    log_structured(logging.INFO, "event", **event)
-    supabase = app.state.supabase
-    if not supabase:
+deferred_events: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar(
+    "deferred_events", default=None
+)
+
+
+def _log_event(app: FastAPI, event: Dict[str, Any]) -> None:
+    timer = current_timer.get()
+    if timer is not None:
+        event["timings"] = timer.as_dict()
+    deferred = deferred_events.get()
+    if deferred is not None:
+        deferred.append(event)
         return
+    _write_event(app, event)
+
+
+async def _write_events(events: List[Dict[str, Any]]) -> None:
+    for event in events:
+        _write_event(app, event)
+    events.clear()
+
+
+def _write_event(app: FastAPI, event: Dict[str, Any]) -> None:
+    log_structured(logging.INFO, "event", **event)
+    EVENTS.inc(event.get("source") or "", event.get("decision") or "")
+    event_sink = app.state.event_sink
+    if event_sink:
+        event_sink.emit(event)
+
+
+async def _journal(
+    source: str, body: bytes, content_type: Optional[str], signature: str
+) -> Optional[str]:
+    inbox: Optional[WebhookInbox] = app.state.inbox
+    if not inbox:
+        return None
     try:
-        await supabase.log_event(event)
+        return await inbox.append(source, body, content_type, signature)
     except Exception as exc:  # noqa: BLE001
-        log_structured(logging.ERROR, "event_log_failed", error=str(exc))
+        log_structured(logging.ERROR, "inbox_append_failed", source=source, error=str(exc))
+        return None
+
+
+def _journaled(entry_id: Optional[str], job: Job) -> Job:
+    if entry_id is None:
+        return job
+
+    async def run() -> Any:
+        try:
+            return await job()
+        finally:
+            app.state.inbox.mark_done(entry_id)
+
+    return run
+
+
+def _entry_job(entry: InboxEntry) -> Tuple[Optional[str], Job]:
+    timer = StageTimer()
+    if entry.source == "chatwoot":
+        with timer.stage("decode"):
+            webhook = decode_chatwoot_webhook(entry.body)
+        return webhook.chat_id, lambda: _process_chatwoot_payload(
+            webhook, entry.signature, timer, replayed=True
+        )
+    with timer.stage("parse"):
+        parsed = parse_unipile_webhook(entry.body, entry.content_type)
+    return parsed.chat_id, lambda: _process_unipile_event(
+        parsed, entry.signature, timer, replayed=True
+    )
+
+
+def _schedule_replay(entries: List[InboxEntry]) -> None:
+    tasks: Set[asyncio.Task] = app.state.replay_tasks
+    task = asyncio.create_task(_replay(entries))
+    tasks.add(task)
+    task.add_done_callback(tasks.discard)
+
+
+async def _replay(entries: List[InboxEntry]) -> None:
+    dispatcher: ChatDispatcher = app.state.dispatcher
+    for entry in entries:
+        try:
+            chat_id, job = _entry_job(entry)
+        except Exception as exc:  # noqa: BLE001
+            log_structured(
+                logging.ERROR, "inbox_replay_failed", entry_id=entry.entry_id, error=str(exc)
+            )
+            app.state.inbox.mark_done(entry.entry_id)
+            continue
+        job = _journaled(entry.entry_id, job)
+        while not dispatcher.submit(chat_id or entry.entry_id, job):
+            await asyncio.sleep(0.05)
+    log_structured(logging.INFO, "inbox_replayed", count=len(entries))
+
+
+def _reject_dispatch(
+    dispatcher: ChatDispatcher, chat_id: str, entry_id: Optional[str] = None
+) -> NoReturn:
+    if entry_id is not None:
+        app.state.inbox.mark_done(entry_id)
+    log_structured(
+        logging.WARNING,
+        "dispatch_lane_full",
+        chat_id=chat_id,
+        lane=dispatcher.lane_for(chat_id),
+        lane_capacity=dispatcher.lane_size,
+    )
+    raise HTTPException(status_code=503, detail="queue full")
+
+
+async def _dispatch(
+    dispatcher: ChatDispatcher, chat_id: str, job: Job, entry_id: Optional[str] = None
+) -> Dict[str, Any]:
+    try:
+        return await dispatcher.run(chat_id, _journaled(entry_id, job))
+    except DispatcherFull:
+        _reject_dispatch(dispatcher, chat_id, entry_id)
 
 
 @app.get("/health")
@@ -80,86 +338,286 @@ async def health() -> Dict[str, str]:
     return {"status": "ok"}
 
 
+def _stats_snapshot() -> Dict[str, Any]:
+    return {
+        "async_processing": settings.unipile_async_processing,
+        "dispatcher": app.state.dispatcher.stats(),
+        "inbox": app.state.inbox.stats() if app.state.inbox else None,
+        "event_log": app.state.event_sink.stats() if app.state.event_sink else None,
+        "spool": app.state.spool.stats() if app.state.spool else None,
+        "ignored_events": app.state.ignored_events.stats(),
+        "dedupe": app.state.dedupe.stats(),
+        "idempotency": app.state.idempotency.stats(),
+        "resolution_cache": app.state.resolver.stats(),
+        "chatwoot_single_flight": app.state.chatwoot.stats(),
+        "circuits": {
+            "chatwoot": app.state.chatwoot.retry_policy.stats(),
+            "unipile": app.state.unipile.retry_policy.stats(),
+            "supabase": app.state.supabase.retry_policy.stats() if app.state.supabase else None,
+        },
+        "http": {
+            "chatwoot": app.state.chatwoot.connection_stats.stats(),
+            "unipile": app.state.unipile.connection_stats.stats(),
+            "supabase": (
+                app.state.supabase.connection_stats.stats() if app.state.supabase else None
+            ),
+        },
+    }
+
+
+def _collect_component_stats() -> Iterable[Tuple[Tuple[str, ...], float]]:
+    for component, values in _stats_snapshot().items():
+        if isinstance(values, dict):
+            for name, value in flatten_stats(values):
+                yield (component, name), value
+
+
+def _collect_lane_backlog() -> Iterable[Tuple[Tuple[str, ...], float]]:
+    for lane, backlog in enumerate(app.state.dispatcher.stats()["lane_backlog"]):
+        yield (str(lane),), float(backlog)
+
+
+def _collect_circuit_state() -> Iterable[Tuple[Tuple[str, ...], float]]:
+    upstreams = [app.state.chatwoot, app.state.unipile] + (
+        [app.state.supabase] if app.state.supabase else []
+    )
+    for upstream in upstreams:
+        policy = upstream.retry_policy
+        for state in (policy.CLOSED, policy.OPEN, policy.HALF_OPEN):
+            yield (policy.name, state), float(policy.state == state)
+
+
+registry.register(
+    CallbackGauge(
+        "bridge_component_stat",
+        "Point-in-time counters and gauges reported by bridge components.",
+        ("component", "stat"),
+        _collect_component_stats,
+    )
+)
+registry.register(
+    CallbackGauge(
+        "bridge_dispatch_lane_backlog",
+        "Jobs waiting in each per-chat dispatch lane.",
+        ("lane",),
+        _collect_lane_backlog,
+    )
+)
+registry.register(
+    CallbackGauge(
+        "bridge_circuit_state",
+        "Current circuit breaker state per upstream (1 for the active state).",
+        ("upstream", "state"),
+        _collect_circuit_state,
+    )
+)
+
+
+@app.get("/stats")
+async def stats() -> Dict[str, Any]:
+    return _stats_snapshot()
+
+
+@app.get("/metrics")
+async def metrics() -> PlainTextResponse:
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+async def _read_body(request: Request, source: str, signature: str) -> bytes:
+    limit = settings.max_webhook_body_bytes
+    declared = request.headers.get("content-length", "")
+    if limit > 0 and declared.isdigit() and int(declared) > limit:
+        await _reject_oversized(source, int(declared), signature)
+    chunks: List[bytes] = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if limit > 0 and size > limit:
+            await _reject_oversized(source, size, signature)
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def _reject_oversized(source: str, size: int, signature: str) -> NoReturn:
+    _log_event(
+        app,
+        {
+            "source": source,
+            "decision": "error",
+            "error": f"body_too_large: {size} bytes > {settings.max_webhook_body_bytes}",
+            "signature": signature,
+        },
+    )
+    raise HTTPException(status_code=413, detail="payload too large")
+
+
+async def _parse_unipile_body(body: bytes, content_type: Optional[str]) -> ParsedUnipileEvent:
+    started = time.perf_counter()
+    threshold = settings.unipile_parse_thread_bytes
+    if threshold > 0 and len(body) >= threshold:
+        parsed = await asyncio.to_thread(parse_unipile_webhook, body, content_type)
+    else:
+        parsed = parse_unipile_webhook(body, content_type)
+    elapsed = time.perf_counter() - started
+    PARSE_DURATION.observe(elapsed, parsed.parse_mode)
+    if elapsed * 1000 > settings.unipile_parse_budget_ms:
+        log_structured(
+            logging.WARNING,
+            "unipile_parse_slow",
+            bytes=len(body),
+            parse_mode=parsed.parse_mode,
+            duration_ms=round(elapsed * 1000, 3),
+        )
+    return parsed
+
+
 @app.post("/webhook/chatwoot")
-async def webhook_chatwoot(request: Request) -> Dict[str, Any]:
+async def webhook_chatwoot(request: Request) -> Response:
+    started = time.perf_counter()
+    try:
+        return await _handle_chatwoot_webhook(request)
+    finally:
+        WEBHOOK_DURATION.observe(time.perf_counter() - started, "chatwoot")
+
+
+async def _handle_chatwoot_webhook(request: Request) -> Response:
     _verify_webhook_secret(request)
     signature = _get_header(request, "X-SIGNATURE")
 
+    body = await _read_body(request, "chatwoot", signature)
+    timer = StageTimer()
     try:
-        payload = await request.json()
+        with timer.stage("decode"):
+            webhook = decode_chatwoot_webhook(body)
     except Exception as exc:  # noqa: BLE001
-        await _log_event(
+        _log_event(
             app,
             {
                 "source": "chatwoot",
                 "decision": "error",
                 "error": f"invalid_json: {exc}",
-                "payload": (await request.body()).decode("utf-8", errors="replace")[:1000],
+                "payload": body.decode("utf-8", errors="replace")[:1000],
                 "signature": signature,
             },
         )
         raise HTTPException(status_code=400, detail="invalid json")
 
-    event = payload.get("event")
-    message_type = payload.get("message_type")
-    content = payload.get("content") or ""
+    # most Chatwoot traffic is ignored; drop it before the journal and the lanes
+    ignored = _ignore_chatwoot_webhook(webhook, signature)
+    if ignored:
+        return JSONResponse(ignored)
 
-    if event != "message_created" or message_type != "outgoing":
-        await _log_event(
-            app,
-            {
-                "source": "chatwoot",
-                "decision": "ignored_event",
-                "payload": payload,
-                "signature": signature,
-            },
-        )
-        return {"status": "ignored"}
+    with timer.stage("journal"):
+        entry_id = await _journal("chatwoot", body, request.headers.get("content-type"), signature)
+    events: List[Dict[str, Any]] = []
+    job = lambda: _process_chatwoot_payload(webhook, signature, timer, events)  # noqa: E731
+    try:
+        if not webhook.chat_id:
+            result = await _journaled(entry_id, job)()
+        else:
+            result = await _dispatch(app.state.dispatcher, webhook.chat_id, job, entry_id)
+    except BaseException:
+        await _write_events(events)
+        raise
+    return JSONResponse(result, background=BackgroundTask(_write_events, events))
 
-    if has_marker(content):
-        await _log_event(
-            app,
-            {
-                "source": "chatwoot",
-                "decision": "ignored_marker",
-                "payload": payload,
-                "signature": signature,
-            },
-        )
+
+async def _process_chatwoot_payload(
+    webhook: ChatwootWebhook,
+    signature: str,
+    timer: StageTimer,
+    events: Optional[List[Dict[str, Any]]] = None,
+    replayed: bool = False,
+) -> Dict[str, Any]:
+    timer.since_mark("queue_wait")
+    token = current_timer.set(timer)
+    deferred = deferred_events.set(events)
+    try:
+        return await _run_chatwoot_pipeline(webhook, signature, replayed)
+    finally:
+        deferred_events.reset(deferred)
+        current_timer.reset(token)
+
+
+def _log_ignored(webhook: ChatwootWebhook, decision: str, signature: str) -> None:
+    policy: IgnoredEventPolicy = app.state.ignored_events
+    detail = policy.record(decision, webhook.event, webhook.message_type)
+    if detail is None:
+        EVENTS.inc("chatwoot", decision)
+        return
+    _log_event(
+        app,
+        {
+            "source": "chatwoot",
+            "decision": decision,
+            "payload": webhook.payload if detail == "full" else webhook.summary(),
+            "signature": signature,
+        },
+    )
+
+
+def _ignore_chatwoot_webhook(webhook: ChatwootWebhook, signature: str) -> Optional[Dict[str, Any]]:
+    if webhook.event != "message_created" or webhook.message_type != "outgoing":
+        _log_ignored(webhook, "ignored_event", signature)
+        return {"status": "ignored"}
+    if has_marker(webhook.content):
+        _log_ignored(webhook, "ignored_marker", signature)
         return {"status": "ignored_marker"}
+    return None
+
 
-    conversation = payload.get("conversation") or {}
-    meta_sender = (conversation.get("meta") or {}).get("sender") or {}
-    custom_attributes = meta_sender.get("custom_attributes") or {}
-    chat_id = custom_attributes.get("chat_id")
+async def _run_chatwoot_pipeline(
+    webhook: ChatwootWebhook, signature: str, replayed: bool = False
+) -> Dict[str, Any]:
+    ignored = _ignore_chatwoot_webhook(webhook, signature)
+    if ignored:
+        return ignored
+
+    content = webhook.content
+    chat_id = webhook.chat_id
 
     if not chat_id:
-        await _log_event(
+        _log_event(
             app,
             {
                 "source": "chatwoot",
                 "decision": "error",
                 "error": "missing_chat_id",
-                "payload": payload,
+                "payload": webhook.payload,
                 "signature": signature,
             },
         )
         return {"status": "missing_chat_id"}
 
+    idempotency_key = (
+        f"chatwoot:{webhook.message_id}" if webhook.message_id is not None else None
+    )
+    if idempotency_key:
+        with timed("idempotency_claim"):
+            if replayed:
+                claimed = await app.state.idempotency.reclaim(idempotency_key, "chatwoot")
+            else:
+                claimed = await app.state.idempotency.claim(idempotency_key, "chatwoot")
+        if not claimed:
+            _log_event(
+                app,
+                {
+                    "source": "chatwoot",
+                    "decision": "duplicate_webhook",
+                    "chat_id": chat_id,
+                    "message_id": webhook.message_id,
+                    "signature": signature,
+                },
+            )
+            return {"status": "duplicate"}
+
     normalized_text = normalize_text(content)
     dedupe_key = build_dedupe_key(chat_id, normalized_text) if normalized_text else None
 
-    now = dt.datetime.now(tz=dt.timezone.utc)
-    if dedupe_key and app.state.supabase:
-        try:
-            await app.state.supabase.upsert_dedupe(
-                dedupe_key,
-                chat_id=chat_id,
-                normalized_text=normalized_text,
-                expires_at=now + dt.timedelta(seconds=settings.dedupe_ttl_seconds),
-            )
-        except Exception as exc:  # noqa: BLE001
-            await _log_event(
+    if dedupe_key:
+
+        async def on_dedupe_error(exc: Exception) -> None:
+            _write_event(
                 app,
                 {
                     "source": "chatwoot",
@@ -168,15 +626,27 @@ async def webhook_chatwoot(request: Request) -> Dict[str, Any]:
                     "chat_id": chat_id,
                     "dedupe_key": dedupe_key,
                     "normalized_text": normalized_text,
-                    "payload": payload,
+                    "payload": webhook.payload,
                     "signature": signature,
                 },
             )
 
+        with timed("dedupe_write"):
+            app.state.dedupe.remember(
+                dedupe_key,
+                chat_id=chat_id,
+                normalized_text=normalized_text,
+                on_error=on_dedupe_error,
+            )
+
     try:
         text_to_send = strip_marker(content)
-        response = await app.state.unipile.send_message(chat_id=chat_id, text=text_to_send)
-        await _log_event(
+        with timed("unipile_send"):
+            response = await app.state.unipile.send_message(chat_id=chat_id, text=text_to_send)
+        if idempotency_key:
+            app.state.idempotency.deliver_later(idempotency_key)
+        app.state.dedupe.remember_sent(chat_id, sent_message_ids(response))
+        _log_event(
             app,
             {
                 "source": "chatwoot",
@@ -184,14 +654,16 @@ async def webhook_chatwoot(request: Request) -> Dict[str, Any]:
                 "chat_id": chat_id,
                 "dedupe_key": dedupe_key,
                 "normalized_text": normalized_text,
-                "payload": payload,
+                "payload": webhook.payload,
                 "signature": signature,
                 "response": response,
             },
         )
         return {"status": "sent"}
     except Exception as exc:  # noqa: BLE001
-        await _log_event(
+        if idempotency_key:
+            await app.state.idempotency.release(idempotency_key)
+        _log_event(
             app,
             {
                 "source": "chatwoot",
@@ -200,7 +672,7 @@ async def webhook_chatwoot(request: Request) -> Dict[str, Any]:
                 "chat_id": chat_id,
                 "dedupe_key": dedupe_key,
                 "normalized_text": normalized_text,
-                "payload": payload,
+                "payload": webhook.payload,
                 "signature": signature,
             },
         )
@@ -208,25 +680,104 @@ async def webhook_chatwoot(request: Request) -> Dict[str, Any]:
 
 
 @app.post("/webhook/unipile")
-async def webhook_unipile(request: Request) -> Dict[str, Any]:
+async def webhook_unipile(request: Request, response: Response) -> Dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        return await _handle_unipile_webhook(request, response)
+    finally:
+        WEBHOOK_DURATION.observe(time.perf_counter() - started, "unipile")
+
+
+async def _handle_unipile_webhook(request: Request, response: Response) -> Dict[str, Any]:
     _verify_webhook_secret(request)
     signature = _get_header(request, "X-SIGNATURE")
 
-    body = await request.body()
-    parsed = parse_unipile_webhook(body, request.headers.get("content-type"))
+    body = await _read_body(request, "unipile", signature)
+    content_type = request.headers.get("content-type")
+    timer = StageTimer()
+    with timer.stage("parse"):
+        parsed = await _parse_unipile_body(body, content_type)
+    PARSE_MODES.inc(parsed.parse_mode)
+
+    with timer.stage("journal"):
+        entry_id = await _journal("unipile", body, content_type, signature)
+    job = lambda: _process_unipile_event(parsed, signature, timer)  # noqa: E731
+    if not parsed.chat_id:
+        return await _journaled(entry_id, job)()
+
+    dispatcher: ChatDispatcher = app.state.dispatcher
+    if not settings.unipile_async_processing:
+        return await _dispatch(dispatcher, parsed.chat_id, job, entry_id)
+
+    if not dispatcher.submit(parsed.chat_id, _journaled(entry_id, job)):
+        _reject_dispatch(dispatcher, parsed.chat_id, entry_id)
+    response.status_code = 202
+    return {"status": "accepted"}
+
+
+async def _create_chatwoot_message(
+    resolution: ChatResolution,
+    chat_id: str,
+    name: str,
+    email: str,
+    message_type: str,
+    content: str,
+) -> Dict[str, Any]:
+    resolver: ConversationResolver = app.state.resolver
+    try:
+        with timed("create_message"):
+            return await app.state.chatwoot.create_message(
+                conversation_id=resolution.conversation_id,
+                message_type=message_type,
+                content=content,
+            )
+    except httpx.HTTPStatusError as exc:
+        if exc.response.status_code not in STALE_STATUSES:
+            raise
+    resolver.invalidate(chat_id)
+    resolution = await resolver.resolve(chat_id, name=name, email=email, refresh=True)
+    with timed("create_message"):
+        return await app.state.chatwoot.create_message(
+            conversation_id=resolution.conversation_id,
+            message_type=message_type,
+            content=content,
+        )
 
+
+async def _process_unipile_event(
+    parsed: ParsedUnipileEvent, signature: str, timer: StageTimer, replayed: bool = False
+) -> Dict[str, Any]:
+    timer.since_mark("queue_wait")
+    token = current_timer.set(timer)
+    started = time.perf_counter()
+    status = "error"
+    try:
+        result = await _run_unipile_pipeline(parsed, signature, replayed)
+        status = result.get("status") or status
+        return result
+    finally:
+        current_timer.reset(token)
+        if parsed.is_sender:
+            mode = "speculative" if settings.unipile_speculative_resolution else "sequential"
+            SENDER_DURATION.observe(time.perf_counter() - started, mode, status)
+
+
+async def _run_unipile_pipeline(
+    parsed: ParsedUnipileEvent, signature: str, replayed: bool = False
+) -> Dict[str, Any]:
     chat_id = parsed.chat_id
     message = parsed.message or ""
     is_sender = parsed.is_sender
 
     if not chat_id:
-        await _log_event(
+        _log_event(
             app,
             {
                 "source": "unipile",
                 "decision": "error",
                 "error": "missing_chat_id",
                 "payload": parsed.raw,
+                "raw_body": parsed.raw_body,
                 "signature": signature,
                 "parse_mode": parsed.parse_mode,
             },
@@ -234,7 +785,7 @@ async def webhook_unipile(request: Request) -> Dict[str, Any]:
         return {"status": "missing_chat_id"}
 
     if is_sender is None:
-        await _log_event(
+        _log_event(
             app,
             {
                 "source": "unipile",
@@ -242,6 +793,7 @@ async def webhook_unipile(request: Request) -> Dict[str, Any]:
                 "error": "missing_is_sender",
                 "chat_id": chat_id,
                 "payload": parsed.raw,
+                "raw_body": parsed.raw_body,
                 "signature": signature,
                 "parse_mode": parsed.parse_mode,
             },
@@ -250,18 +802,46 @@ async def webhook_unipile(request: Request) -> Dict[str, Any]:
 
     normalized_text = None
     dedupe_key = None
+    resolution: Optional["asyncio.Task[ChatResolution]"] = None
+    idempotency_key = _idempotency_key(parsed)
+    claimed = False
     if is_sender:
+        if app.state.dedupe.is_sent(parsed.message_id, parsed.provider_message_id):
+            _log_event(
+                app,
+                {
+                    "source": "unipile",
+                    "decision": "blocked_echo",
+                    "chat_id": chat_id,
+                    "message_id": parsed.message_id,
+                    "provider_message_id": parsed.provider_message_id,
+                    "payload": parsed.raw,
+                    "raw_body": parsed.raw_body,
+                    "signature": signature,
+                    "parse_mode": parsed.parse_mode,
+                },
+            )
+            return {"status": "blocked_echo"}
+
         normalized_text = normalize_text(message)
         dedupe_key = build_dedupe_key(chat_id, normalized_text) if normalized_text else None
 
-        if dedupe_key and app.state.supabase:
+        if dedupe_key and settings.unipile_speculative_resolution:
+            # claim first: a redelivered webhook must not reach Chatwoot, and
+            # cancelling the speculation cannot undo a contact it created
+            if idempotency_key:
+                if not await _claim_unipile(idempotency_key, replayed):
+                    return _duplicate_unipile(parsed, signature)
+                claimed = True
+            resolution = asyncio.create_task(_resolve_unipile_chat(parsed))
+
+        if dedupe_key:
             try:
-                deduped = await app.state.supabase.is_deduped(
-                    dedupe_key, now=dt.datetime.now(tz=dt.timezone.utc)
-                )
+                with timed("dedupe_check"):
+                    deduped = await app.state.dedupe.seen(dedupe_key)
             except Exception as exc:  # noqa: BLE001
                 deduped = False
-                await _log_event(
+                _log_event(
                     app,
                     {
                         "source": "unipile",
@@ -271,6 +851,7 @@ async def webhook_unipile(request: Request) -> Dict[str, Any]:
                         "dedupe_key": dedupe_key,
                         "normalized_text": normalized_text,
                         "payload": parsed.raw,
+                        "raw_body": parsed.raw_body,
                         "signature": signature,
                         "parse_mode": parsed.parse_mode,
                     },
@@ -279,7 +860,10 @@ async def webhook_unipile(request: Request) -> Dict[str, Any]:
             deduped = False
 
         if deduped:
-            await _log_event(
+            await _cancel_speculation(resolution)
+            if claimed:
+                await app.state.idempotency.delivered(idempotency_key)
+            _log_event(
                 app,
                 {
                     "source": "unipile",
@@ -288,23 +872,97 @@ async def webhook_unipile(request: Request) -> Dict[str, Any]:
                     "dedupe_key": dedupe_key,
                     "normalized_text": normalized_text,
                     "payload": parsed.raw,
+                    "raw_body": parsed.raw_body,
                     "signature": signature,
                     "parse_mode": parsed.parse_mode,
                 },
             )
             return {"status": "blocked_echo"}
 
-    attendee_id = parsed.attendee_id or chat_id
-    attendee_name = parsed.attendee_name or attendee_id
-    email = f"{attendee_id}@gmail.com"
+    if idempotency_key and not claimed:
+        if not await _claim_unipile(idempotency_key, replayed):
+            return _duplicate_unipile(parsed, signature)
 
     try:
-        contact = await app.state.chatwoot.get_or_create_contact(
-            name=attendee_name, email=email, chat_id=chat_id
+        result = await _deliver_unipile_event(
+            parsed, signature, normalized_text, dedupe_key, resolution
         )
-        conversation = await app.state.chatwoot.get_or_create_conversation(contact)
+    except Exception:
+        if idempotency_key:
+            await app.state.idempotency.release(idempotency_key)
+        raise
+    if idempotency_key and result.get("status") == "error":
+        await app.state.idempotency.release(idempotency_key)
+    elif idempotency_key:
+        await app.state.idempotency.delivered(idempotency_key)
+    return result
+
+
+def _idempotency_key(parsed: ParsedUnipileEvent) -> Optional[str]:
+    message_id = parsed.message_id or parsed.provider_message_id
+    return f"unipile:{message_id}" if message_id else None
+
+
+async def _claim_unipile(key: str, replayed: bool) -> bool:
+    with timed("idempotency_claim"):
+        if replayed:
+            return await app.state.idempotency.reclaim(key, "unipile")
+        return await app.state.idempotency.claim(key, "unipile")
+
+
+def _duplicate_unipile(parsed: ParsedUnipileEvent, signature: str) -> Dict[str, Any]:
+    _log_event(
+        app,
+        {
+            "source": "unipile",
+            "decision": "duplicate_webhook",
+            "chat_id": parsed.chat_id,
+            "is_sender": parsed.is_sender,
+            "message_id": parsed.message_id,
+            "provider_message_id": parsed.provider_message_id,
+            "signature": signature,
+            "parse_mode": parsed.parse_mode,
+        },
+    )
+    return {"status": "duplicate"}
+
+
+def _unipile_contact(parsed: ParsedUnipileEvent) -> Tuple[str, str]:
+    attendee_id = parsed.attendee_id or parsed.chat_id
+    attendee_name = parsed.attendee_name or attendee_id
+    return attendee_name, f"{attendee_id}@gmail.com"
+
+
+async def _resolve_unipile_chat(parsed: ParsedUnipileEvent) -> ChatResolution:
+    attendee_name, email = _unipile_contact(parsed)
+    return await app.state.resolver.resolve(
+        parsed.chat_id, name=attendee_name, email=email, attendee_id=parsed.attendee_id
+    )
+
+
+async def _cancel_speculation(resolution: Optional["asyncio.Task[ChatResolution]"]) -> None:
+    if resolution is None:
+        return
+    resolution.cancel()
+    await asyncio.gather(resolution, return_exceptions=True)
+
+
+async def _deliver_unipile_event(
+    parsed: ParsedUnipileEvent,
+    signature: str,
+    normalized_text: Optional[str],
+    dedupe_key: Optional[str],
+    speculative: Optional["asyncio.Task[ChatResolution]"] = None,
+) -> Dict[str, Any]:
+    chat_id = parsed.chat_id
+    message = parsed.message or ""
+    is_sender = parsed.is_sender
+    attendee_name, email = _unipile_contact(parsed)
+
+    try:
+        resolution = await (speculative or _resolve_unipile_chat(parsed))
     except Exception as exc:  # noqa: BLE001
-        await _log_event(
+        _log_event(
             app,
             {
                 "source": "unipile",
@@ -314,6 +972,7 @@ async def webhook_unipile(request: Request) -> Dict[str, Any]:
                 "dedupe_key": dedupe_key,
                 "normalized_text": normalized_text,
                 "payload": parsed.raw,
+                "raw_body": parsed.raw_body,
                 "signature": signature,
                 "parse_mode": parsed.parse_mode,
             },
@@ -322,12 +981,10 @@ async def webhook_unipile(request: Request) -> Dict[str, Any]:
 
     if not is_sender:
         try:
-            result = await app.state.chatwoot.create_message(
-                conversation_id=str(conversation.get("id")),
-                message_type="incoming",
-                content=message,
+            result = await _create_chatwoot_message(
+                resolution, chat_id, attendee_name, email, message_type="incoming", content=message
             )
-            await _log_event(
+            _log_event(
                 app,
                 {
                     "source": "unipile",
@@ -337,6 +994,7 @@ async def webhook_unipile(request: Request) -> Dict[str, Any]:
                     "message_id": parsed.message_id,
                     "provider_message_id": parsed.provider_message_id,
                     "payload": parsed.raw,
+                    "raw_body": parsed.raw_body,
                     "signature": signature,
                     "parse_mode": parsed.parse_mode,
                     "response": result,
@@ -344,7 +1002,7 @@ async def webhook_unipile(request: Request) -> Dict[str, Any]:
             )
             return {"status": "created_incoming"}
         except Exception as exc:  # noqa: BLE001
-            await _log_event(
+            _log_event(
                 app,
                 {
                     "source": "unipile",
@@ -352,6 +1010,7 @@ async def webhook_unipile(request: Request) -> Dict[str, Any]:
                     "error": f"chatwoot_incoming_failed: {exc}",
                     "chat_id": chat_id,
                     "payload": parsed.raw,
+                    "raw_body": parsed.raw_body,
                     "signature": signature,
                     "parse_mode": parsed.parse_mode,
                 },
@@ -365,12 +1024,15 @@ async def webhook_unipile(request: Request) -> Dict[str, Any]:
 
     try:
         outgoing_content = f"{MARKER}{strip_marker(message)}"
-        result = await app.state.chatwoot.create_message(
-            conversation_id=str(conversation.get("id")),
+        result = await _create_chatwoot_message(
+            resolution,
+            chat_id,
+            attendee_name,
+            email,
             message_type="outgoing",
             content=outgoing_content,
         )
-        await _log_event(
+        _log_event(
             app,
             {
                 "source": "unipile",
@@ -382,6 +1044,7 @@ async def webhook_unipile(request: Request) -> Dict[str, Any]:
                 "dedupe_key": dedupe_key,
                 "normalized_text": normalized_text,
                 "payload": parsed.raw,
+                "raw_body": parsed.raw_body,
                 "signature": signature,
                 "parse_mode": parsed.parse_mode,
                 "response": result,
@@ -389,7 +1052,7 @@ async def webhook_unipile(request: Request) -> Dict[str, Any]:
         )
         return {"status": "created_outgoing"}
     except Exception as exc:  # noqa: BLE001
-        await _log_event(
+        _log_event(
             app,
             {
                 "source": "unipile",
@@ -399,6 +1062,7 @@ async def webhook_unipile(request: Request) -> Dict[str, Any]:
                 "dedupe_key": dedupe_key,
                 "normalized_text": normalized_text,
                 "payload": parsed.raw,
+                "raw_body": parsed.raw_body,
                 "signature": signature,
                 "parse_mode": parsed.parse_mode,
             },
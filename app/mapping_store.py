@@ -0,0 +1,98 @@
+import asyncio
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from app.supabase_client import SupabaseClient
+
+
+MAPPING_COLUMNS = ("chat_id", "attendee_id", "contact_id", "conversation_id", "source_id", "inbox_id")
+
+_SCHEMA = """
+create table if not exists chat_mappings (
+  chat_id text primary key,
+  attendee_id text,
+  contact_id text not null,
+  conversation_id text not null,
+  source_id text,
+  inbox_id text not null,
+  updated_at real not null
+);
+"""
+
+
+class ChatMappingStore(ABC):
+    @abstractmethod
+    async def get(self, chat_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def put(self, mapping: Dict[str, Any]) -> None:
+        ...
+
+    async def close(self) -> None:
+        return None
+
+
+class SupabaseMappingStore(ChatMappingStore):
+    def __init__(self, supabase: SupabaseClient) -> None:
+        self.supabase = supabase
+
+    async def get(self, chat_id: str) -> Optional[Dict[str, Any]]:
+        return await self.supabase.get_chat_mapping(chat_id)
+
+    async def put(self, mapping: Dict[str, Any]) -> None:
+        await self.supabase.upsert_chat_mapping(mapping)
+
+
+class SqliteMappingStore(ChatMappingStore):
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-mappings")
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("pragma journal_mode=wal")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    async def _call(self, fn: Any, *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def _get_sync(self, chat_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            f"select {', '.join(MAPPING_COLUMNS)} from chat_mappings where chat_id = ?",
+            (chat_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(MAPPING_COLUMNS, row))
+
+    def _put_sync(self, mapping: Dict[str, Any]) -> None:
+        values = [mapping.get(column) for column in MAPPING_COLUMNS]
+        self._connection().execute(
+            f"insert or replace into chat_mappings ({', '.join(MAPPING_COLUMNS)}, updated_at) "
+            f"values ({', '.join('?' for _ in MAPPING_COLUMNS)}, ?)",
+            (*values, time.time()),
+        )
+
+    def _close_sync(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def get(self, chat_id: str) -> Optional[Dict[str, Any]]:
+        return await self._call(self._get_sync, chat_id)
+
+    async def put(self, mapping: Dict[str, Any]) -> None:
+        await self._call(self._put_sync, mapping)
+
+    async def close(self) -> None:
+        await self._call(self._close_sync)
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,172 @@
+import bisect
+import math
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in list(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = [0.0] * (len(self.buckets) + 2)
+            self._series[labels] = series
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in list(self._series.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (math.inf,), series[:-1]):
+                cumulative += count
+                label_text = _format_labels(self.labelnames, labels, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{label_text} {_format_value(cumulative)}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{label_text} {_format_value(cumulative)}")
+        return lines
+
+
+class CallbackGauge:
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str],
+        collect: Callable[[], Iterable[Tuple[Labels, float]]],
+    ) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        for labels, value in self.collect():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[Any] = []
+
+    def register(self, metric: Any) -> Any:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+WEBHOOK_DURATION = registry.register(
+    Histogram(
+        "bridge_webhook_duration_seconds",
+        "Time spent handling a webhook request.",
+        ("endpoint",),
+    )
+)
+EVENTS = registry.register(
+    Counter("bridge_events_total", "Webhook outcomes by source and decision.", ("source", "decision"))
+)
+PARSE_MODES = registry.register(
+    Counter("bridge_unipile_parse_total", "Unipile webhook bodies by parse mode.", ("parse_mode",))
+)
+PARSE_PATHS = registry.register(
+    Counter("bridge_unipile_parse_path_total", "Unipile webhook bodies by parser path.", ("path",))
+)
+PARSE_DURATION = registry.register(
+    Histogram(
+        "bridge_unipile_parse_duration_seconds",
+        "Time spent parsing a Unipile webhook body.",
+        ("parse_mode",),
+        buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1),
+    )
+)
+SENDER_DURATION = registry.register(
+    Histogram(
+        "bridge_unipile_sender_duration_seconds",
+        "Time spent handling is_sender Unipile events by lookup mode and outcome.",
+        ("mode", "status"),
+    )
+)
+UPSTREAM_DURATION = registry.register(
+    Histogram(
+        "bridge_upstream_request_duration_seconds",
+        "Latency of individual upstream HTTP attempts.",
+        ("host", "method"),
+    )
+)
+UPSTREAM_REQUESTS = registry.register(
+    Counter(
+        "bridge_upstream_requests_total",
+        "Upstream HTTP attempts by host, method and status.",
+        ("host", "method", "status"),
+    )
+)
+
+
+def flatten_stats(stats: Dict[str, Any], prefix: str = "") -> Iterable[Tuple[str, float]]:
+    for key, value in stats.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, (int, float)):
+            yield name, float(value)
+        elif isinstance(value, dict):
+            yield from flatten_stats(value, f"{name}.")
@@ -15,3 +15,11 @@ class ParsedUnipileEvent:
     timestamp: Optional[str]
     parse_mode: str
     raw: Any
+    raw_body: Optional[str] = None
+
+
+@dataclass
+class ChatResolution:
+    contact_id: str
+    conversation_id: str
+    source_id: Optional[str]
@@ -0,0 +1,118 @@
+import logging
+from typing import Any, Dict, Optional
+
+from app.cache import TTLCache
+from app.chatwoot import ChatwootClient
+from app.logging_utils import log_structured
+from app.mapping_store import ChatMappingStore
+from app.models import ChatResolution
+from app.timing import timed
+
+
+STALE_STATUSES = {404, 422}
+
+
+class ConversationResolver:
+    def __init__(
+        self,
+        chatwoot: ChatwootClient,
+        max_size: int,
+        ttl_seconds: float,
+        store: Optional[ChatMappingStore] = None,
+    ) -> None:
+        self.chatwoot = chatwoot
+        self.store = store
+        self._cache: TTLCache[ChatResolution] = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self._hits = 0
+        self._misses = 0
+        self._store_hits = 0
+        self._store_errors = 0
+        self._invalidations = 0
+
+    async def resolve(
+        self,
+        chat_id: str,
+        name: str,
+        email: str,
+        attendee_id: Optional[str] = None,
+        refresh: bool = False,
+    ) -> ChatResolution:
+        if not refresh:
+            cached = self._cache.get(chat_id)
+            if cached is not None:
+                self._hits += 1
+                return cached
+            with timed("mapping_lookup"):
+                stored = await self._load(chat_id)
+            if stored is not None:
+                self._store_hits += 1
+                self._cache.set(chat_id, stored)
+                return stored
+        self._misses += 1
+        with timed("contact_lookup"):
+            contact = await self.chatwoot.get_or_create_contact(
+                name=name, email=email, chat_id=chat_id
+            )
+        with timed("conversation_lookup"):
+            conversation = await self.chatwoot.get_or_create_conversation(contact)
+        resolution = ChatResolution(
+            contact_id=str(contact.get("id")),
+            conversation_id=str(conversation.get("id")),
+            source_id=self.chatwoot.pick_source_id(contact),
+        )
+        self._cache.set(chat_id, resolution)
+        with timed("mapping_write"):
+            await self._save(chat_id, attendee_id, resolution)
+        return resolution
+
+    def invalidate(self, chat_id: str) -> None:
+        if self._cache.pop(chat_id) is not None:
+            self._invalidations += 1
+
+    async def _load(self, chat_id: str) -> Optional[ChatResolution]:
+        if not self.store:
+            return None
+        try:
+            row = await self.store.get(chat_id)
+        except Exception as exc:  # noqa: BLE001
+            self._store_errors += 1
+            log_structured(logging.ERROR, "chat_mapping_read_failed", chat_id=chat_id, error=str(exc))
+            return None
+        if not row or str(row.get("inbox_id")) != self.chatwoot.inbox_id:
+            return None
+        return ChatResolution(
+            contact_id=str(row["contact_id"]),
+            conversation_id=str(row["conversation_id"]),
+            source_id=row.get("source_id"),
+        )
+
+    async def _save(self, chat_id: str, attendee_id: Optional[str], resolution: ChatResolution) -> None:
+        if not self.store:
+            return
+        mapping: Dict[str, Any] = {
+            "chat_id": chat_id,
+            "attendee_id": attendee_id,
+            "contact_id": resolution.contact_id,
+            "conversation_id": resolution.conversation_id,
+            "source_id": resolution.source_id,
+            "inbox_id": self.chatwoot.inbox_id,
+        }
+        try:
+            await self.store.put(mapping)
+        except Exception as exc:  # noqa: BLE001
+            self._store_errors += 1
+            log_structured(logging.ERROR, "chat_mapping_write_failed", chat_id=chat_id, error=str(exc))
+
+    async def close(self) -> None:
+        if self.store:
+            await self.store.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._cache),
+            "hits": self._hits,
+            "store_hits": self._store_hits,
+            "misses": self._misses,
+            "store_errors": self._store_errors,
+            "invalidations": self._invalidations,
+        }
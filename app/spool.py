@@ -0,0 +1,356 @@
+import asyncio
+import fcntl
+import gzip
+import json
+import logging
+import os
+import time
+import uuid
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from app.logging_utils import log_structured
+
+
+SEGMENT_SUFFIX = ".jsonl.gz"
+LOCK_NAME = ".lock"
+QUARANTINE_DIR = "quarantine"
+PERMANENT_ERRORS = (AttributeError, KeyError, TypeError, ValueError)
+
+Handler = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+
+
+def is_permanent_error(exc: Exception) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return 400 <= status < 500 and status not in (408, 429)
+    return isinstance(exc, PERMANENT_ERRORS)
+
+
+class DiskSpool:
+    def __init__(
+        self,
+        path: str,
+        segment_bytes: int = 1048576,
+        max_bytes: int = 104857600,
+        drain_rate: float = 200.0,
+        drain_interval_seconds: float = 5.0,
+        drain_batch_size: int = 100,
+    ) -> None:
+        self.path = path
+        self.owner = uuid.uuid4().hex[:12]
+        self.directory = os.path.join(path, self.owner)
+        self.segment_bytes = max(1, segment_bytes)
+        self.max_bytes = max(self.segment_bytes, max_bytes)
+        self.drain_rate = max(0.0, drain_rate)
+        self.drain_interval = max(0.1, drain_interval_seconds)
+        self.drain_batch_size = max(1, drain_batch_size)
+        self._handlers: Dict[str, Handler] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="spool")
+        self._segments: Deque[Tuple[str, int]] = deque()
+        self._lock: Optional[IO[str]] = None
+        self._active: Optional[str] = None
+        self._active_bytes = 0
+        self._writes: Set[asyncio.Future] = set()
+        self._drainer: Optional[asyncio.Task] = None
+        self._closed = False
+        self._spooled = 0
+        self._write_errors = 0
+        self._drained = 0
+        self._drain_failures = 0
+        self._drain_seconds_total = 0.0
+        self._last_drain_rate: Optional[float] = None
+        self._dropped_segments = 0
+        self._dropped_bytes = 0
+        self._corrupt_segments = 0
+        self._adopted_segments = 0
+        self._quarantined = 0
+
+    def register(self, kind: str, handler: Handler) -> None:
+        self._handlers[kind] = handler
+
+    async def open(self) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._open_sync)
+        self._drainer = asyncio.create_task(self._drain_loop())
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._drainer:
+            self._drainer.cancel()
+            await asyncio.gather(self._drainer, return_exceptions=True)
+            self._drainer = None
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._release_sync)
+        self._executor.shutdown(wait=True)
+
+    def put(self, kind: str, rows: List[Dict[str, Any]]) -> None:
+        if not rows or self._closed:
+            return
+        spooled_at = time.time()
+        lines = [
+            json.dumps({"kind": kind, "row": row, "spooled_at": spooled_at}, default=str) + "\n"
+            for row in rows
+        ]
+        future = asyncio.get_running_loop().run_in_executor(self._executor, self._write_sync, lines)
+        self._writes.add(future)
+        future.add_done_callback(self._write_done)
+        self._spooled += len(rows)
+
+    def _write_done(self, future: asyncio.Future) -> None:
+        self._writes.discard(future)
+        if future.cancelled():
+            return
+        exc = future.exception()
+        if exc is not None:
+            self._write_errors += 1
+            log_structured(logging.ERROR, "spool_write_failed", error=str(exc))
+
+    def _open_sync(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = open(os.path.join(self.directory, LOCK_NAME), "w")
+        fcntl.flock(self._lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._adopt_sync()
+
+    def _release_sync(self) -> None:
+        if self._lock is None:
+            return
+        if not self._segments and self._active is None:
+            self._remove(os.path.join(self.directory, LOCK_NAME))
+            try:
+                os.rmdir(self.directory)
+            except OSError:
+                pass
+        self._lock.close()
+        self._lock = None
+
+    def _adopt_sync(self) -> None:
+        # segments of live workers stay put: their owner holds the directory lock
+        adopted = self._claim_sync(self.path)
+        for name in sorted(os.listdir(self.path)):
+            directory = os.path.join(self.path, name)
+            if name in (self.owner, QUARANTINE_DIR) or not os.path.isdir(directory):
+                continue
+            try:
+                fd = os.open(os.path.join(directory, LOCK_NAME), os.O_RDWR)
+            except OSError:
+                continue
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                adopted.extend(self._claim_sync(directory))
+                for leftover in os.listdir(directory):
+                    if leftover.endswith(".tmp"):
+                        self._remove(os.path.join(directory, leftover))
+                self._remove(os.path.join(directory, LOCK_NAME))
+                os.rmdir(directory)
+            except OSError:
+                pass
+            finally:
+                os.close(fd)
+        if adopted:
+            segments = sorted(list(self._segments) + adopted, key=lambda item: os.path.basename(item[0]))
+            self._segments = deque(segments)
+            self._adopted_segments += len(adopted)
+            log_structured(logging.INFO, "spool_segments_adopted", owner=self.owner, segments=len(adopted))
+
+    def _claim_sync(self, directory: str) -> List[Tuple[str, int]]:
+        claimed: List[Tuple[str, int]] = []
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(SEGMENT_SUFFIX):
+                continue
+            target = os.path.join(self.directory, name)
+            while os.path.exists(target):
+                created_ns = int(os.path.basename(target)[: -len(SEGMENT_SUFFIX)]) + 1
+                target = os.path.join(self.directory, f"{created_ns:020d}{SEGMENT_SUFFIX}")
+            try:
+                os.rename(os.path.join(directory, name), target)
+            except FileNotFoundError:
+                continue
+            claimed.append((target, os.path.getsize(target)))
+        return claimed
+
+    def _write_sync(self, lines: List[str]) -> None:
+        if self._active is None or self._active_bytes >= self.segment_bytes:
+            self._rotate_sync()
+            self._active = os.path.join(self.directory, f"{time.time_ns():020d}{SEGMENT_SUFFIX}")
+        with gzip.open(self._active, "at", encoding="utf-8") as handle:
+            handle.writelines(lines)
+        self._active_bytes = os.path.getsize(self._active)
+        self._enforce_cap_sync()
+
+    def _rotate_sync(self) -> None:
+        if self._active is not None:
+            self._segments.append((self._active, self._active_bytes))
+        self._active = None
+        self._active_bytes = 0
+
+    def _enforce_cap_sync(self) -> None:
+        while self._segments and self._total_bytes() > self.max_bytes:
+            segment, size = self._segments.popleft()
+            self._remove(segment)
+            self._dropped_segments += 1
+            self._dropped_bytes += size
+            log_structured(logging.ERROR, "spool_segment_dropped", segment=segment, bytes=size)
+
+    def _total_bytes(self) -> int:
+        return self._active_bytes + sum(size for _, size in self._segments)
+
+    def _read_sync(self, segment: str) -> List[Dict[str, Any]]:
+        records: List[Dict[str, Any]] = []
+        try:
+            with gzip.open(segment, "rt", encoding="utf-8") as handle:
+                for line in handle:
+                    records.append(json.loads(line))
+        except (OSError, EOFError, zlib.error, ValueError) as exc:
+            self._corrupt_segments += 1
+            log_structured(
+                logging.ERROR,
+                "spool_segment_corrupt",
+                segment=segment,
+                recovered=len(records),
+                error=str(exc),
+            )
+        return records
+
+    def _rewrite_sync(self, segment: str, records: List[Dict[str, Any]]) -> None:
+        temp = f"{segment}.tmp"
+        with gzip.open(temp, "wt", encoding="utf-8") as handle:
+            handle.writelines(json.dumps(record, default=str) + "\n" for record in records)
+        os.replace(temp, segment)
+        self._segments.appendleft((segment, os.path.getsize(segment)))
+
+    def _next_segment_sync(self) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        if not self._segments:
+            self._rotate_sync()
+        if not self._segments:
+            return None
+        segment, _ = self._segments.popleft()
+        return segment, self._read_sync(segment)
+
+    def _remove(self, segment: str) -> None:
+        try:
+            os.remove(segment)
+        except FileNotFoundError:
+            pass
+
+    async def _drain_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.drain_interval)
+            try:
+                await self._drain()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # noqa: BLE001
+                log_structured(logging.ERROR, "spool_drain_failed", error=str(exc))
+
+    async def _drain(self) -> None:
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        drained = 0
+        await loop.run_in_executor(self._executor, self._adopt_sync)
+        while True:
+            segment = await loop.run_in_executor(self._executor, self._next_segment_sync)
+            if segment is None:
+                break
+            path, records = segment
+            try:
+                sent = await self._replay(records)
+            except asyncio.CancelledError:
+                self._segments.appendleft((path, os.path.getsize(path)))
+                raise
+            drained += sent
+            if sent < len(records):
+                if sent:
+                    await loop.run_in_executor(self._executor, self._rewrite_sync, path, records[sent:])
+                else:
+                    self._segments.appendleft((path, os.path.getsize(path)))
+                break
+            await loop.run_in_executor(self._executor, self._remove, path)
+        if drained:
+            elapsed = time.perf_counter() - started
+            self._drained += drained
+            self._drain_seconds_total += elapsed
+            self._last_drain_rate = drained / elapsed if elapsed else None
+            log_structured(logging.INFO, "spool_drained", records=drained, seconds=round(elapsed, 3))
+
+    async def _replay(self, records: List[Dict[str, Any]]) -> int:
+        sent = 0
+        while sent < len(records):
+            kind = records[sent].get("kind")
+            chunk = []
+            for record in records[sent : sent + self.drain_batch_size]:
+                if record.get("kind") != kind:
+                    break
+                chunk.append(record.get("row") or {})
+            handler = self._handlers.get(kind)
+            started = time.perf_counter()
+            if handler is not None:
+                try:
+                    await handler(chunk)
+                except Exception as exc:  # noqa: BLE001
+                    if not is_permanent_error(exc):
+                        self._drain_failures += 1
+                        log_structured(logging.WARNING, "spool_replay_failed", kind=kind, error=str(exc))
+                        return sent
+                    try:
+                        await self._quarantine(records[sent : sent + len(chunk)], exc)
+                    except OSError as write_exc:
+                        self._drain_failures += 1
+                        log_structured(logging.ERROR, "spool_quarantine_failed", kind=kind, error=str(write_exc))
+                        return sent
+            sent += len(chunk)
+            if self.drain_rate:
+                await asyncio.sleep(max(0.0, len(chunk) / self.drain_rate - (time.perf_counter() - started)))
+        return sent
+
+    async def _quarantine(self, records: List[Dict[str, Any]], exc: Exception) -> None:
+        loop = asyncio.get_running_loop()
+        segment = await loop.run_in_executor(self._executor, self._quarantine_sync, records)
+        self._quarantined += len(records)
+        log_structured(
+            logging.ERROR,
+            "spool_replay_quarantined",
+            kind=records[0].get("kind"),
+            records=len(records),
+            segment=segment,
+            error=str(exc),
+        )
+
+    def _quarantine_sync(self, records: List[Dict[str, Any]]) -> str:
+        directory = os.path.join(self.path, QUARANTINE_DIR)
+        os.makedirs(directory, exist_ok=True)
+        segment = os.path.join(directory, f"{time.time_ns():020d}-{self.owner}{SEGMENT_SUFFIX}")
+        with gzip.open(segment, "wt", encoding="utf-8") as handle:
+            handle.writelines(json.dumps(record, default=str) + "\n" for record in records)
+        return segment
+
+    def stats(self) -> Dict[str, Any]:
+        segments = list(self._segments)
+        oldest = segments[0][0] if segments else self._active
+        oldest_age = None
+        if oldest:
+            created_ns = int(os.path.basename(oldest)[: -len(SEGMENT_SUFFIX)])
+            oldest_age = max(0.0, time.time() - created_ns / 1e9)
+        avg_rate = self._drained / self._drain_seconds_total if self._drain_seconds_total else None
+        return {
+            "segments": len(segments) + (1 if self._active else 0),
+            "bytes": self._total_bytes(),
+            "oldest_age_seconds": oldest_age,
+            "spooled": self._spooled,
+            "pending_writes": len(self._writes),
+            "write_errors": self._write_errors,
+            "drained": self._drained,
+            "drain_failures": self._drain_failures,
+            "drain_records_per_second": avg_rate,
+            "last_drain_records_per_second": self._last_drain_rate,
+            "dropped_segments": self._dropped_segments,
+            "dropped_bytes": self._dropped_bytes,
+            "corrupt_segments": self._corrupt_segments,
+            "adopted_segments": self._adopted_segments,
+            "quarantined": self._quarantined,
+        }
@@ -1,21 +1,44 @@
 import datetime as dt
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
-import httpx
+from app.http_client import (
+    ConnectionStats,
+    HttpPoolConfig,
+    RetryPolicy,
+    RetryPolicyConfig,
+    create_async_client,
+    request_with_retries,
+    warm_up,
+)
 
-from app.http_client import request_with_retries
+
+def _postgrest_quote(value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
 
 
 class SupabaseClient:
-    def __init__(self, base_url: str, api_key: str, timeout: float, retries: int) -> None:
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        http: HttpPoolConfig,
+        retries: int,
+        retry_config: Optional[RetryPolicyConfig] = None,
+    ) -> None:
         self.base_url = base_url.rstrip("/")
         self.api_key = api_key
         self.retries = retries
-        self._client = httpx.AsyncClient(timeout=timeout)
+        self.retry_policy = RetryPolicy("supabase", retry_config)
+        self.connection_stats = ConnectionStats("supabase")
+        self._client = create_async_client(http, self.connection_stats)
 
     async def close(self) -> None:
         await self._client.aclose()
 
+    async def warm_up(self, connections: int) -> None:
+        await warm_up(self._client, f"{self.base_url}/rest/v1/", connections, "supabase")
+
     def _headers(self) -> Dict[str, str]:
         return {
             "apikey": self.api_key,
@@ -30,6 +53,7 @@ class SupabaseClient:
         params: Optional[Dict[str, str]] = None,
         json: Optional[Any] = None,
         headers: Optional[Dict[str, str]] = None,
+        idempotent: Optional[bool] = None,
     ) -> Any:
         url = f"{self.base_url}/rest/v1/{path.lstrip('/')}"
         merged_headers = self._headers()
@@ -40,6 +64,8 @@ class SupabaseClient:
             method,
             url,
             self.retries,
+            policy=self.retry_policy,
+            idempotent=idempotent,
             params=params,
             json=json,
             headers=merged_headers,
@@ -58,12 +84,18 @@ class SupabaseClient:
             "normalized_text": normalized_text,
             "expires_at": expires_at.isoformat(),
         }
+        await self.upsert_dedupe_rows([payload])
+
+    async def upsert_dedupe_rows(self, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
         await self._request(
             "POST",
             "dedupe_cache",
             params={"on_conflict": "dedupe_key"},
-            json=[payload],
+            json=rows,
             headers={"Prefer": "resolution=merge-duplicates,return=minimal"},
+            idempotent=True,
         )
 
     async def is_deduped(self, dedupe_key: str, now: dt.datetime) -> bool:
@@ -75,10 +107,118 @@ class SupabaseClient:
         data = await self._request("GET", "dedupe_cache", params=params)
         return bool(data)
 
+    async def deduped_keys(self, dedupe_keys: List[str], now: dt.datetime) -> List[str]:
+        if not dedupe_keys:
+            return []
+        quoted = ",".join(_postgrest_quote(key) for key in dedupe_keys)
+        params = {
+            "dedupe_key": f"in.({quoted})",
+            "expires_at": f"gt.{now.isoformat()}",
+            "select": "dedupe_key",
+        }
+        data = await self._request("GET", "dedupe_cache", params=params)
+        return [row["dedupe_key"] for row in data or []]
+
+    async def check_and_set_dedupe(
+        self, dedupe_key: str, chat_id: str, normalized_text: str, expires_at: dt.datetime
+    ) -> bool:
+        data = await self._request(
+            "POST",
+            "rpc/dedupe_check_and_set",
+            json={
+                "p_dedupe_key": dedupe_key,
+                "p_chat_id": chat_id,
+                "p_normalized_text": normalized_text,
+                "p_expires_at": expires_at.isoformat(),
+            },
+            idempotent=False,
+        )
+        return bool(data)
+
+    async def claim_webhook(
+        self, webhook_key: str, source: str, expires_at: dt.datetime, now: dt.datetime
+    ) -> bool:
+        row = {"webhook_key": webhook_key, "source": source, "expires_at": expires_at.isoformat()}
+        data = await self._request(
+            "POST",
+            "processed_webhooks",
+            params={"on_conflict": "webhook_key"},
+            json=[row],
+            headers={"Prefer": "resolution=ignore-duplicates,return=representation"},
+        )
+        if data:
+            return True
+        data = await self._request(
+            "PATCH",
+            "processed_webhooks",
+            params={"webhook_key": f"eq.{webhook_key}", "expires_at": f"lt.{now.isoformat()}"},
+            json={"source": source, "expires_at": expires_at.isoformat(), "delivered_at": None},
+            headers={"Prefer": "return=representation"},
+            idempotent=False,
+        )
+        return bool(data)
+
+    async def get_webhook_claim(self, webhook_key: str, now: dt.datetime) -> Optional[Dict[str, Any]]:
+        params = {
+            "webhook_key": f"eq.{webhook_key}",
+            "expires_at": f"gt.{now.isoformat()}",
+            "select": "webhook_key,delivered_at",
+        }
+        data = await self._request("GET", "processed_webhooks", params=params)
+        if isinstance(data, list) and data:
+            return data[0]
+        return None
+
+    async def mark_webhook_delivered(self, webhook_key: str, delivered_at: dt.datetime) -> None:
+        await self._request(
+            "PATCH",
+            "processed_webhooks",
+            params={"webhook_key": f"eq.{webhook_key}"},
+            json={"delivered_at": delivered_at.isoformat()},
+            headers={"Prefer": "return=minimal"},
+            idempotent=True,
+        )
+
+    async def release_webhook(self, webhook_key: str) -> None:
+        await self._request(
+            "DELETE",
+            "processed_webhooks",
+            params={"webhook_key": f"eq.{webhook_key}"},
+            headers={"Prefer": "return=minimal"},
+        )
+
+    async def get_chat_mapping(self, chat_id: str) -> Optional[Dict[str, Any]]:
+        params = {"chat_id": f"eq.{chat_id}", "select": "*"}
+        data = await self._request("GET", "chat_mappings", params=params)
+        if isinstance(data, list) and data:
+            return data[0]
+        return None
+
+    async def upsert_chat_mapping(self, mapping: Dict[str, Any]) -> None:
+        payload = dict(mapping)
+        payload["updated_at"] = dt.datetime.now(tz=dt.timezone.utc).isoformat()
+        await self._request(
+            "POST",
+            "chat_mappings",
+            params={"on_conflict": "chat_id"},
+            json=[payload],
+            headers={"Prefer": "resolution=merge-duplicates,return=minimal"},
+            idempotent=True,
+        )
+
     async def log_event(self, event: Dict[str, Any]) -> None:
+        await self.log_events([event])
+
+    async def log_events(self, events: List[Dict[str, Any]]) -> None:
+        if not events:
+            return
+        columns: Dict[str, None] = {}
+        for event in events:
+            columns.update(dict.fromkeys(event))
+        rows = [{column: event.get(column) for column in columns} for event in events]
         await self._request(
             "POST",
             "event_logs",
-            json=[event],
+            json=rows,
             headers={"Prefer": "return=minimal"},
         )
@@ -0,0 +1,47 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+
+class StageTimer:
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self._mark = self.started
+        self._stages: Dict[str, float] = {}
+
+    def _add(self, name: str, seconds: float) -> None:
+        self._stages[name] = self._stages.get(name, 0.0) + seconds
+
+    def mark(self) -> None:
+        self._mark = time.perf_counter()
+
+    def since_mark(self, name: str) -> None:
+        self._add(name, time.perf_counter() - self._mark)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._mark = time.perf_counter()
+            self._add(name, self._mark - started)
+
+    def as_dict(self) -> Dict[str, float]:
+        timings = {name: round(seconds * 1000, 3) for name, seconds in self._stages.items()}
+        timings["total"] = round((time.perf_counter() - self.started) * 1000, 3)
+        return timings
+
+
+current_timer: ContextVar[Optional[StageTimer]] = ContextVar("current_timer", default=None)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    timer = current_timer.get()
+    if timer is None:
+        yield
+        return
+    with timer.stage(name):
+        yield
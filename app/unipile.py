@@ -1,60 +1,221 @@
+import importlib.util
 import json
 import re
-from typing import Any, Dict, Optional
+from json.decoder import JSONDecoder, scanstring
+from json.scanner import make_scanner
+from typing import Any, Dict, List, Optional, Tuple
 from urllib.parse import parse_qsl
 
-import httpx
-
-from app.http_client import request_with_retries
+from app.http_client import (
+    ConnectionStats,
+    HttpPoolConfig,
+    RetryPolicy,
+    RetryPolicyConfig,
+    create_async_client,
+    request_with_retries,
+    warm_up,
+)
+from app.metrics import PARSE_PATHS
 from app.models import ParsedUnipileEvent
 
 
+if importlib.util.find_spec("orjson") is not None:
+    import orjson
+
+    JSON_DECODER = "orjson"
+    _loads_bytes = orjson.loads
+else:
+    JSON_DECODER = "json"
+    _loads_bytes = json.loads
+
+
+_WHITESPACE = " \t\r\n"
+_SKIP_WHITESPACE = re.compile(r"[ \t\r\n]*")
+_PLAIN_PAIR = re.compile(r'[ \t\r\n]*"([^"\\]*)"[ \t\r\n]*:[ \t\r\n]*"([^"\\]*)"[ \t\r\n]*,')
+_PLAIN_KEY = re.compile(r'[ \t\r\n]*"([^"\\]*)"[ \t\r\n]*(:?)[ \t\r\n]*')
+_FALLBACK_FIELD = re.compile(r'"([A-Za-z_]+)"[ \t\r\n]*:[ \t\r\n]*')
+_FALLBACK_BOOL = re.compile(r"true|false|1|0", re.IGNORECASE)
+_FALLBACK_KEYS = {
+    "attendee_name",
+    "attendee_id",
+    "message",
+    "chat_id",
+    "is_sender",
+    "message_id",
+    "provider_message_id",
+    "event",
+    "timestamp",
+}
+
+
+_SCAN_VALUE = make_scanner(JSONDecoder(strict=False))
+
+
+class _ScanError(ValueError):
+    pass
+
+
+class _LenientScanner:
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.pos = 0
+
+    def parse(self) -> Any:
+        try:
+            value = self._value()
+        except RecursionError as exc:
+            raise _ScanError("payload nested too deeply") from exc
+        if self._peek():
+            raise _ScanError(f"trailing data at {self.pos}")
+        return value
+
+    def _peek(self) -> str:
+        text = self.text
+        pos = self.pos
+        if pos < len(text) and text[pos] not in _WHITESPACE:
+            return text[pos]
+        self.pos = pos = _SKIP_WHITESPACE.match(text, pos).end()
+        return text[pos] if pos < len(text) else ""
+
+    def _value(self, depth: int = 0) -> Any:
+        char = self._peek()
+        if depth == 1 and char in "{[":
+            try:
+                value, self.pos = _SCAN_VALUE(self.text, self.pos)
+                return value
+            except (StopIteration, ValueError, RecursionError):
+                pass
+        if char == "{":
+            return self._object(depth)
+        if char == "[":
+            return self._array(depth)
+        try:
+            value, self.pos = _SCAN_VALUE(self.text, self.pos)
+        except StopIteration as exc:
+            raise _ScanError(f"unexpected {char!r} at {self.pos}") from exc
+        except ValueError as exc:
+            # literals like 01 or 00.000 left behind by a broken timestamp
+            raise _ScanError(str(exc)) from exc
+        return value
+
+    def _string(self) -> str:
+        try:
+            value, self.pos = scanstring(self.text, self.pos + 1, False)
+        except ValueError as exc:
+            raise _ScanError(str(exc)) from exc
+        return value
+
+    def _key(self) -> Tuple[Optional[str], bool]:
+        match = _PLAIN_KEY.match(self.text, self.pos)
+        if match is not None:
+            self.pos = match.end()
+            return match.group(1), bool(match.group(2))
+        char = self._peek()
+        if char == "}":
+            return None, False
+        if char != '"':
+            raise _ScanError(f"expected key at {self.pos}")
+        key = self._string()
+        if self._peek() != ":":
+            return key, False
+        self.pos += 1
+        return key, True
+
+    def _object(self, depth: int) -> Dict[str, Any]:
+        self.pos += 1
+        result: Dict[str, Any] = {}
+        fragments: Dict[str, List[str]] = {}
+        last_key: Optional[str] = None
+        while True:
+            match = _PLAIN_PAIR.match(self.text, self.pos)
+            if match is not None:
+                key, value = match.groups()
+                result[key] = value
+                if fragments:
+                    fragments.pop(key, None)
+                last_key = key
+                self.pos = match.end()
+                continue
+            key, has_value = self._key()
+            if key is None:
+                self.pos += 1
+                break
+            if has_value:
+                value = self._value(depth + 1)
+                char = self._peek()
+                if char == ":" and isinstance(value, str):
+                    # "provider_chat_id":"abc":"def" -> "abcdef"
+                    parts = [value]
+                    while char == ":":
+                        self.pos += 1
+                        extra = self._value(depth + 1)
+                        if not isinstance(extra, str):
+                            raise _ScanError(f"broken string value at {self.pos}")
+                        parts.append(extra)
+                        char = self._peek()
+                    value = "".join(parts)
+                result[key] = value
+                fragments.pop(key, None)
+                last_key = key
+            elif last_key is not None and isinstance(result.get(last_key), str):
+                # "occupation":"X":"","Y", -> "XY"
+                fragments.setdefault(last_key, [result[last_key]]).append(key)
+                char = self._peek()
+            else:
+                raise _ScanError(f"expected ':' at {self.pos}")
+            if char == ",":
+                self.pos += 1
+            elif char == "}":
+                self.pos += 1
+                break
+            else:
+                raise _ScanError(f"expected ',' or '}}' at {self.pos}")
+        for key, parts in fragments.items():
+            result[key] = "".join(parts)
+        return result
+
+    def _array(self, depth: int) -> List[Any]:
+        self.pos += 1
+        result: List[Any] = []
+        while True:
+            char = self._peek()
+            if char == "]":
+                self.pos += 1
+                return result
+            result.append(self._value(depth + 1))
+            char = self._peek()
+            if char == ",":
+                self.pos += 1
+            elif char != "]":
+                raise _ScanError(f"expected ',' or ']' at {self.pos}")
+
+
 def _unwrap_body_string(raw: str) -> str:
     out = raw.strip()
-    if out.startswith('"') and out.endswith('"'):
+    if len(out) >= 2 and out.startswith('"') and out.endswith('"'):
         out = out[1:-1]
-    out = re.sub(r"^\s*\{\s*\"\{", "{", out)
-    out = re.sub(r"\}\"\s*\}\s*$", "}", out)
+    head = out.lstrip()
+    if head.startswith("{") and head[1:].lstrip().startswith('"{'):
+        out = "{" + head[1:].lstrip()[2:]
+    tail = out.rstrip()
+    if tail.endswith("}") and tail[:-1].rstrip().endswith('}"'):
+        out = tail[:-1].rstrip()[:-2] + "}"
     out = out.replace('\\"', '"')
     return out.strip()
 
 
-def _fix_known_breaks(raw: str) -> str:
-    s = raw
-    s = re.sub(
-        r'"provider_chat_id"\s*:\s*"([^"]+)"\s*:\s*"([^"]*)"\s*,',
-        lambda m: f'"provider_chat_id":"{m.group(1)}{m.group(2)}",',
-        s,
-    )
-    s = re.sub(
-        r'"occupation"\s*:\s*"([^"]*?)"\s*:\s*""\s*,\s*"([^"]*?)"\s*,',
-        lambda m: f'"occupation":"{m.group(1)}{m.group(2)}",',
-        s,
-    )
-    return s
-
-
 def _safe_json_parse(raw: str) -> Optional[Any]:
     try:
         return json.loads(raw)
-    except json.JSONDecodeError:
-        return None
-
-
-def _regex_pick(raw: str, key: str) -> Optional[str]:
-    match = re.search(rf'"{re.escape(key)}"\s*:\s*"([^"]*)"', raw, re.IGNORECASE)
-    if not match:
+    except (json.JSONDecodeError, RecursionError):
         return None
-    value = match.group(1)
-    return value
 
 
-def _regex_pick_bool(raw: str, key: str) -> Optional[bool]:
-    match = re.search(rf'"{re.escape(key)}"\s*:\s*(true|false|1|0)', raw, re.IGNORECASE)
-    if not match:
+def _lenient_parse(raw: str) -> Optional[Any]:
+    try:
+        return _LenientScanner(raw).parse()
+    except _ScanError:
         return None
-    value = match.group(1).lower()
-    return value in {"true", "1"}
 
 
 def _unescape_message(value: Optional[str]) -> Optional[str]:
@@ -111,75 +272,150 @@ def _extract_from_payload(payload: Dict[str, Any], parsed: Dict[str, Any], parse
     )
 
 
-def _fallback_extract(raw: str) -> ParsedUnipileEvent:
-    attendee_name = _regex_pick(raw, "attendee_name")
-    attendee_id = _regex_pick(raw, "attendee_id")
+def _fallback_fields(raw: str) -> Dict[str, Any]:
+    found: Dict[str, Any] = {}
+    for match in _FALLBACK_FIELD.finditer(raw):
+        key = match.group(1).lower()
+        if key not in _FALLBACK_KEYS or key in found:
+            continue
+        pos = match.end()
+        if key == "is_sender":
+            value = _FALLBACK_BOOL.match(raw, pos)
+            if value:
+                found[key] = value.group(0).lower() in {"true", "1"}
+        elif raw.startswith('"', pos):
+            end = raw.find('"', pos + 1)
+            if end < 0:
+                break
+            found[key] = raw[pos + 1 : end]
+        if len(found) == len(_FALLBACK_KEYS):
+            break
+    return found
 
-    message = _regex_pick(raw, "message")
-    message = _unescape_message(message)
 
+def _fallback_extract(raw: str) -> ParsedUnipileEvent:
+    fields = _fallback_fields(raw)
     return ParsedUnipileEvent(
-        chat_id=_regex_pick(raw, "chat_id"),
-        message=message,
-        is_sender=_regex_pick_bool(raw, "is_sender"),
-        attendee_name=attendee_name,
-        attendee_id=attendee_id,
-        message_id=_regex_pick(raw, "message_id"),
-        provider_message_id=_regex_pick(raw, "provider_message_id"),
-        event=_regex_pick(raw, "event"),
-        timestamp=_regex_pick(raw, "timestamp"),
+        chat_id=fields.get("chat_id"),
+        message=_unescape_message(fields.get("message")),
+        is_sender=fields.get("is_sender"),
+        attendee_name=fields.get("attendee_name"),
+        attendee_id=fields.get("attendee_id"),
+        message_id=fields.get("message_id"),
+        provider_message_id=fields.get("provider_message_id"),
+        event=fields.get("event"),
+        timestamp=fields.get("timestamp"),
         parse_mode="regex_fallback",
         raw=raw[:1000],
     )
 
 
+def _form_candidate(raw: str) -> Optional[str]:
+    for key, value in parse_qsl(raw, keep_blank_values=True):
+        key = key.strip()
+        if key.startswith("{"):
+            return key
+        value = value.strip()
+        if value.startswith("{"):
+            return value
+    return None
+
+
+def _is_json_content_type(content_type: Optional[str]) -> bool:
+    if not content_type:
+        return False
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return media_type.endswith("/json") or media_type.endswith("+json")
+
+
+def _decode_json_bytes(body: bytes) -> Optional[Any]:
+    try:
+        return _loads_bytes(body)
+    except (ValueError, RecursionError):
+        return None
+
+
+def _parse_candidate(candidate: str, strict: bool = True) -> Tuple[Optional[Any], str, str, str]:
+    wrapped = not candidate.startswith("{") or candidate.startswith('{"{')
+    parsed = _safe_json_parse(candidate) if strict and not wrapped else None
+    if isinstance(parsed, dict):
+        return parsed, "json", "json", candidate
+    unwrapped = _unwrap_body_string(candidate)
+    if unwrapped != candidate:
+        parsed = _safe_json_parse(unwrapped)
+        if isinstance(parsed, dict):
+            return parsed, "json", "unwrapped", unwrapped
+    return _lenient_parse(unwrapped), "json_fixed", "lenient", unwrapped
+
+
+def _extract_event(parsed: Dict[str, Any], parse_mode: str, path: str) -> ParsedUnipileEvent:
+    PARSE_PATHS.inc(path)
+    payload = parsed.get("data") if isinstance(parsed.get("data"), dict) else parsed
+    return _extract_from_payload(payload, parsed, parse_mode)
+
+
 def parse_unipile_webhook(body: bytes, content_type: Optional[str]) -> ParsedUnipileEvent:
+    fast = _is_json_content_type(content_type)
+    if fast:
+        parsed = _decode_json_bytes(body)
+        if isinstance(parsed, dict):
+            return _extract_event(parsed, "json", "json_fast")
+
     raw = body.decode("utf-8", errors="replace").strip()
-    candidates = []
-
-    if raw:
-        candidates.append(raw)
-
-    if raw:
-        pairs = parse_qsl(raw, keep_blank_values=True)
-        for key, value in pairs:
-            key = key.strip()
-            value = value.strip()
-            if key.startswith("{"):
-                candidates.append(key)
-            if value.startswith("{"):
-                candidates.append(value)
-
-    seen = set()
-    for candidate in candidates:
-        if candidate in seen:
-            continue
-        seen.add(candidate)
-        unwrapped = _unwrap_body_string(candidate)
-        parsed = _safe_json_parse(unwrapped)
-        parse_mode = "json"
-        if parsed is None:
-            fixed = _fix_known_breaks(unwrapped)
-            parsed = _safe_json_parse(fixed)
-            parse_mode = "json_fixed"
+    fallback_text = raw
+    if raw and raw[0] in "{\"":
+        parsed, parse_mode, path, fallback_text = _parse_candidate(raw, strict=not fast)
+        if isinstance(parsed, dict):
+            return _keep_raw_body(_extract_event(parsed, parse_mode, path), raw)
 
+    form = _form_candidate(raw) if raw else None
+    if form is not None and form != raw:
+        parsed, parse_mode, _, _ = _parse_candidate(form)
         if isinstance(parsed, dict):
-            payload = parsed.get("data") if isinstance(parsed.get("data"), dict) else parsed
-            return _extract_from_payload(payload, parsed, parse_mode)
+            return _keep_raw_body(_extract_event(parsed, parse_mode, "form"), raw)
+
+    PARSE_PATHS.inc("fallback")
+    fallback = _fallback_extract(fallback_text if fallback_text.startswith(("{", '"{')) else raw)
+    return _keep_raw_body(fallback, raw)
+
 
-    return _fallback_extract(raw)
+def _keep_raw_body(event: ParsedUnipileEvent, raw: str) -> ParsedUnipileEvent:
+    # repaired bodies are logged as parsed; keep the original to rebuild the parser corpus
+    if event.parse_mode != "json":
+        event.raw_body = raw[:1000]
+    return event
+
+
+def sent_message_ids(response: Dict[str, Any]) -> List[str]:
+    return [
+        str(response[key])
+        for key in ("message_id", "provider_message_id", "id")
+        if isinstance(response, dict) and response.get(key)
+    ]
 
 
 class UnipileClient:
-    def __init__(self, base_url: str, api_key: str, timeout: float, retries: int) -> None:
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        http: HttpPoolConfig,
+        retries: int,
+        retry_config: Optional[RetryPolicyConfig] = None,
+    ) -> None:
         self.base_url = base_url.rstrip("/")
         self.api_key = api_key
         self.retries = retries
-        self._client = httpx.AsyncClient(timeout=timeout)
+        self.retry_policy = RetryPolicy("unipile", retry_config)
+        self.connection_stats = ConnectionStats("unipile")
+        self._client = create_async_client(http, self.connection_stats)
 
     async def close(self) -> None:
         await self._client.aclose()
 
+    async def warm_up(self, connections: int) -> None:
+        await warm_up(self._client, self.base_url, connections, "unipile")
+
     async def send_message(self, chat_id: str, text: str) -> Dict[str, Any]:
         url = f"{self.base_url}/chats/{chat_id}/messages"
         headers = {
@@ -191,6 +427,7 @@ class UnipileClient:
             "POST",
             url,
             self.retries,
+            policy=self.retry_policy,
             headers=headers,
             files={"text": (None, text)},
         )
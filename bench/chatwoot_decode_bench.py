@@ -0,0 +1,96 @@
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict
+
+from app import chatwoot_payload
+from app.chatwoot_payload import decode_chatwoot_webhook
+
+
+def build_payload(attachments: int) -> Dict[str, Any]:
+    contact = {
+        "id": 42,
+        "name": "Maria Souza",
+        "email": "maria@example.com",
+        "phone_number": None,
+        "thumbnail": "https://chatwoot.example.com/rails/active_storage/representations/abc.png",
+        "additional_attributes": {"company_name": "ACME", "city": "São Paulo", "social_profiles": {}},
+        "custom_attributes": {"chat_id": "chat_123", "attendee_id": "att_1"},
+    }
+    return {
+        "event": "message_created",
+        "id": 987654,
+        "message_type": "outgoing",
+        "content_type": "text",
+        "content": "Olá Maria, obrigado pelo contato! Segue o material que combinamos.",
+        "content_attributes": {},
+        "created_at": "2024-05-01T12:00:00.000Z",
+        "private": False,
+        "source_id": None,
+        "account": {"id": 1, "name": "ACME"},
+        "inbox": {"id": 3, "name": "LinkedIn"},
+        "sender": {"id": 5, "name": "Agente", "email": "agente@example.com", "type": "user"},
+        "attachments": [
+            {"id": index, "file_type": "file", "data_url": f"https://files.example.com/{index}.pdf", "file_size": 123456}
+            for index in range(attachments)
+        ],
+        "conversation": {
+            "id": 555,
+            "inbox_id": 3,
+            "status": "open",
+            "channel": "Channel::Api",
+            "can_reply": True,
+            "contact_inbox": {"id": 77, "contact_id": 42, "inbox_id": 3, "source_id": "b5b3c9f0-1f0a"},
+            "additional_attributes": {},
+            "custom_attributes": {},
+            "labels": ["linkedin", "lead"],
+            "messages": [{"id": 987653, "content": "mensagem anterior " * 10, "message_type": 0}],
+            "meta": {"sender": contact, "assignee": {"id": 5, "name": "Agente"}, "hmac_verified": False},
+            "timestamp": 1714564800,
+            "unread_count": 0,
+        },
+    }
+
+
+def _full_decode(body: bytes) -> Any:
+    payload = json.loads(body)
+    conversation = payload.get("conversation") or {}
+    meta_sender = (conversation.get("meta") or {}).get("sender") or {}
+    custom_attributes = meta_sender.get("custom_attributes") or {}
+    return payload.get("event"), payload.get("message_type"), payload.get("content"), custom_attributes.get("chat_id")
+
+
+def _time(fn: Callable[[bytes], Any], body: bytes, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(body)
+    return (time.perf_counter() - started) / iterations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare full and partial decoding of Chatwoot webhooks.")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    decoders = {
+        "full json.loads": _full_decode,
+        "partial (stdlib)": chatwoot_payload._decode_stdlib,
+    }
+    if chatwoot_payload.MSGSPEC_AVAILABLE:
+        decoders["partial (msgspec)"] = decode_chatwoot_webhook
+        decoders["partial + lazy payload"] = lambda body: decode_chatwoot_webhook(body).payload
+
+    for attachments in (0, 10, 100):
+        body = json.dumps(build_payload(attachments)).encode("utf-8")
+        timings = {name: _time(fn, body, args.iterations) for name, fn in decoders.items()}
+        baseline = timings["full json.loads"]
+        print(f"\nbody {len(body) / 1024:.1f} KB ({attachments} attachments)")
+        for name, seconds in timings.items():
+            print(
+                f"  {name:<24}{seconds * 1e6:>9.2f} us"
+                f"{1 / seconds:>12,.0f}/s{baseline / seconds:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
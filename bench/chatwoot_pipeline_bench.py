@@ -0,0 +1,132 @@
+import argparse
+import asyncio
+import datetime as dt
+import json
+import os
+import statistics
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+os.environ.setdefault("CHATWOOT_BASE_URL", "http://chatwoot.mock")
+os.environ.setdefault("CHATWOOT_INBOX_ID", "1")
+os.environ.setdefault("UNIPILE_BASE_URL", "http://unipile.mock/api/v1")
+os.environ.setdefault("SUPABASE_URL", "http://supabase.mock")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench")
+os.environ.setdefault("HTTP_WARM_CONNECTIONS", "0")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx  # noqa: E402
+
+from app.chatwoot_payload import decode_chatwoot_webhook  # noqa: E402
+from app.dedupe import build_dedupe_key, normalize_text, strip_marker  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+def _mock_transport(supabase_ms: float, unipile_ms: float) -> httpx.MockTransport:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "supabase.mock":
+            await asyncio.sleep(supabase_ms / 1000)
+            if request.method == "POST" and request.content.startswith(b"["):
+                # PostgREST echoes inserted rows, which is how a webhook claim succeeds
+                return httpx.Response(201, json=json.loads(request.content))
+            return httpx.Response(201, json=[])
+        if request.url.host == "unipile.mock":
+            await asyncio.sleep(unipile_ms / 1000)
+            return httpx.Response(201, json={"object": "MessageSent", "message_id": "m1"})
+        return httpx.Response(200, json={})
+
+    return httpx.MockTransport(handler)
+
+
+def _body(index: int) -> bytes:
+    payload = {
+        "event": "message_created",
+        "id": index,
+        "message_type": "outgoing",
+        "content": f"Olá, mensagem de teste {index}",
+        "conversation": {"id": 555, "meta": {"sender": {"custom_attributes": {"chat_id": "chat_bench"}}}},
+    }
+    return json.dumps(payload).encode("utf-8")
+
+
+async def _sequential(client: httpx.AsyncClient, body: bytes) -> None:
+    webhook = decode_chatwoot_webhook(body)
+    normalized_text = normalize_text(webhook.content)
+    dedupe_key = build_dedupe_key(webhook.chat_id, normalized_text)
+    expires_at = dt.datetime.now(tz=dt.timezone.utc) + dt.timedelta(hours=24)
+    await app.state.supabase.upsert_dedupe(
+        dedupe_key, chat_id=webhook.chat_id, normalized_text=normalized_text, expires_at=expires_at
+    )
+    response = await app.state.unipile.send_message(
+        chat_id=webhook.chat_id, text=strip_marker(webhook.content)
+    )
+    await app.state.supabase.log_events(
+        [{"source": "chatwoot", "decision": "sent_to_unipile", "payload": webhook.payload, "response": response}]
+    )
+
+
+async def _concurrent(client: httpx.AsyncClient, body: bytes) -> None:
+    response = await client.post(
+        "/webhook/chatwoot", content=body, headers={"content-type": "application/json"}
+    )
+    response.raise_for_status()
+
+
+async def _measure(
+    run: Callable[[httpx.AsyncClient, bytes], Awaitable[None]],
+    client: httpx.AsyncClient,
+    requests: int,
+    offset: int,
+) -> List[float]:
+    samples = []
+    for index in range(requests):
+        body = _body(offset + index)
+        started = time.perf_counter()
+        await run(client, body)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _report(name: str, samples: List[float]) -> Dict[str, Any]:
+    p50 = _percentile(samples, 0.5) * 1000
+    p99 = _percentile(samples, 0.99) * 1000
+    mean = statistics.fmean(samples) * 1000
+    print(f"  {name:<28}{p50:>10.1f}{p99:>10.1f}{mean:>10.1f}")
+    return {"p50": p50, "p99": p99, "mean": mean}
+
+
+async def run(requests: int, supabase_ms: float, unipile_ms: float) -> None:
+    async with app.router.lifespan_context(app):
+        transport = _mock_transport(supabase_ms, unipile_ms)
+        for name in ("chatwoot", "unipile", "supabase"):
+            upstream = getattr(app.state, name)
+            await upstream._client.aclose()
+            upstream._client = httpx.AsyncClient(transport=transport)
+        asgi = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=asgi, base_url="http://bridge") as client:
+            await _measure(_concurrent, client, 5, 0)
+            print(f"supabase {supabase_ms:.0f} ms, unipile {unipile_ms:.0f} ms, {requests} requests")
+            print(f"  {'pipeline':<28}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+            before = _report("sequential (before)", await _measure(_sequential, client, requests, 10_000))
+            after = _report("concurrent (webhook)", await _measure(_concurrent, client, requests, 20_000))
+        print(f"  p50 speedup {before['p50'] / after['p50']:.2f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare the sequential and concurrent Chatwoot webhook pipelines against mocked upstreams."
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--supabase-ms", type=float, default=40.0)
+    parser.add_argument("--unipile-ms", type=float, default=120.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.supabase_ms, args.unipile_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import argparse
+import asyncio
+import datetime as dt
+import json
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.config import settings
+from app.dedupe_store import (
+    DedupeEntry,
+    DedupeStore,
+    MemoryDedupeStore,
+    RedisDedupeStore,
+    SqliteDedupeStore,
+    SupabaseDedupeStore,
+)
+from app.supabase_client import SupabaseClient
+from bench.resp_server import RespServer
+
+
+def _entry(key: str, ttl_seconds: float = 120.0) -> DedupeEntry:
+    return DedupeEntry(
+        dedupe_key=key,
+        chat_id="chat_bench",
+        normalized_text="mensagem de teste",
+        expires_at=dt.datetime.now(tz=dt.timezone.utc) + dt.timedelta(seconds=ttl_seconds),
+    )
+
+
+def _postgrest_mock(latency_ms: float) -> httpx.MockTransport:
+    rows: Dict[str, float] = {}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency_ms / 1000)
+        now = time.time()
+        path = request.url.path
+        if path.endswith("/rpc/dedupe_check_and_set"):
+            body = json.loads(request.content)
+            key = body["p_dedupe_key"]
+            present = rows.get(key, 0.0) > now
+            if not present:
+                rows[key] = dt.datetime.fromisoformat(body["p_expires_at"]).timestamp()
+            return httpx.Response(200, json=present)
+        if request.method == "POST":
+            for row in json.loads(request.content):
+                rows[row["dedupe_key"]] = dt.datetime.fromisoformat(row["expires_at"]).timestamp()
+            return httpx.Response(201)
+        selector = request.url.params.get("dedupe_key", "")
+        if selector.startswith("eq."):
+            keys = [selector[3:]]
+        else:
+            keys = [key.strip('"') for key in selector[4:-1].split(",")]
+        return httpx.Response(200, json=[{"dedupe_key": key} for key in keys if rows.get(key, 0.0) > now])
+
+    return httpx.MockTransport(handler)
+
+
+async def _timed_ops(
+    op: Callable[[int], Awaitable[Any]], count: int, concurrency: int
+) -> Tuple[float, List[float]]:
+    latencies: List[float] = []
+    next_index = iter(range(count))
+
+    async def worker() -> None:
+        for index in next_index:
+            started = time.perf_counter()
+            await op(index)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started, latencies
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _report(store: str, op: str, items: int, elapsed: float, latencies: List[float]) -> None:
+    print(
+        f"  {store:<22}{op:<22}{items / elapsed:>12,.0f}"
+        f"{_percentile(latencies, 0.5) * 1000:>10.3f}{_percentile(latencies, 0.99) * 1000:>10.3f}"
+        f"{statistics.fmean(latencies) * 1000:>10.3f}"
+    )
+
+
+async def _check_atomic(store: DedupeStore, concurrency: int) -> bool:
+    entry = _entry(f"atomic:{uuid.uuid4().hex}")
+    results = await asyncio.gather(*(store.check_and_set(entry) for _ in range(concurrency)))
+    return results.count(False) == 1
+
+
+async def bench_store(label: str, store: DedupeStore, ops: int, concurrency: int, batch: int) -> None:
+    prefix = uuid.uuid4().hex
+    if not await _check_atomic(store, concurrency):
+        print(f"  {label:<22}check_and_set is NOT atomic under {concurrency} concurrent callers")
+
+    elapsed, latencies = await _timed_ops(
+        lambda index: store.check_and_set(_entry(f"{prefix}:{index}")), ops, concurrency
+    )
+    _report(label, "check_and_set", ops, elapsed, latencies)
+
+    elapsed, latencies = await _timed_ops(
+        lambda index: store.contains(f"{prefix}:{index * 2}"), ops, concurrency
+    )
+    _report(label, "contains", ops, elapsed, latencies)
+
+    batches = max(1, ops // batch)
+    elapsed, latencies = await _timed_ops(
+        lambda index: store.set_many(
+            [_entry(f"{prefix}:batch:{index}:{offset}") for offset in range(batch)]
+        ),
+        batches,
+        concurrency,
+    )
+    _report(label, f"set_many x{batch}", batches * batch, elapsed, latencies)
+
+    elapsed, latencies = await _timed_ops(
+        lambda index: store.contains_many([f"{prefix}:batch:{index}:{offset}" for offset in range(batch)]),
+        batches,
+        concurrency,
+    )
+    _report(label, f"contains_many x{batch}", batches * batch, elapsed, latencies)
+
+
+async def run(args: argparse.Namespace) -> None:
+    stores: List[Tuple[str, Callable[[], Awaitable[DedupeStore]]]] = []
+    server: Optional[RespServer] = None
+    workdir = tempfile.mkdtemp(prefix="dedupe-bench-")
+
+    async def memory() -> DedupeStore:
+        return MemoryDedupeStore()
+
+    async def sqlite() -> DedupeStore:
+        return SqliteDedupeStore(os.path.join(workdir, "dedupe.sqlite3"))
+
+    async def redis() -> DedupeStore:
+        nonlocal server
+        url = args.redis_url
+        if not url:
+            server = RespServer()
+            await server.start()
+            url = server.url
+        return RedisDedupeStore(url, prefix=f"bench:{uuid.uuid4().hex}:")
+
+    async def supabase() -> DedupeStore:
+        client = SupabaseClient(
+            base_url="http://supabase.mock", api_key="bench", http=settings.supabase_http, retries=0
+        )
+        await client._client.aclose()
+        client._client = httpx.AsyncClient(transport=_postgrest_mock(args.supabase_ms))
+        return SupabaseDedupeStore(client)
+
+    factories = {"memory": memory, "sqlite": sqlite, "redis": redis, "supabase": supabase}
+    for name in args.stores.split(","):
+        label = name
+        if name == "redis" and not args.redis_url:
+            label = "redis (stand-in)"
+        elif name == "supabase":
+            label = f"supabase (mock {args.supabase_ms:g} ms)"
+        stores.append((label, factories[name]))
+
+    print(f"{args.ops} ops, concurrency {args.concurrency}, batch {args.batch}")
+    print(f"  {'store':<22}{'operation':<22}{'items/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for label, factory in stores:
+        store = await factory()
+        try:
+            await bench_store(label, store, args.ops, args.concurrency, args.batch)
+        finally:
+            await store.close()
+            if server is not None:
+                await server.stop()
+                server = None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare throughput and latency of the dedupe stores.")
+    parser.add_argument("--stores", default="memory,sqlite,redis,supabase")
+    parser.add_argument("--ops", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--redis-url", default="", help="benchmark a real Redis instead of the stand-in server")
+    parser.add_argument("--supabase-ms", type=float, default=5.0, help="latency of the mocked PostgREST API")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
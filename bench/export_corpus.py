@@ -0,0 +1,107 @@
+import argparse
+import json
+import os
+import re
+import sys
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.unipile import parse_unipile_webhook
+from bench.parser_bench import CORPUS_PATH, golden_fields, load_corpus, write_corpus
+
+REDACTED_KEYS = {"message", "text", "attendee_name", "name", "occupation", "headline", "attendee_profile_url"}
+SHAPES = {"json": "clean", "json_fixed": "json_fixed", "regex_fallback": "regex_fallback"}
+_REDACT_RAW = re.compile(r'("(?:%s)"\s*:\s*")[^"]*(")' % "|".join(sorted(REDACTED_KEYS)), re.IGNORECASE)
+
+
+def _redact(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {
+            key: f"<{key}>" if key.lower() in REDACTED_KEYS and isinstance(item, str) else _redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [_redact(item) for item in value]
+    if isinstance(value, str):
+        return _REDACT_RAW.sub(lambda m: f"{m.group(1)}<redacted>{m.group(2)}", value)
+    return value
+
+
+def fetch_rows(
+    base_url: str, api_key: str, limit: int, parse_mode: Optional[str], since_id: Optional[int]
+) -> List[Dict[str, Any]]:
+    params = {
+        "select": "id,parse_mode,payload,raw_body",
+        "source": "eq.unipile",
+        "payload": "not.is.null",
+        "order": "id.desc",
+        "limit": str(limit),
+    }
+    if parse_mode:
+        params["parse_mode"] = f"eq.{parse_mode}"
+    if since_id is not None:
+        params["id"] = f"gt.{since_id}"
+    headers = {"apikey": api_key, "Authorization": f"Bearer {api_key}"}
+    response = httpx.get(f"{base_url}/rest/v1/event_logs", params=params, headers=headers, timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+
+def to_entry(row: Dict[str, Any], redact: bool) -> Optional[Dict[str, Any]]:
+    parse_mode = row.get("parse_mode")
+    payload = row.get("raw_body") if parse_mode != "json" and row.get("raw_body") else row.get("payload")
+    if redact:
+        payload = _redact(payload)
+    if isinstance(payload, dict):
+        if parse_mode not in (None, "json"):
+            print(
+                f"warning: event_log_{row['id']} has no raw_body; exporting the {parse_mode} payload as parsed",
+                file=sys.stderr,
+            )
+        body = json.dumps(payload, ensure_ascii=False)
+    elif isinstance(payload, str) and payload.strip():
+        body = payload
+    else:
+        return None
+    shape = SHAPES.get(parse_mode or "", "clean" if isinstance(payload, dict) else "regex_fallback")
+    parsed = parse_unipile_webhook(body.encode("utf-8"), "application/json")
+    return {
+        "name": f"event_log_{row['id']}",
+        "shape": shape,
+        "content_type": "application/json",
+        "body": body,
+        "expected": golden_fields(parsed),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Append Unipile bodies from event_logs to the parser corpus.")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--parse-mode", choices=["json", "json_fixed", "regex_fallback"])
+    parser.add_argument("--since-id", type=int)
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    parser.add_argument("--no-redact", action="store_true", help="keep message text and names as logged")
+    args = parser.parse_args()
+
+    base_url = os.getenv("SUPABASE_URL", "").rstrip("/")
+    api_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
+    if not base_url or not api_key:
+        raise SystemExit("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
+
+    entries = load_corpus(args.corpus) if os.path.exists(args.corpus) else []
+    known = {entry["name"] for entry in entries}
+    added = 0
+    for row in fetch_rows(base_url, api_key, args.limit, args.parse_mode, args.since_id):
+        entry = to_entry(row, redact=not args.no_redact)
+        if entry is None or entry["name"] in known:
+            continue
+        entries.append(entry)
+        known.add(entry["name"])
+        added += 1
+    write_corpus(entries, args.corpus)
+    print(f"added {added} entries to {args.corpus}; review their expected fields before committing")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import json
+import re
+from typing import Any, Optional
+from urllib.parse import parse_qsl
+
+from app.models import ParsedUnipileEvent
+from app.unipile import _extract_from_payload, _unescape_message
+
+
+def _unwrap_body_string(raw: str) -> str:
+    out = raw.strip()
+    if out.startswith('"') and out.endswith('"'):
+        out = out[1:-1]
+    out = re.sub(r"^\s*\{\s*\"\{", "{", out)
+    out = re.sub(r"\}\"\s*\}\s*$", "}", out)
+    out = out.replace('\\"', '"')
+    return out.strip()
+
+
+def _fix_known_breaks(raw: str) -> str:
+    s = raw
+    s = re.sub(
+        r'"provider_chat_id"\s*:\s*"([^"]+)"\s*:\s*"([^"]*)"\s*,',
+        lambda m: f'"provider_chat_id":"{m.group(1)}{m.group(2)}",',
+        s,
+    )
+    s = re.sub(
+        r'"occupation"\s*:\s*"([^"]*?)"\s*:\s*""\s*,\s*"([^"]*?)"\s*,',
+        lambda m: f'"occupation":"{m.group(1)}{m.group(2)}",',
+        s,
+    )
+    return s
+
+
+def _safe_json_parse(raw: str) -> Optional[Any]:
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        return None
+
+
+def _regex_pick(raw: str, key: str) -> Optional[str]:
+    match = re.search(rf'"{re.escape(key)}"\s*:\s*"([^"]*)"', raw, re.IGNORECASE)
+    if not match:
+        return None
+    value = match.group(1)
+    return value
+
+
+def _regex_pick_bool(raw: str, key: str) -> Optional[bool]:
+    match = re.search(rf'"{re.escape(key)}"\s*:\s*(true|false|1|0)', raw, re.IGNORECASE)
+    if not match:
+        return None
+    value = match.group(1).lower()
+    return value in {"true", "1"}
+
+
+def _fallback_extract(raw: str) -> ParsedUnipileEvent:
+    attendee_name = _regex_pick(raw, "attendee_name")
+    attendee_id = _regex_pick(raw, "attendee_id")
+
+    message = _regex_pick(raw, "message")
+    message = _unescape_message(message)
+
+    return ParsedUnipileEvent(
+        chat_id=_regex_pick(raw, "chat_id"),
+        message=message,
+        is_sender=_regex_pick_bool(raw, "is_sender"),
+        attendee_name=attendee_name,
+        attendee_id=attendee_id,
+        message_id=_regex_pick(raw, "message_id"),
+        provider_message_id=_regex_pick(raw, "provider_message_id"),
+        event=_regex_pick(raw, "event"),
+        timestamp=_regex_pick(raw, "timestamp"),
+        parse_mode="regex_fallback",
+        raw=raw[:1000],
+    )
+
+
+def parse_unipile_webhook(body: bytes, content_type: Optional[str]) -> ParsedUnipileEvent:
+    raw = body.decode("utf-8", errors="replace").strip()
+    candidates = []
+
+    if raw:
+        candidates.append(raw)
+
+    if raw:
+        pairs = parse_qsl(raw, keep_blank_values=True)
+        for key, value in pairs:
+            key = key.strip()
+            value = value.strip()
+            if key.startswith("{"):
+                candidates.append(key)
+            if value.startswith("{"):
+                candidates.append(value)
+
+    seen = set()
+    for candidate in candidates:
+        if candidate in seen:
+            continue
+        seen.add(candidate)
+        unwrapped = _unwrap_body_string(candidate)
+        parsed = _safe_json_parse(unwrapped)
+        parse_mode = "json"
+        if parsed is None:
+            fixed = _fix_known_breaks(unwrapped)
+            parsed = _safe_json_parse(fixed)
+            parse_mode = "json_fixed"
+
+        if isinstance(parsed, dict):
+            payload = parsed.get("data") if isinstance(parsed.get("data"), dict) else parsed
+            return _extract_from_payload(payload, parsed, parse_mode)
+
+    return _fallback_extract(raw)
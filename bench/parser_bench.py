@@ -0,0 +1,185 @@
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+from app.models import ParsedUnipileEvent
+from app.unipile import parse_unipile_webhook
+from bench import legacy_parser
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "corpus", "unipile.jsonl")
+FIELDS = (
+    "chat_id",
+    "message",
+    "is_sender",
+    "attendee_name",
+    "attendee_id",
+    "message_id",
+    "provider_message_id",
+    "event",
+    "timestamp",
+    "parse_mode",
+)
+
+Parser = Callable[[bytes, Optional[str]], ParsedUnipileEvent]
+
+
+def golden_fields(parsed: ParsedUnipileEvent) -> Dict[str, Any]:
+    return {field: getattr(parsed, field) for field in FIELDS}
+
+
+def load_corpus(path: str = CORPUS_PATH) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def write_corpus(entries: List[Dict[str, Any]], path: str = CORPUS_PATH) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        for entry in entries:
+            fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def check_golden(entries: List[Dict[str, Any]]) -> int:
+    failures = 0
+    for entry in entries:
+        actual = golden_fields(parse_unipile_webhook(entry["body"].encode("utf-8"), entry.get("content_type")))
+        expected = entry.get("expected")
+        if actual != expected:
+            failures += 1
+            diff = {
+                field: {"expected": (expected or {}).get(field), "actual": actual[field]}
+                for field in FIELDS
+                if (expected or {}).get(field) != actual[field]
+            }
+            print(f"GOLDEN MISMATCH {entry['name']}: {json.dumps(diff, ensure_ascii=False)}")
+    return failures
+
+
+def _latencies(parser: Parser, body: bytes, content_type: Optional[str], iterations: int) -> List[float]:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        parser(body, content_type)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def benchmark(entries: List[Dict[str, Any]], iterations: int, compare_legacy: bool) -> None:
+    by_shape: Dict[str, List[float]] = defaultdict(list)
+    legacy_by_shape: Dict[str, List[float]] = defaultdict(list)
+    total_bytes = 0
+    total_seconds = 0.0
+    for entry in entries:
+        body = entry["body"].encode("utf-8")
+        samples = _latencies(parse_unipile_webhook, body, entry.get("content_type"), iterations)
+        by_shape[entry["shape"]].extend(samples)
+        total_bytes += len(body) * iterations
+        total_seconds += sum(samples)
+        if compare_legacy:
+            legacy = _latencies(legacy_parser.parse_unipile_webhook, body, entry.get("content_type"), iterations)
+            legacy_by_shape[entry["shape"]].extend(legacy)
+
+    header = f"{'shape':<26}{'bodies':>8}{'p50 us':>10}{'p99 us':>10}{'mean us':>10}"
+    if compare_legacy:
+        header += f"{'legacy us':>12}{'speedup':>10}"
+    print(header)
+    for shape, samples in sorted(by_shape.items()):
+        mean = statistics.fmean(samples)
+        line = (
+            f"{shape:<26}{len(samples) // iterations:>8}{_percentile(samples, 0.5) * 1e6:>10.1f}"
+            f"{_percentile(samples, 0.99) * 1e6:>10.1f}{mean * 1e6:>10.1f}"
+        )
+        if compare_legacy:
+            legacy_mean = statistics.fmean(legacy_by_shape[shape])
+            line += f"{legacy_mean * 1e6:>12.1f}{legacy_mean / mean:>9.1f}x"
+        print(line)
+    parsed = len(entries) * iterations
+    print(
+        f"\nthroughput: {parsed / total_seconds:,.0f} bodies/s, "
+        f"{total_bytes / total_seconds / 1e6:,.1f} MB/s over {parsed} parses"
+    )
+
+
+def scaling(entries: List[Dict[str, Any]], iterations: int) -> None:
+    print("\nus per KB as bodies grow (flat means linear)")
+    print(f"{'entry':<26}{'KB':>8}{'new':>10}{'legacy':>10}")
+    for entry in entries:
+        if entry["shape"] not in {"broken_occupation", "form_encoded", "regex_fallback"}:
+            continue
+        for factor in (1, 50, 500):
+            body = _pad(entry, factor)
+            kb = len(body) / 1024
+            rounds = max(1, iterations // factor)
+            current = statistics.fmean(_latencies(parse_unipile_webhook, body, entry.get("content_type"), rounds))
+            legacy = statistics.fmean(
+                _latencies(legacy_parser.parse_unipile_webhook, body, entry.get("content_type"), rounds)
+            )
+            print(f"{entry['name']:<26}{kb:>8.1f}{current * 1e6 / kb:>10.1f}{legacy * 1e6 / kb:>10.1f}")
+    print("\nus per KB as stray occupation fragments grow (legacy gives up to regex_fallback)")
+    for fragments in (10, 1000, 20000):
+        body = _occupation_fragments(fragments)
+        kb = len(body) / 1024
+        rounds = max(1, iterations // fragments)
+        current = statistics.fmean(_latencies(parse_unipile_webhook, body, "application/json", rounds))
+        print(f"{f'{fragments} fragments':<26}{kb:>8.1f}{current * 1e6 / kb:>10.1f}")
+
+
+def _occupation_fragments(fragments: int) -> bytes:
+    strays = "".join(f',"frag{index:06d}"' for index in range(fragments))
+    return (
+        '{"event":"message_received","chat_id":"chat_1","message":"oi","is_sender":false,'
+        '"attendees":[{"attendee_id":"att_1","occupation":"X":""' + strays + "}]}"
+    ).encode("utf-8")
+
+
+def _pad(entry: Dict[str, Any], factor: int) -> bytes:
+    body = entry["body"]
+    word = re.search(r"[A-Za-z]{3,}", entry["expected"].get("message") or "")
+    if factor == 1 or not word:
+        return body.encode("utf-8")
+    return body.replace(word.group(0), word.group(0) * factor, 1).encode("utf-8")
+
+
+def update_golden(entries: List[Dict[str, Any]], path: str) -> None:
+    for entry in entries:
+        parsed = parse_unipile_webhook(entry["body"].encode("utf-8"), entry.get("content_type"))
+        entry["expected"] = golden_fields(parsed)
+    write_corpus(entries, path)
+    print(f"rewrote golden outputs for {len(entries)} entries in {path}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the Unipile webhook parser against the regression corpus.")
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--legacy", action="store_true", help="also time the previous regex cascade")
+    parser.add_argument("--scaling", action="store_true", help="measure cost per KB as bodies grow")
+    parser.add_argument("--update-golden", action="store_true", help="record current outputs as the golden values")
+    args = parser.parse_args()
+
+    entries = load_corpus(args.corpus)
+    if args.update_golden:
+        update_golden(entries, args.corpus)
+        return
+
+    failures = check_golden(entries)
+    benchmark(entries, args.iterations, args.legacy)
+    if args.scaling:
+        scaling(entries, args.iterations)
+    if failures:
+        print(f"\n{failures} of {len(entries)} corpus entries no longer match their golden output")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import argparse
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class RespServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.host = host
+        self.port = port
+        self._data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"redis://{self.host}:{self.port}/0"
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                command = await _read_command(reader)
+                if command is None:
+                    break
+                if not command:
+                    continue
+                writer.write(self._execute(command))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _live(self, key: bytes) -> Optional[bytes]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def _execute(self, command: List[bytes]) -> bytes:
+        name = command[0].upper()
+        args = command[1:]
+        if name == b"PING":
+            return b"+PONG\r\n"
+        if name in (b"AUTH", b"SELECT"):
+            return b"+OK\r\n"
+        if name == b"GET":
+            value = self._live(args[0])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+        if name == b"EXISTS":
+            return b":%d\r\n" % sum(1 for key in args if self._live(key) is not None)
+        if name == b"DEL":
+            removed = sum(1 for key in args if self._data.pop(key, None) is not None)
+            return b":%d\r\n" % removed
+        if name == b"FLUSHALL":
+            self._data.clear()
+            return b"+OK\r\n"
+        if name == b"SET":
+            return self._set(args)
+        return b"-ERR unknown command '%s'\r\n" % name
+
+    def _set(self, args: List[bytes]) -> bytes:
+        key, value = args[0], args[1]
+        options = [arg.upper() for arg in args[2:]]
+        expires_at = None
+        for index, option in enumerate(options):
+            if option == b"PX":
+                expires_at = time.monotonic() + int(args[3 + index]) / 1000
+            elif option == b"EX":
+                expires_at = time.monotonic() + int(args[3 + index])
+        exists = self._live(key) is not None
+        if (b"NX" in options and exists) or (b"XX" in options and not exists):
+            return b"$-1\r\n"
+        self._data[key] = (value, expires_at)
+        return b"+OK\r\n"
+
+
+async def _read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        return line.strip().split()
+    parts = []
+    for _ in range(int(line[1:-2])):
+        header = await reader.readline()
+        length = int(header[1:-2])
+        parts.append((await reader.readexactly(length + 2))[:-2])
+    return parts
+
+
+async def _main(host: str, port: int) -> None:
+    server = RespServer(host, port)
+    await server.start()
+    print(f"listening on {server.url}")
+    await asyncio.Event().wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Minimal Redis-protocol server for local dedupe tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_main(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
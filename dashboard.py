@@ -97,5 +97,25 @@ count_col4.metric(
     str(sum(1 for item in logs if item.get("decision") == "error")),
 )
 
+st.subheader("Stage timings (avg ms)")
+timing_totals: Dict[Tuple[str, str], List[float]] = {}
+for item in logs:
+    timings = item.get("timings") or {}
+    for stage, ms in timings.items():
+        timing_totals.setdefault((item.get("decision") or "", stage), []).append(float(ms))
+st.dataframe(
+    [
+        {
+            "decision": decision_name,
+            "stage": stage,
+            "count": len(values),
+            "avg_ms": round(sum(values) / len(values), 3),
+            "max_ms": round(max(values), 3),
+        }
+        for (decision_name, stage), values in sorted(timing_totals.items())
+    ],
+    use_container_width=True,
+)
+
 st.subheader("event_logs")
 st.dataframe(logs, use_container_width=True)
@@ -24,11 +24,60 @@ create table if not exists public.event_logs (
   error text,
   parse_mode text,
   signature text,
-  response jsonb
+  response jsonb,
+  timings jsonb,
+  raw_body text
 );
 
+alter table public.event_logs add column if not exists timings jsonb;
+alter table public.event_logs add column if not exists raw_body text;
+
 create index if not exists event_logs_created_at_idx
   on public.event_logs (created_at desc);
 
 create index if not exists event_logs_chat_id_idx
   on public.event_logs (chat_id);
+
+create table if not exists public.chat_mappings (
+  chat_id text primary key,
+  attendee_id text,
+  contact_id text not null,
+  conversation_id text not null,
+  source_id text,
+  inbox_id text not null,
+  updated_at timestamptz not null default now()
+);
+
+create table if not exists public.processed_webhooks (
+  webhook_key text primary key,
+  source text not null,
+  expires_at timestamptz not null,
+  delivered_at timestamptz,
+  created_at timestamptz not null default now()
+);
+
+alter table public.processed_webhooks add column if not exists delivered_at timestamptz;
+
+create index if not exists processed_webhooks_expires_at_idx
+  on public.processed_webhooks (expires_at);
+
+create or replace function public.dedupe_check_and_set(
+  p_dedupe_key text,
+  p_chat_id text,
+  p_normalized_text text,
+  p_expires_at timestamptz
+) returns boolean
+language plpgsql
+as $$
+begin
+  insert into public.dedupe_cache (dedupe_key, chat_id, normalized_text, expires_at)
+  values (p_dedupe_key, p_chat_id, p_normalized_text, p_expires_at)
+  on conflict (dedupe_key) do update
+    set chat_id = excluded.chat_id,
+        normalized_text = excluded.normalized_text,
+        expires_at = excluded.expires_at,
+        created_at = now()
+    where public.dedupe_cache.expires_at <= now();
+  return not found;
+end;
+$$;
@@ -0,0 +1,57 @@
+import contextlib
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List
+
+os.environ.setdefault("CHATWOOT_BASE_URL", "http://chatwoot.mock")
+os.environ.setdefault("CHATWOOT_ACCOUNT_ID", "1")
+os.environ.setdefault("CHATWOOT_INBOX_ID", "1")
+os.environ.setdefault("UNIPILE_BASE_URL", "http://unipile.mock/api/v1")
+os.environ.setdefault("SUPABASE_URL", "http://supabase.mock")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "test")
+os.environ.setdefault("HTTP_WARM_CONNECTIONS", "0")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+Handler = Callable[[httpx.Request], Awaitable[httpx.Response]]
+
+
+@pytest.fixture
+def bridge() -> Callable[[Handler], "contextlib.AbstractAsyncContextManager[httpx.AsyncClient]"]:
+    from app.main import app
+
+    @contextlib.asynccontextmanager
+    async def run(handler: Handler) -> AsyncIterator[httpx.AsyncClient]:
+        async with app.router.lifespan_context(app):
+            transport = httpx.MockTransport(handler)
+            for name in ("chatwoot", "unipile", "supabase"):
+                upstream = getattr(app.state, name)
+                await upstream._client.aclose()
+                upstream._client = httpx.AsyncClient(transport=transport)
+            asgi = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=asgi, base_url="http://bridge") as client:
+                yield client
+
+    return run
+
+
+@pytest.fixture
+def fake_chatwoot(monkeypatch: pytest.MonkeyPatch) -> List[Dict[str, Any]]:
+    from app import main
+    from app.models import ChatResolution
+
+    created: List[Dict[str, Any]] = []
+
+    async def resolve(parsed: Any) -> ChatResolution:
+        return ChatResolution(contact_id="10", conversation_id="20", source_id="src")
+
+    async def create(
+        resolution: ChatResolution, chat_id: str, name: str, email: str, message_type: str, content: str
+    ) -> Dict[str, Any]:
+        created.append({"chat_id": chat_id, "message_type": message_type, "content": content})
+        return {"id": len(created)}
+
+    monkeypatch.setattr(main, "_resolve_unipile_chat", resolve)
+    monkeypatch.setattr(main, "_create_chatwoot_message", create)
+    return created
@@ -0,0 +1,75 @@
+import datetime as dt
+import json
+from typing import Any, Dict
+
+import httpx
+
+
+def unipile_body(message_id: str, is_sender: bool = False, message: str = "Olá", chat_id: Any = "chat_1") -> bytes:
+    return json.dumps(
+        {
+            "event": "message_received",
+            "chat_id": chat_id,
+            "message_id": message_id,
+            "message": message,
+            "is_sender": is_sender,
+            "attendees": [{"attendee_id": "att_1", "attendee_name": "Pessoa"}],
+        }
+    ).encode("utf-8")
+
+
+def chatwoot_body(
+    index: int,
+    content: str = "",
+    event: str = "message_created",
+    message_type: str = "outgoing",
+    chat_id: Any = "chat_1",
+) -> bytes:
+    return json.dumps(
+        {
+            "event": event,
+            "id": index,
+            "message_type": message_type,
+            "content": content or f"mensagem {index}",
+            "conversation": {"id": 7, "meta": {"sender": {"custom_attributes": {"chat_id": chat_id}}}},
+        }
+    ).encode("utf-8")
+
+
+async def upstreams_ok(request: httpx.Request) -> httpx.Response:
+    if request.url.host == "unipile.mock":
+        return httpx.Response(201, json={"object": "MessageSent", "message_id": "sent_1"})
+    if request.method == "POST" and request.content.startswith(b"["):
+        # PostgREST echoes inserted rows with return=representation
+        return httpx.Response(201, json=json.loads(request.content))
+    return httpx.Response(200, json=[])
+
+
+class ProcessedWebhooks:
+    def __init__(self) -> None:
+        self.rows: Dict[str, Dict[str, Any]] = {}
+
+    def _key(self, request: httpx.Request) -> str:
+        return request.url.params["webhook_key"][3:]
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        if not request.url.path.endswith("/processed_webhooks"):
+            return httpx.Response(201, json=[])
+        now = dt.datetime.now(tz=dt.timezone.utc).isoformat()
+        if request.method == "POST":
+            row = json.loads(request.content)[0]
+            if row["webhook_key"] in self.rows:
+                return httpx.Response(201, json=[])
+            self.rows[row["webhook_key"]] = {**row, "delivered_at": None}
+            return httpx.Response(201, json=[row])
+        row = self.rows.get(self._key(request))
+        if request.method == "GET":
+            live = row is not None and row["expires_at"] > now
+            return httpx.Response(200, json=[row] if live else [])
+        if request.method == "PATCH":
+            if row is None or ("expires_at" in request.url.params and row["expires_at"] > now):
+                return httpx.Response(200, json=[])
+            row.update(json.loads(request.content))
+            return httpx.Response(200, json=[row])
+        self.rows.pop(self._key(request), None)
+        return httpx.Response(204)
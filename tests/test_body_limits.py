@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List
+
+import httpx
+import pytest
+
+from app import main
+from app.config import settings
+from app.event_sink import EventLogSink
+from app.unipile import parse_unipile_webhook
+from tests.helpers import unipile_body, upstreams_ok
+
+JSON = {"content-type": "application/json"}
+
+
+@pytest.fixture
+def events(monkeypatch: pytest.MonkeyPatch) -> List[Dict[str, Any]]:
+    emitted: List[Dict[str, Any]] = []
+    monkeypatch.setattr(EventLogSink, "emit", lambda self, event: emitted.append(event))
+    return emitted
+
+
+@pytest.mark.parametrize("endpoint", ["/webhook/chatwoot", "/webhook/unipile"])
+def test_oversized_bodies_are_rejected(
+    bridge, events: List[Dict[str, Any]], monkeypatch: pytest.MonkeyPatch, endpoint: str
+) -> None:
+    monkeypatch.setattr(settings, "max_webhook_body_bytes", 64)
+
+    async def chunks() -> AsyncIterator[bytes]:
+        for _ in range(4):
+            yield b"x" * 32
+
+    async def run() -> List[int]:
+        async with bridge(upstreams_ok) as client:
+            declared = await client.post(endpoint, content=b"x" * 65, headers=JSON)
+            streamed = await client.post(endpoint, content=chunks(), headers=JSON)
+            return [declared.status_code, streamed.status_code]
+
+    assert asyncio.run(run()) == [413, 413]
+    errors = [event["error"] for event in events if event["decision"] == "error"]
+    assert errors == ["body_too_large: 65 bytes > 64", "body_too_large: 96 bytes > 64"]
+
+
+def test_large_unipile_bodies_are_parsed_off_the_event_loop(
+    bridge, fake_chatwoot: List[Dict[str, Any]], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "unipile_parse_thread_bytes", 100)
+    threads: List[str] = []
+
+    def recording_parse(body: bytes, content_type: Any) -> Any:
+        threads.append(threading.current_thread().name)
+        return parse_unipile_webhook(body, content_type)
+
+    monkeypatch.setattr(main, "parse_unipile_webhook", recording_parse)
+
+    async def run() -> httpx.Response:
+        async with bridge(upstreams_ok) as client:
+            return await client.post("/webhook/unipile", content=unipile_body("msg_1"), headers=JSON)
+
+    assert asyncio.run(run()).json() == {"status": "created_incoming"}
+    assert threads and threads[0] != threading.main_thread().name
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b'{"chat_id":"chat_1","message":"' + b'\\"' * 200000,
+        b'{"chat_id":"chat_1",' + b'"a":"b":' * 100000 + b'"message":"oi"}',
+        b'{"chat_id":"chat_1","x":' + b"[" * 100000,
+        b'{"chat_id":"chat_1",' + b'"' * 300000,
+    ],
+    ids=["unterminated_string", "stray_colons", "deep_nesting", "bare_quotes"],
+)
+def test_pathological_bodies_parse_quickly(body: bytes) -> None:
+    started = time.perf_counter()
+    parsed = parse_unipile_webhook(body, "application/json")
+
+    assert time.perf_counter() - started < 1.0
+    assert parsed.chat_id == "chat_1"
@@ -0,0 +1,70 @@
+import asyncio
+import os
+from typing import List
+
+import httpx
+import pytest
+
+from app import main
+from app.config import settings
+from app.inbox import WebhookInbox
+from tests.helpers import ProcessedWebhooks, chatwoot_body
+
+JSON = {"content-type": "application/json"}
+
+
+class Upstreams:
+    def __init__(self, failures: int = 0) -> None:
+        self.supabase = ProcessedWebhooks()
+        self.failures = failures
+        self.sent: List[bytes] = []
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        if request.url.host != "unipile.mock":
+            return await self.supabase.handle(request)
+        if self.failures:
+            self.failures -= 1
+            return httpx.Response(400, json={"detail": "rejected"})
+        self.sent.append(request.content)
+        return httpx.Response(201, json={"object": "MessageSent", "message_id": f"sent_{len(self.sent)}"})
+
+
+def test_replay_after_crash_past_the_send_does_not_send_again(
+    bridge, monkeypatch: pytest.MonkeyPatch, tmp_path
+) -> None:
+    monkeypatch.setattr(settings, "inbox_path", os.path.join(tmp_path, "inbox.sqlite3"))
+    upstreams = Upstreams()
+
+    async def crash_before_done() -> None:
+        with monkeypatch.context() as crash:
+            # the worker dies before the inbox entry is committed as done
+            crash.setattr(WebhookInbox, "mark_done", lambda self, entry_id: None)
+            async with bridge(upstreams.handle) as client:
+                response = await client.post("/webhook/chatwoot", content=chatwoot_body(1), headers=JSON)
+                assert response.json()["status"] == "sent"
+
+    async def restart() -> None:
+        async with bridge(upstreams.handle):
+            pass
+
+    asyncio.run(crash_before_done())
+    asyncio.run(restart())
+
+    assert len(upstreams.sent) == 1
+    assert upstreams.supabase.rows["chatwoot:1"]["delivered_at"]
+    assert main.app.state.idempotency.stats()["suppressed_remote"] == 1
+
+
+def test_redelivered_chatwoot_message_is_sent_once(bridge) -> None:
+    upstreams = Upstreams(failures=1)
+
+    async def run() -> List[str]:
+        statuses = []
+        async with bridge(upstreams.handle) as client:
+            for _ in range(3):
+                response = await client.post("/webhook/chatwoot", content=chatwoot_body(2), headers=JSON)
+                statuses.append(response.json()["status"])
+        return statuses
+
+    assert asyncio.run(run()) == ["error", "sent", "duplicate"]
+    assert len(upstreams.sent) == 1
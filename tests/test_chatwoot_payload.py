@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from app.chatwoot_payload import _decode_stdlib, decode_chatwoot_webhook
+from tests.helpers import chatwoot_body
+
+DECODERS = pytest.mark.parametrize("decode", [decode_chatwoot_webhook, _decode_stdlib], ids=["default", "stdlib"])
+
+
+@DECODERS
+def test_webhook_fields_are_extracted(decode) -> None:
+    body = chatwoot_body(42, content="Olá", chat_id="chat_9")
+
+    webhook = decode(body)
+
+    assert webhook.summary() == {
+        "event": "message_created",
+        "message_type": "outgoing",
+        "message_id": 42,
+        "conversation_id": 7,
+        "chat_id": "chat_9",
+    }
+    assert webhook.content == "Olá"
+    assert webhook.payload == json.loads(body)
+
+
+@DECODERS
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"event": "conversation_updated"},
+        {"event": "message_created", "content": None, "conversation": {"meta": None}},
+        {"event": "message_created", "conversation": "not an object", "content": "oi"},
+    ],
+)
+def test_missing_or_unexpected_fields_decode_to_empty_values(decode, payload) -> None:
+    webhook = decode(json.dumps(payload).encode("utf-8"))
+
+    assert webhook.event == payload["event"]
+    assert webhook.chat_id is None
+    assert webhook.content == (payload.get("content") or "")
+
+
+@DECODERS
+@pytest.mark.parametrize("body", [b"[1, 2]", b"{not json", b""])
+def test_non_object_bodies_raise_value_error(decode, body: bytes) -> None:
+    with pytest.raises(ValueError):
+        decode(body)
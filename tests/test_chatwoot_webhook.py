@@ -0,0 +1,30 @@
+import asyncio
+import threading
+from typing import List
+
+from app.event_sink import EventLogSink
+from tests.helpers import chatwoot_body, upstreams_ok
+
+
+def test_deferred_events_are_emitted_on_the_event_loop(bridge, monkeypatch) -> None:
+    threads: List[str] = []
+    emit = EventLogSink.emit
+
+    def recording_emit(self, event):
+        threads.append(threading.current_thread().name)
+        return emit(self, event)
+
+    monkeypatch.setattr(EventLogSink, "emit", recording_emit)
+
+    async def run() -> None:
+        async with bridge(upstreams_ok) as client:
+            for index in range(3):
+                response = await client.post(
+                    "/webhook/chatwoot", content=chatwoot_body(index), headers={"content-type": "application/json"}
+                )
+                assert response.status_code == 200
+                assert response.json()["status"] == "sent"
+
+    asyncio.run(run())
+
+    assert threads and set(threads) == {threading.main_thread().name}
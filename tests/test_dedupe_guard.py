@@ -0,0 +1,108 @@
+import asyncio
+import datetime as dt
+from typing import List, Sequence
+
+from app.cache import TTLCache
+from app.dedupe import DedupeGuard
+from app.dedupe_store import DedupeEntry, MemoryDedupeStore
+
+
+class CountingStore(MemoryDedupeStore):
+    def __init__(self, fail_writes: bool = False) -> None:
+        super().__init__()
+        self.fail_writes = fail_writes
+        self.lookups = 0
+
+    async def contains(self, dedupe_key: str) -> bool:
+        self.lookups += 1
+        return await super().contains(dedupe_key)
+
+    async def set_many(self, entries: Sequence[DedupeEntry]) -> None:
+        if self.fail_writes:
+            raise RuntimeError("store unavailable")
+        await super().set_many(entries)
+
+
+def _entry(key: str) -> DedupeEntry:
+    return DedupeEntry(
+        dedupe_key=key,
+        chat_id="chat_1",
+        normalized_text="oi",
+        expires_at=dt.datetime.now(tz=dt.timezone.utc) + dt.timedelta(minutes=5),
+    )
+
+
+def test_remembered_keys_are_answered_locally() -> None:
+    store = CountingStore()
+
+    async def run() -> bool:
+        guard = DedupeGuard(store, ttl_seconds=60, max_size=10)
+        guard.remember("chat_1|a", "chat_1", "oi")
+        seen = await guard.seen("chat_1|a")
+        await guard.close()
+        return seen
+
+    assert asyncio.run(run()) is True
+    assert store.lookups == 0
+
+
+def test_remote_hits_are_cached_locally() -> None:
+    store = CountingStore()
+
+    async def run() -> List[bool]:
+        await store.set_many([_entry("chat_1|b")])
+        guard = DedupeGuard(store, ttl_seconds=60, max_size=10)
+        results = [await guard.seen("chat_1|b"), await guard.seen("chat_1|b"), await guard.seen("chat_1|c")]
+        assert guard.stats()["local_hits"] == 1
+        assert guard.stats()["remote_hits"] == 1
+        assert guard.stats()["remote_misses"] == 1
+        return results
+
+    assert asyncio.run(run()) == [True, True, False]
+    assert store.lookups == 2
+
+
+def test_failed_write_through_is_reported() -> None:
+    store = CountingStore(fail_writes=True)
+    errors: List[str] = []
+
+    async def on_error(exc: Exception) -> None:
+        errors.append(str(exc))
+
+    async def run() -> dict:
+        guard = DedupeGuard(store, ttl_seconds=60, max_size=10)
+        guard.remember("chat_1|d", "chat_1", "oi", on_error=on_error)
+        await guard.close()
+        assert await guard.seen("chat_1|d") is True
+        return guard.stats()
+
+    stats = asyncio.run(run())
+
+    assert errors == ["store unavailable"]
+    assert stats["remote_write_errors"] == 1
+    assert stats["remote_writes"] == 0
+
+
+def test_ttl_cache_expires_and_evicts_least_recent(monkeypatch) -> None:
+    now = [1000.0]
+    monkeypatch.setattr("app.cache.time.monotonic", lambda: now[0])
+    cache: TTLCache[int] = TTLCache(max_size=2, ttl_seconds=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    now[0] += 11
+    assert cache.get("a") is None
+    assert len(cache) == 1
+
+
+def test_sent_message_ids_are_recognised() -> None:
+    guard = DedupeGuard(None, ttl_seconds=60, max_size=10)
+    guard.remember_sent("chat_1", ["sent_1", None, "provider_1"])
+
+    assert guard.is_sent(None, "provider_1") is True
+    assert guard.is_sent("other", None) is False
+    assert guard.stats()["message_id_hits"] == 1
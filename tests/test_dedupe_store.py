@@ -0,0 +1,155 @@
+import asyncio
+import contextlib
+import datetime as dt
+import os
+import tempfile
+import uuid
+from typing import Any, AsyncIterator, Callable
+
+import pytest
+
+from app import dedupe_store
+from app.dedupe_store import (
+    DedupeEntry,
+    DedupeStore,
+    MemoryDedupeStore,
+    RedisDedupeStore,
+    SqliteDedupeStore,
+)
+from bench.resp_server import RespServer
+
+
+def _entry(key: str, ttl_seconds: float = 60.0) -> DedupeEntry:
+    return DedupeEntry(
+        dedupe_key=key,
+        chat_id="chat_1",
+        normalized_text="oi",
+        expires_at=dt.datetime.now(tz=dt.timezone.utc) + dt.timedelta(seconds=ttl_seconds),
+    )
+
+
+@contextlib.asynccontextmanager
+async def _redis_store() -> AsyncIterator[RedisDedupeStore]:
+    server = RespServer()
+    await server.start()
+    store = RedisDedupeStore(server.url)
+    try:
+        yield store
+    finally:
+        await store.close()
+        await server.stop()
+
+
+@contextlib.asynccontextmanager
+async def _store(backend: str) -> AsyncIterator[DedupeStore]:
+    if backend == "redis":
+        async with _redis_store() as store:
+            yield store
+        return
+    if backend == "sqlite":
+        with tempfile.TemporaryDirectory() as workdir:
+            store = SqliteDedupeStore(os.path.join(workdir, "dedupe.sqlite3"))
+            try:
+                yield store
+            finally:
+                await store.close()
+        return
+    yield MemoryDedupeStore()
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite", "redis"])
+def test_check_and_set_lets_exactly_one_concurrent_caller_through(backend: str) -> None:
+    async def run() -> None:
+        async with _store(backend) as store:
+            entry = _entry(uuid.uuid4().hex)
+            results = await asyncio.gather(*(store.check_and_set(entry) for _ in range(16)))
+            assert results.count(False) == 1
+            assert await store.contains(entry.dedupe_key)
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite", "redis"])
+def test_batch_operations_and_expiry(backend: str) -> None:
+    async def run() -> None:
+        async with _store(backend) as store:
+            await store.set_many([_entry("a"), _entry("b"), _entry("expired", ttl_seconds=-1)])
+            # redis keeps an already-expired entry for the minimum 1 ms TTL
+            await asyncio.sleep(0.01)
+            assert await store.contains_many(["a", "b", "c", "expired"]) == {"a", "b"}
+            assert await store.check_and_set_many([_entry("a"), _entry("c"), _entry("expired")]) == [
+                True,
+                False,
+                False,
+            ]
+
+    asyncio.run(run())
+
+
+def _stall_first_read(monkeypatch: pytest.MonkeyPatch, fail: Callable[[], Any]) -> None:
+    read_reply = dedupe_store._read_reply
+    calls = []
+
+    async def stalled(reader: asyncio.StreamReader) -> Any:
+        calls.append(reader)
+        if len(calls) == 1:
+            return await fail()
+        return await read_reply(reader)
+
+    monkeypatch.setattr(dedupe_store, "_read_reply", stalled)
+
+
+def test_redis_cancelled_pipeline_does_not_answer_the_next_one(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def hang() -> None:
+        await asyncio.sleep(60)
+
+    _stall_first_read(monkeypatch, hang)
+
+    async def run() -> None:
+        async with _redis_store() as store:
+            entry = _entry(uuid.uuid4().hex)
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(store.check_and_set(entry), 0.2)
+            # the cancelled SET NX reached the server, so the key is now present
+            assert await store.check_and_set(entry) is True
+            assert await store.check_and_set(_entry(uuid.uuid4().hex)) is False
+
+    asyncio.run(run())
+
+
+def test_redis_malformed_reply_resets_the_connection(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def malformed() -> None:
+        raise ValueError("invalid literal for int()")
+
+    _stall_first_read(monkeypatch, malformed)
+
+    async def run() -> None:
+        async with _redis_store() as store:
+            entry = _entry(uuid.uuid4().hex)
+            with pytest.raises(ValueError):
+                await store.check_and_set(entry)
+            assert await store.check_and_set(entry) is True
+            assert await store.check_and_set(_entry(uuid.uuid4().hex)) is False
+
+    asyncio.run(run())
+
+
+def test_redis_error_reply_keeps_the_connection() -> None:
+    async def run() -> None:
+        async with _redis_store() as store:
+            with pytest.raises(dedupe_store.RespError):
+                await store.execute([("PING",), ("NOPE",)])
+            writer = store._writer
+            assert await store.execute([("PING",)]) == ["PONG"]
+            assert store._writer is writer
+
+    asyncio.run(run())
+
+
+def test_store_without_the_required_methods_cannot_be_built() -> None:
+    class Partial(DedupeStore):
+        async def check_and_set(self, entry: DedupeEntry) -> bool:
+            return False
+
+    with pytest.raises(TypeError):
+        Partial()
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from app.dispatcher import ChatDispatcher
+
+
+async def _cancelled_job() -> None:
+    raise asyncio.CancelledError()
+
+
+async def _ok_job() -> str:
+    return "ok"
+
+
+def test_cancelled_job_cancels_the_caller_and_keeps_the_lane_alive() -> None:
+    async def run() -> None:
+        dispatcher = ChatDispatcher(lanes=1, lane_size=4)
+        await dispatcher.start()
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(dispatcher.run("chat_1", _cancelled_job), 1)
+        assert await asyncio.wait_for(dispatcher.run("chat_1", _ok_job), 1) == "ok"
+        await asyncio.wait_for(dispatcher.stop(), 1)
+        stats = dispatcher.stats()
+        assert stats["failed"] == 1
+        assert stats["processed"] == 1
+
+    asyncio.run(run())
+
+
+def test_submitted_job_cancellation_does_not_stall_stop() -> None:
+    async def run() -> None:
+        dispatcher = ChatDispatcher(lanes=1, lane_size=4)
+        await dispatcher.start()
+        assert dispatcher.submit("chat_1", _cancelled_job)
+        assert dispatcher.submit("chat_1", _ok_job)
+        await asyncio.wait_for(dispatcher.stop(), 1)
+        assert dispatcher.stats()["processed"] == 1
+
+    asyncio.run(run())
+
+
+def test_failed_job_surfaces_to_the_caller() -> None:
+    async def failing() -> None:
+        raise ValueError("boom")
+
+    async def run() -> None:
+        dispatcher = ChatDispatcher(lanes=1, lane_size=4)
+        await dispatcher.start()
+        with pytest.raises(ValueError):
+            await dispatcher.run("chat_1", failing)
+        await dispatcher.stop()
+
+    asyncio.run(run())
+
+
+def test_stop_cancels_lanes_stuck_in_a_job() -> None:
+    async def run() -> None:
+        dispatcher = ChatDispatcher(lanes=1, lane_size=4)
+        await dispatcher.start()
+        started = asyncio.Event()
+
+        async def slow() -> None:
+            started.set()
+            await asyncio.sleep(60)
+
+        dispatcher.submit("chat_1", slow)
+        await started.wait()
+        for task in dispatcher._tasks:
+            task.cancel()
+        done, _ = await asyncio.wait(dispatcher._tasks, timeout=1)
+        assert len(done) == 1
+
+    asyncio.run(run())
+
+
+def test_jobs_for_one_chat_run_in_order() -> None:
+    async def run() -> None:
+        dispatcher = ChatDispatcher(lanes=4, lane_size=16)
+        await dispatcher.start()
+        seen = []
+
+        def job(index: int):
+            async def record() -> None:
+                await asyncio.sleep(0.001 * (5 - index))
+                seen.append(index)
+
+            return record
+
+        await asyncio.gather(*(dispatcher.run("chat_1", job(index)) for index in range(5)))
+        await dispatcher.stop()
+        assert seen == list(range(5))
+
+    asyncio.run(run())
+
+
+def test_queue_wait_measures_time_spent_behind_earlier_jobs() -> None:
+    async def run() -> None:
+        dispatcher = ChatDispatcher(lanes=1, lane_size=4)
+        await dispatcher.start()
+
+        async def slow() -> None:
+            await asyncio.sleep(0.05)
+
+        await asyncio.gather(dispatcher.run("chat_1", slow), dispatcher.run("chat_1", _ok_job))
+        await dispatcher.stop()
+        stats = dispatcher.stats()
+        assert stats["queue_wait_max_seconds"] >= 0.04
+        assert 0.02 <= stats["queue_wait_avg_seconds"] < stats["queue_wait_max_seconds"]
+
+    asyncio.run(run())
+
+
+def test_non_string_chat_ids_share_a_lane_with_their_string_form() -> None:
+    dispatcher = ChatDispatcher(lanes=8, lane_size=4)
+
+    assert dispatcher.lane_for(12345) == dispatcher.lane_for("12345")
+    assert dispatcher.lane_for(None) == dispatcher.lane_for("None")
@@ -0,0 +1,130 @@
+import asyncio
+from typing import Any, Dict, List
+
+from app.event_sink import EventLogSink
+
+
+class RecordingSupabase:
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self.batches: List[List[Dict[str, Any]]] = []
+
+    async def log_events(self, events: List[Dict[str, Any]]) -> None:
+        await asyncio.sleep(self.delay)
+        self.batches.append(list(events))
+
+
+def _event(index: int, decision: str = "sent_to_unipile") -> Dict[str, Any]:
+    return {"source": "chatwoot", "decision": decision, "payload": {"id": index}}
+
+
+def test_events_are_written_in_batches() -> None:
+    supabase = RecordingSupabase()
+
+    async def run() -> Dict[str, Any]:
+        sink = EventLogSink(supabase, batch_size=10, flush_interval_ms=1000, max_buffer=100)
+        await sink.start()
+        for index in range(25):
+            sink.emit(_event(index))
+        await asyncio.sleep(0.05)
+        assert [len(batch) for batch in supabase.batches] == [10, 10]
+        await sink.stop()
+        return sink.stats()
+
+    stats = asyncio.run(run())
+
+    assert [len(batch) for batch in supabase.batches] == [10, 10, 5]
+    assert stats["written"] == 25
+    assert stats["batches"] == 3
+
+
+def test_partial_batch_is_flushed_after_the_interval() -> None:
+    supabase = RecordingSupabase()
+
+    async def run() -> None:
+        sink = EventLogSink(supabase, batch_size=10, flush_interval_ms=20, max_buffer=100)
+        await sink.start()
+        sink.emit(_event(1))
+        await asyncio.sleep(0.1)
+        assert supabase.batches == [[_event(1)]]
+        await sink.stop()
+
+    asyncio.run(run())
+
+
+def test_full_buffer_applies_the_overflow_policy() -> None:
+    async def run(overflow: str) -> List[int]:
+        supabase = RecordingSupabase()
+        sink = EventLogSink(supabase, batch_size=5, flush_interval_ms=1000, max_buffer=5, overflow=overflow)
+        for index in range(8):
+            sink.emit(_event(index))
+        assert sink.stats()["dropped"] == 3
+        await sink.stop()
+        return [event["payload"]["id"] for batch in supabase.batches for event in batch]
+
+    assert asyncio.run(run("drop_oldest")) == [3, 4, 5, 6, 7]
+    assert asyncio.run(run("drop_newest")) == [0, 1, 2, 3, 4]
+
+
+def test_ignored_events_are_shed_first_and_errors_never() -> None:
+    supabase = RecordingSupabase()
+
+    async def run() -> Dict[str, Any]:
+        sink = EventLogSink(supabase, batch_size=4, flush_interval_ms=1000, max_buffer=4)
+        sink.emit(_event(0, "ignored_event"))
+        sink.emit(_event(1))
+        sink.emit(_event(2))
+        sink.emit(_event(3))
+        sink.emit(_event(4))
+        sink.emit(_event(5))
+        sink.emit(_event(6, "error"))
+        sink.emit(_event(7, "ignored_event"))
+        stats = sink.stats()
+        await sink.stop()
+        return stats
+
+    stats = asyncio.run(run())
+
+    assert stats["shed"] == {"ignored": 2, "normal": 1}
+    assert stats["over_capacity"] == 1
+    written = [event["payload"]["id"] for batch in supabase.batches for event in batch]
+    assert written == [6, 2, 3, 4, 5]
+
+
+def test_emit_does_not_wait_for_supabase() -> None:
+    supabase = RecordingSupabase(delay=0.5)
+
+    async def run() -> float:
+        sink = EventLogSink(supabase, batch_size=1, flush_interval_ms=0, max_buffer=10)
+        await sink.start()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for index in range(5):
+            sink.emit(_event(index))
+        elapsed = loop.time() - started
+        sink.drain_timeout = 0.0
+        await sink.stop()
+        return elapsed
+
+    assert asyncio.run(run()) < 0.05
+
+
+def test_bounded_drain_counts_what_it_could_not_write() -> None:
+    supabase = RecordingSupabase(delay=1.0)
+
+    async def run() -> Dict[str, Any]:
+        sink = EventLogSink(
+            supabase, batch_size=2, flush_interval_ms=1000, max_buffer=10, drain_timeout_seconds=0.05
+        )
+        await sink.start()
+        for index in range(5):
+            sink.emit(_event(index))
+        await asyncio.sleep(0.01)
+        await sink.stop()
+        return sink.stats()
+
+    stats = asyncio.run(run())
+
+    assert supabase.batches == []
+    assert stats["lost_on_shutdown"] == 5
+    assert stats["buffered"] == 0
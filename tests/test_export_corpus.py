@@ -0,0 +1,53 @@
+import pytest
+
+from bench.export_corpus import _redact, to_entry
+from bench.parser_bench import check_golden
+
+
+def test_redaction_masks_personal_fields_in_objects_and_raw_bodies() -> None:
+    payload = {
+        "chat_id": "chat_1",
+        "message": "meu telefone é 9999",
+        "attendees": [{"attendee_id": "att_1", "attendee_name": "Maria Silva"}],
+    }
+    raw = '{"chat_id":"chat_1","message":"segredo","occupation":"CEO":"","x"}'
+
+    assert _redact(payload) == {
+        "chat_id": "chat_1",
+        "message": "<message>",
+        "attendees": [{"attendee_id": "att_1", "attendee_name": "<attendee_name>"}],
+    }
+    assert _redact(raw) == '{"chat_id":"chat_1","message":"<redacted>","occupation":"<redacted>":"","x"}'
+
+
+def test_rows_become_golden_corpus_entries() -> None:
+    clean = to_entry({"id": 1, "payload": {"chat_id": "chat_1", "message": "oi", "is_sender": False}}, redact=True)
+    broken = to_entry({"id": 2, "payload": '{"chat_id":"chat_1","message":"oi":"x"'}, redact=False)
+
+    assert clean["name"] == "event_log_1"
+    assert clean["shape"] == "clean"
+    assert clean["expected"]["chat_id"] == "chat_1"
+    assert broken["shape"] == "regex_fallback"
+    assert to_entry({"id": 3, "payload": None}, redact=True) is None
+    assert check_golden([clean, broken]) == 0
+
+
+def test_golden_check_reports_drift() -> None:
+    entry = to_entry({"id": 1, "payload": {"chat_id": "chat_1", "message": "oi"}}, redact=False)
+    entry["expected"]["chat_id"] = "chat_2"
+
+    assert check_golden([entry]) == 1
+
+
+def test_repaired_rows_are_exported_from_the_original_body(capsys: pytest.CaptureFixture) -> None:
+    raw = '{"chat_id":"chat_1","provider_chat_id":"2-a":"b","message":"oi"}'
+    fixed = {"chat_id": "chat_1", "provider_chat_id": "2-ab", "message": "oi"}
+
+    entry = to_entry({"id": 4, "parse_mode": "json_fixed", "payload": fixed, "raw_body": raw}, redact=True)
+    fallback = to_entry({"id": 5, "parse_mode": "json_fixed", "payload": fixed}, redact=True)
+
+    assert entry["shape"] == "json_fixed"
+    assert entry["body"] == raw.replace('"message":"oi"', '"message":"<redacted>"')
+    assert entry["expected"]["parse_mode"] == "json_fixed"
+    assert fallback["shape"] == "json_fixed"
+    assert "event_log_5 has no raw_body" in capsys.readouterr().err
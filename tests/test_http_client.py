@@ -0,0 +1,177 @@
+import asyncio
+from typing import List
+
+import httpx
+import pytest
+
+from app import http_client
+from app.http_client import (
+    CircuitOpenError,
+    ConnectionStats,
+    HttpPoolConfig,
+    RetryPolicy,
+    RetryPolicyConfig,
+    create_async_client,
+    parse_retry_after,
+    request_with_retries,
+    warm_up,
+)
+
+
+def _config(**overrides) -> HttpPoolConfig:
+    values = dict(connect_timeout=1.0, read_timeout=2.0, write_timeout=3.0, pool_timeout=4.0)
+    values.update(overrides)
+    return HttpPoolConfig(**values)
+
+
+def test_client_uses_the_configured_timeouts() -> None:
+    async def run() -> httpx.Timeout:
+        client = create_async_client(_config(), ConnectionStats("chatwoot"))
+        await client.aclose()
+        return client.timeout
+
+    timeout = asyncio.run(run())
+
+    assert (timeout.connect, timeout.read, timeout.write, timeout.pool) == (1.0, 2.0, 3.0, 4.0)
+
+
+def test_http2_falls_back_when_h2_is_missing(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(http_client, "HTTP2_AVAILABLE", False)
+    stats = ConnectionStats("unipile")
+
+    async def run() -> None:
+        client = create_async_client(_config(http2=True), stats)
+        await client.aclose()
+
+    asyncio.run(run())
+
+    assert stats.stats()["http2"] is False
+
+
+def test_request_hook_counts_requests() -> None:
+    stats = ConnectionStats("supabase")
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        assert "trace" in request.extensions
+        return httpx.Response(200)
+
+    async def run() -> None:
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(transport=transport, event_hooks={"request": [stats.on_request]}) as client:
+            await client.get("http://supabase.mock/")
+            await client.get("http://supabase.mock/")
+
+    asyncio.run(run())
+
+    assert stats.stats()["requests"] == 2
+
+
+def test_warm_up_opens_connections_and_tolerates_failures() -> None:
+    seen: List[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.method)
+        if len(seen) == 2:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200)
+
+    async def run() -> None:
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            await warm_up(client, "http://chatwoot.mock/", 3, "chatwoot")
+
+    asyncio.run(run())
+
+    assert seen == ["HEAD", "HEAD", "HEAD"]
+
+
+def _policy(**overrides) -> RetryPolicy:
+    values = dict(base_delay=0.001, max_delay=0.05)
+    values.update(overrides)
+    return RetryPolicy("unipile", RetryPolicyConfig(**values))
+
+
+def _replies(*statuses: int, retry_after: str = ""):
+    calls: List[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.method)
+        status = statuses[min(len(calls), len(statuses)) - 1]
+        headers = {"retry-after": retry_after} if retry_after and status != 200 else {}
+        return httpx.Response(status, headers=headers)
+
+    return calls, httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def _send(client: httpx.AsyncClient, method: str, policy: RetryPolicy, retries: int = 2) -> int:
+    async def run() -> int:
+        async with client:
+            response = await request_with_retries(client, method, "http://unipile.mock/x", retries, policy=policy)
+            return response.status_code
+
+    return asyncio.run(run())
+
+
+def test_retryable_statuses_are_retried_for_idempotent_requests() -> None:
+    calls, client = _replies(502, 200)
+
+    assert _send(client, "GET", _policy()) == 200
+    assert calls == ["GET", "GET"]
+
+
+def test_posts_are_only_retried_when_the_upstream_did_not_process_them() -> None:
+    calls, client = _replies(502, 200)
+    with pytest.raises(httpx.HTTPStatusError):
+        _send(client, "POST", _policy())
+    assert calls == ["POST"]
+
+    calls, client = _replies(503, 200, retry_after="0")
+    assert _send(client, "POST", _policy()) == 200
+    assert calls == ["POST", "POST"]
+
+
+def test_retry_after_beyond_the_max_delay_is_not_waited_for() -> None:
+    calls, client = _replies(429, 200, retry_after="120")
+
+    with pytest.raises(httpx.HTTPStatusError):
+        _send(client, "GET", _policy())
+    assert calls == ["GET"]
+
+
+def test_parse_retry_after_accepts_seconds_and_dates() -> None:
+    assert parse_retry_after(httpx.Response(429, headers={"retry-after": "7"})) == 7.0
+    assert parse_retry_after(httpx.Response(429, headers={"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
+    assert parse_retry_after(httpx.Response(429, headers={"retry-after": "soon"})) is None
+
+
+def test_exhausted_budget_stops_retries() -> None:
+    policy = _policy(budget_max_tokens=1.0, budget_min_per_second=0.0, budget_ratio=0.0)
+    calls, client = _replies(502, 502, 502, 200)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        _send(client, "GET", policy, retries=3)
+    assert calls == ["GET", "GET"]
+    assert policy.stats()["retry_budget_exhausted"] == 1
+
+
+def test_breaker_opens_short_circuits_and_recovers(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [100.0]
+    monkeypatch.setattr(http_client.time, "monotonic", lambda: now[0])
+    policy = _policy(breaker_min_calls=4, breaker_failure_rate=0.5, breaker_cooldown_seconds=10)
+    for failed in (False, True, False, True):
+        policy.before_request()
+        policy.record(failed=failed)
+    assert policy.state == policy.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        policy.before_request()
+
+    now[0] += 11
+    policy.before_request()
+    assert policy.state == policy.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        policy.before_request()
+    policy.record(failed=False)
+
+    assert policy.state == policy.CLOSED
+    assert policy.stats()["short_circuited"] == 2
+    assert policy.stats()["transitions"] == {"closed->open": 1, "open->half_open": 1, "half_open->closed": 1}
@@ -0,0 +1,93 @@
+import asyncio
+import json
+from typing import Any, Dict, List
+
+import pytest
+
+from app import ignored_events
+from app.chatwoot_payload import ChatwootWebhook
+from app.config import settings
+from app.dedupe import MARKER
+from app.event_sink import EventLogSink
+from app.ignored_events import IgnoredEventPolicy
+from tests.helpers import chatwoot_body, upstreams_ok
+
+JSON = {"content-type": "application/json"}
+
+
+def test_policy_decides_how_much_to_log(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(ignored_events.random, "random", lambda: 0.5)
+
+    assert IgnoredEventPolicy("full").record("ignored_event", "conversation_updated", None) == "full"
+    assert IgnoredEventPolicy("summary").record("ignored_event", "conversation_updated", None) == "summary"
+    assert IgnoredEventPolicy("count").record("ignored_event", "conversation_updated", None) is None
+    assert IgnoredEventPolicy("sample", sample_rate=0.6).record("ignored_event", "x", None) == "full"
+    assert IgnoredEventPolicy("sample", sample_rate=0.4).record("ignored_event", "x", None) is None
+
+
+def test_policy_counts_by_decision_event_and_type() -> None:
+    policy = IgnoredEventPolicy("count")
+    policy.record("ignored_event", "message_created", "incoming")
+    policy.record("ignored_event", "message_created", "incoming")
+    policy.record("ignored_marker", "message_created", "outgoing")
+
+    assert policy.stats()["by_type"] == {
+        "ignored_event:message_created:incoming": 2,
+        "ignored_marker:message_created:outgoing": 1,
+    }
+    with pytest.raises(ValueError):
+        IgnoredEventPolicy("verbose")
+
+
+@pytest.mark.parametrize("policy, logged", [("summary", True), ("count", False)])
+def test_ignored_webhooks_are_logged_without_decoding_the_payload(
+    bridge, monkeypatch: pytest.MonkeyPatch, policy: str, logged: bool
+) -> None:
+    monkeypatch.setattr(settings, "ignored_event_policy", policy)
+    events: List[Dict[str, Any]] = []
+    monkeypatch.setattr(EventLogSink, "emit", lambda self, event: events.append(event))
+    decoded: List[bytes] = []
+    payload = ChatwootWebhook.payload
+
+    def recording_payload(self: ChatwootWebhook) -> Dict[str, Any]:
+        decoded.append(self.body)
+        return payload.fget(self)
+
+    monkeypatch.setattr(ChatwootWebhook, "payload", property(recording_payload))
+
+    async def run() -> List[Dict[str, Any]]:
+        async with bridge(upstreams_ok) as client:
+            incoming = await client.post(
+                "/webhook/chatwoot", content=chatwoot_body(1, message_type="incoming"), headers=JSON
+            )
+            marked = await client.post(
+                "/webhook/chatwoot", content=chatwoot_body(2, content=f"{MARKER}oi"), headers=JSON
+            )
+            return [incoming.json(), marked.json()]
+
+    assert asyncio.run(run()) == [{"status": "ignored"}, {"status": "ignored_marker"}]
+    assert decoded == []
+    ignored = [event for event in events if event["decision"].startswith("ignored_")]
+    if logged:
+        assert [event["payload"]["message_id"] for event in ignored] == [1, 2]
+        assert "content" not in json.dumps(ignored[0]["payload"])
+    else:
+        assert ignored == []
+
+
+def test_ignored_webhooks_skip_the_journal_and_the_lanes(bridge, monkeypatch: pytest.MonkeyPatch, tmp_path) -> None:
+    from app.main import app
+
+    monkeypatch.setattr(settings, "inbox_path", str(tmp_path / "inbox.sqlite3"))
+
+    async def run() -> List[Dict[str, Any]]:
+        async with bridge(upstreams_ok) as client:
+            await client.post("/webhook/chatwoot", content=chatwoot_body(1, event="conversation_updated"), headers=JSON)
+            await client.post("/webhook/chatwoot", content=chatwoot_body(2, message_type="incoming"), headers=JSON)
+            await client.post("/webhook/chatwoot", content=chatwoot_body(3, content=f"{MARKER}oi"), headers=JSON)
+            return [app.state.inbox.stats(), app.state.dispatcher.stats()]
+
+    inbox, dispatcher = asyncio.run(run())
+
+    assert inbox["appended"] == 0
+    assert dispatcher["enqueued"] == 0
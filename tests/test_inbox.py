@@ -0,0 +1,71 @@
+import asyncio
+import os
+from typing import List
+
+from app.inbox import InboxEntry, WebhookInbox
+
+
+def _path(tmp_path) -> str:
+    return os.path.join(tmp_path, "inbox.sqlite3")
+
+
+def test_pending_entries_are_replayed_by_the_next_process(tmp_path) -> None:
+    replayed: List[InboxEntry] = []
+
+    async def crashed() -> None:
+        inbox = WebhookInbox(_path(tmp_path), replay=replayed.extend)
+        await inbox.open()
+        done = await inbox.append("chatwoot", b'{"id": 1}', "application/json", "sig")
+        await inbox.append("unipile", b'{"id": 2}', "text/plain", "")
+        inbox.mark_done(done)
+        await inbox.close()
+
+    async def restarted() -> None:
+        inbox = WebhookInbox(_path(tmp_path), replay=replayed.extend)
+        await inbox.open()
+        await inbox.close()
+
+    asyncio.run(crashed())
+    assert replayed == []
+    asyncio.run(restarted())
+
+    assert [(entry.source, entry.body, entry.content_type) for entry in replayed] == [
+        ("unipile", b'{"id": 2}', "text/plain")
+    ]
+
+
+def test_concurrent_appends_share_a_commit(tmp_path) -> None:
+    async def run() -> dict:
+        inbox = WebhookInbox(_path(tmp_path), replay=lambda entries: None, commit_window_ms=20)
+        await inbox.open()
+        await asyncio.gather(*(inbox.append("unipile", b"{}", None, "") for _ in range(20)))
+        stats = inbox.stats()
+        await inbox.close()
+        return stats
+
+    stats = asyncio.run(run())
+
+    assert stats["appended"] == 20
+    assert stats["batches"] <= 2
+
+
+def test_entries_of_a_stalled_process_are_taken_over(tmp_path) -> None:
+    replayed: List[InboxEntry] = []
+
+    async def run() -> None:
+        stalled = WebhookInbox(_path(tmp_path), replay=lambda entries: None, heartbeat_seconds=60)
+        await stalled.open()
+        await stalled.append("unipile", b'{"id": 3}', None, "")
+        # stop heartbeats without closing, as a hung worker would
+        stalled._flusher.cancel()
+
+        live = WebhookInbox(_path(tmp_path), replay=replayed.extend, heartbeat_seconds=0.05)
+        await live.open()
+        assert replayed == []
+        await asyncio.sleep(0.3)
+        await live.close()
+        await stalled.close()
+
+    asyncio.run(run())
+
+    assert [entry.body for entry in replayed] == [b'{"id": 3}']
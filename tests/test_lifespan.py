@@ -0,0 +1,44 @@
+import asyncio
+import gc
+from typing import Any, Dict, List
+
+import pytest
+
+from app.chatwoot import ChatwootClient
+from app.config import settings
+
+
+def test_shutdown_during_warm_up_leaves_no_unretrieved_errors(monkeypatch: pytest.MonkeyPatch) -> None:
+    from app.main import app
+
+    monkeypatch.setattr(settings, "http_warm_connections", 1)
+
+    async def slow_warm_up(self: ChatwootClient, connections: int) -> None:
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(ChatwootClient, "warm_up", slow_warm_up)
+    errors: List[Dict[str, Any]] = []
+
+    async def run() -> None:
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+        async with app.router.lifespan_context(app):
+            await asyncio.sleep(0)
+        gc.collect()
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+
+    assert errors == []
+
+
+def test_spool_skips_dedupe_replay_without_a_store(monkeypatch: pytest.MonkeyPatch, tmp_path) -> None:
+    from app.main import app
+
+    monkeypatch.setattr(settings, "spool_path", str(tmp_path))
+    monkeypatch.setattr(settings, "dedupe_backend", "none")
+
+    async def run() -> List[str]:
+        async with app.router.lifespan_context(app):
+            return sorted(app.state.spool._handlers)
+
+    assert asyncio.run(run()) == ["event_log"]
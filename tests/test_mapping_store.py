@@ -0,0 +1,43 @@
+import asyncio
+import os
+import tempfile
+from typing import Any, Dict, Optional
+
+import pytest
+
+from app.mapping_store import ChatMappingStore, SqliteMappingStore
+
+
+def test_sqlite_store_round_trips_and_replaces_mappings() -> None:
+    mapping = {
+        "chat_id": "chat_1",
+        "attendee_id": "att_1",
+        "contact_id": "10",
+        "conversation_id": "20",
+        "source_id": "src_1",
+        "inbox_id": "1",
+    }
+
+    async def run() -> None:
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, "mappings.sqlite3")
+            store = SqliteMappingStore(path)
+            assert await store.get("chat_1") is None
+            await store.put(mapping)
+            await store.put({**mapping, "conversation_id": "21"})
+            await store.close()
+
+            reopened = SqliteMappingStore(path)
+            assert await reopened.get("chat_1") == {**mapping, "conversation_id": "21"}
+            await reopened.close()
+
+    asyncio.run(run())
+
+
+def test_store_without_put_cannot_be_built() -> None:
+    class ReadOnly(ChatMappingStore):
+        async def get(self, chat_id: str) -> Optional[Dict[str, Any]]:
+            return None
+
+    with pytest.raises(TypeError):
+        ReadOnly()
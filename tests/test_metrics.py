@@ -0,0 +1,55 @@
+import asyncio
+
+import httpx
+
+from app.metrics import PROMETHEUS_CONTENT_TYPE, Counter, Histogram, flatten_stats
+from tests.helpers import chatwoot_body, upstreams_ok
+
+
+def test_counter_renders_escaped_labels() -> None:
+    counter = Counter("bridge_test_total", "Test counter.", ("source", "decision"))
+    counter.inc("chatwoot", 'say "hi"')
+    counter.inc("chatwoot", 'say "hi"', amount=2)
+
+    assert counter.render() == [
+        "# HELP bridge_test_total Test counter.",
+        "# TYPE bridge_test_total counter",
+        'bridge_test_total{source="chatwoot",decision="say \\"hi\\""} 3.0',
+    ]
+
+
+def test_histogram_buckets_are_cumulative() -> None:
+    histogram = Histogram("bridge_test_seconds", "Test histogram.", ("endpoint",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, "unipile")
+
+    assert histogram.render()[2:] == [
+        'bridge_test_seconds_bucket{endpoint="unipile",le="0.1"} 2.0',
+        'bridge_test_seconds_bucket{endpoint="unipile",le="1.0"} 3.0',
+        'bridge_test_seconds_bucket{endpoint="unipile",le="+Inf"} 4.0',
+        'bridge_test_seconds_sum{endpoint="unipile"} 3.65',
+        'bridge_test_seconds_count{endpoint="unipile"} 4.0',
+    ]
+
+
+def test_flatten_stats_keeps_numbers_only() -> None:
+    stats = {"hits": 3, "backend": "memory", "avg": None, "shed": {"ignored": 1, "normal": 2}}
+
+    assert list(flatten_stats(stats)) == [("hits", 3.0), ("shed.ignored", 1.0), ("shed.normal", 2.0)]
+
+
+def test_metrics_endpoint_reports_webhook_outcomes(bridge) -> None:
+    async def run() -> httpx.Response:
+        async with bridge(upstreams_ok) as client:
+            await client.post(
+                "/webhook/chatwoot", content=chatwoot_body(1), headers={"content-type": "application/json"}
+            )
+            return await client.get("/metrics")
+
+    response = asyncio.run(run())
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == PROMETHEUS_CONTENT_TYPE
+    assert 'bridge_events_total{source="chatwoot",decision="sent_to_unipile"}' in response.text
+    assert 'bridge_webhook_duration_seconds_count{endpoint="chatwoot"}' in response.text
+    assert 'bridge_component_stat{component="dispatcher",stat="lanes"}' in response.text
@@ -0,0 +1,88 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from app.mapping_store import ChatMappingStore
+from app.models import ChatResolution
+from app.resolver import ConversationResolver
+
+
+class FakeChatwoot:
+    inbox_id = "1"
+
+    def __init__(self) -> None:
+        self.lookups: List[str] = []
+
+    async def get_or_create_contact(self, name: str, email: str, chat_id: str) -> Dict[str, Any]:
+        self.lookups.append(chat_id)
+        return {"id": 10, "contact_inboxes": []}
+
+    async def get_or_create_conversation(self, contact: Dict[str, Any]) -> Dict[str, Any]:
+        return {"id": 20 + len(self.lookups)}
+
+    def pick_source_id(self, contact: Dict[str, Any]) -> Optional[str]:
+        return "src"
+
+
+class DictMappingStore(ChatMappingStore):
+    def __init__(self) -> None:
+        self.rows: Dict[str, Dict[str, Any]] = {}
+
+    async def get(self, chat_id: str) -> Optional[Dict[str, Any]]:
+        return self.rows.get(chat_id)
+
+    async def put(self, mapping: Dict[str, Any]) -> None:
+        self.rows[mapping["chat_id"]] = dict(mapping)
+
+
+def test_resolutions_are_cached_per_chat() -> None:
+    chatwoot = FakeChatwoot()
+    resolver = ConversationResolver(chatwoot, max_size=10, ttl_seconds=60)
+
+    async def run() -> List[ChatResolution]:
+        return [
+            await resolver.resolve("chat_1", name="Pessoa", email="p@x"),
+            await resolver.resolve("chat_1", name="Pessoa", email="p@x"),
+        ]
+
+    first, second = asyncio.run(run())
+
+    assert first == second == ChatResolution(contact_id="10", conversation_id="21", source_id="src")
+    assert chatwoot.lookups == ["chat_1"]
+    assert resolver.stats()["hits"] == 1
+
+
+def test_refresh_and_invalidate_go_back_to_chatwoot() -> None:
+    chatwoot = FakeChatwoot()
+    resolver = ConversationResolver(chatwoot, max_size=10, ttl_seconds=60)
+
+    async def run() -> List[str]:
+        await resolver.resolve("chat_1", name="Pessoa", email="p@x")
+        refreshed = await resolver.resolve("chat_1", name="Pessoa", email="p@x", refresh=True)
+        resolver.invalidate("chat_1")
+        reloaded = await resolver.resolve("chat_1", name="Pessoa", email="p@x")
+        return [refreshed.conversation_id, reloaded.conversation_id]
+
+    assert asyncio.run(run()) == ["22", "23"]
+    assert resolver.stats()["invalidations"] == 1
+
+
+def test_stored_mappings_survive_a_restart_for_the_same_inbox() -> None:
+    chatwoot = FakeChatwoot()
+    store = DictMappingStore()
+
+    async def run() -> None:
+        await ConversationResolver(chatwoot, max_size=10, ttl_seconds=60, store=store).resolve(
+            "chat_1", name="Pessoa", email="p@x", attendee_id="att_1"
+        )
+        restarted = ConversationResolver(chatwoot, max_size=10, ttl_seconds=60, store=store)
+        assert (await restarted.resolve("chat_1", name="Pessoa", email="p@x")).conversation_id == "21"
+        assert restarted.stats()["store_hits"] == 1
+
+        store.rows["chat_1"]["inbox_id"] = "2"
+        other_inbox = ConversationResolver(chatwoot, max_size=10, ttl_seconds=60, store=store)
+        assert (await other_inbox.resolve("chat_1", name="Pessoa", email="p@x")).conversation_id == "22"
+
+    asyncio.run(run())
+
+    assert chatwoot.lookups == ["chat_1", "chat_1"]
+    assert store.rows["chat_1"]["inbox_id"] == "1"
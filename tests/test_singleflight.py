@@ -0,0 +1,87 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from app.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_execution() -> None:
+    flights = SingleFlight()
+    calls: List[str] = []
+
+    async def lookup() -> str:
+        calls.append("lookup")
+        await asyncio.sleep(0.01)
+        return "contact_10"
+
+    async def run() -> List[str]:
+        return list(await asyncio.gather(*(flights.do("chat_1", lookup) for _ in range(5))))
+
+    assert asyncio.run(run()) == ["contact_10"] * 5
+    assert calls == ["lookup"]
+    assert flights.stats() == {"in_flight": 0, "executions": 1, "coalesced": 4, "abandoned": 0}
+
+
+def test_failures_reach_every_waiter_and_are_not_cached() -> None:
+    flights = SingleFlight()
+    attempts: List[int] = []
+
+    async def lookup() -> str:
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise RuntimeError("chatwoot down")
+        return "contact_10"
+
+    async def run() -> str:
+        results = await asyncio.gather(
+            flights.do("chat_1", lookup), flights.do("chat_1", lookup), return_exceptions=True
+        )
+        assert [str(result) for result in results] == ["chatwoot down", "chatwoot down"]
+        return await flights.do("chat_1", lookup)
+
+    assert asyncio.run(run()) == "contact_10"
+    assert len(attempts) == 2
+
+
+def test_cancelling_one_waiter_keeps_the_shared_call() -> None:
+    flights = SingleFlight()
+
+    async def lookup() -> str:
+        await asyncio.sleep(0.02)
+        return "contact_10"
+
+    async def run() -> str:
+        first = asyncio.create_task(flights.do("chat_1", lookup))
+        second = asyncio.create_task(flights.do("chat_1", lookup))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "contact_10"
+    assert flights.stats()["abandoned"] == 0
+
+
+def test_last_waiter_cancelling_abandons_the_call() -> None:
+    flights = SingleFlight()
+    finished: List[str] = []
+
+    async def lookup() -> str:
+        await asyncio.sleep(0.05)
+        finished.append("lookup")
+        return "contact_10"
+
+    async def run() -> None:
+        waiter = asyncio.create_task(flights.do("chat_1", lookup))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+
+    assert finished == []
+    assert flights.stats() == {"in_flight": 0, "executions": 1, "coalesced": 0, "abandoned": 1}
@@ -0,0 +1,240 @@
+import asyncio
+import gzip
+import json
+import os
+from typing import Any, Dict, List
+
+import httpx
+
+from app.event_sink import EventLogSink
+from app.spool import QUARANTINE_DIR, SEGMENT_SUFFIX, DiskSpool
+
+
+def _rows(count: int, start: int = 0) -> List[Dict[str, Any]]:
+    return [{"decision": "sent_to_unipile", "payload": {"id": index}} for index in range(start, start + count)]
+
+
+def _segments(path: Any) -> List[str]:
+    return sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(path)
+        if os.path.basename(root) != QUARANTINE_DIR
+        for name in names
+        if name.endswith(SEGMENT_SUFFIX)
+    )
+
+
+def _write_segment(path: Any, rows: List[Dict[str, Any]]) -> None:
+    with gzip.open(os.path.join(path, f"{1:020d}{SEGMENT_SUFFIX}"), "wt", encoding="utf-8") as handle:
+        for row in rows:
+            handle.write(json.dumps({"kind": "event_log", "row": row, "spooled_at": 0}) + "\n")
+
+
+async def _settle(spool: DiskSpool) -> None:
+    while spool.stats()["pending_writes"]:
+        await asyncio.sleep(0.01)
+
+
+def test_spooled_rows_are_replayed_in_order_once_the_handler_recovers(tmp_path) -> None:
+    received: List[int] = []
+    healthy = [False]
+
+    async def handler(rows: List[Dict[str, Any]]) -> None:
+        if not healthy[0]:
+            raise RuntimeError("supabase down")
+        received.extend(row["payload"]["id"] for row in rows)
+
+    async def run() -> Dict[str, Any]:
+        spool = DiskSpool(str(tmp_path), drain_rate=0, drain_interval_seconds=0.1, drain_batch_size=2)
+        spool.register("event_log", handler)
+        await spool.open()
+        spool.put("event_log", _rows(3))
+        spool.put("event_log", _rows(2, start=3))
+        await _settle(spool)
+        await asyncio.sleep(0.25)
+        assert received == []
+        healthy[0] = True
+        await asyncio.sleep(0.25)
+        stats = spool.stats()
+        await spool.close()
+        return stats
+
+    stats = asyncio.run(run())
+
+    assert received == [0, 1, 2, 3, 4]
+    assert stats["drained"] == 5
+    assert stats["drain_failures"] >= 1
+    assert stats["segments"] == 0
+    assert _segments(tmp_path) == []
+
+
+def test_partially_drained_segments_keep_the_rest(tmp_path) -> None:
+    received: List[int] = []
+
+    async def handler(rows: List[Dict[str, Any]]) -> None:
+        if received:
+            raise RuntimeError("supabase down again")
+        received.extend(row["payload"]["id"] for row in rows)
+
+    async def run() -> None:
+        spool = DiskSpool(str(tmp_path), drain_rate=0, drain_interval_seconds=0.1, drain_batch_size=2)
+        spool.register("event_log", handler)
+        await spool.open()
+        spool.put("event_log", _rows(5))
+        await _settle(spool)
+        await asyncio.sleep(0.15)
+        await spool.close()
+
+    asyncio.run(run())
+
+    assert received == [0, 1]
+    reopened = DiskSpool(str(tmp_path))
+    reopened._open_sync()
+    _, records = reopened._next_segment_sync()
+    assert [record["row"]["payload"]["id"] for record in records] == [2, 3, 4]
+
+
+def test_cap_drops_the_oldest_segments(tmp_path) -> None:
+    async def run() -> Dict[str, Any]:
+        spool = DiskSpool(str(tmp_path), segment_bytes=1, max_bytes=400, drain_interval_seconds=60)
+        await spool.open()
+        for index in range(10):
+            spool.put("event_log", _rows(1, start=index))
+            await _settle(spool)
+        stats = spool.stats()
+        await spool.close()
+        return stats
+
+    stats = asyncio.run(run())
+
+    assert stats["dropped_segments"] > 0
+    assert stats["bytes"] <= 400
+    remaining = _segments(tmp_path)
+    with gzip.open(remaining[-1], "rt", encoding="utf-8") as handle:
+        assert json.loads(handle.readline())["row"]["payload"]["id"] == 9
+
+
+def test_workers_sharing_a_spool_path_replay_each_row_once(tmp_path) -> None:
+    _write_segment(tmp_path, _rows(4))
+    received: List[int] = []
+
+    async def handler(rows: List[Dict[str, Any]]) -> None:
+        received.extend(row["payload"]["id"] for row in rows)
+
+    async def run() -> None:
+        spools = [DiskSpool(str(tmp_path), drain_rate=0, drain_interval_seconds=0.1) for _ in range(2)]
+        for index, spool in enumerate(spools):
+            spool.register("event_log", handler)
+            await spool.open()
+            spool.put("event_log", _rows(2, start=10 * (index + 1)))
+        for spool in spools:
+            await _settle(spool)
+        await asyncio.sleep(0.35)
+        for spool in spools:
+            await spool.close()
+
+    asyncio.run(run())
+
+    assert sorted(received) == [0, 1, 2, 3, 10, 11, 20, 21]
+    assert _segments(tmp_path) == []
+
+
+def test_segments_of_a_stopped_worker_are_adopted(tmp_path) -> None:
+    received: List[int] = []
+
+    async def failing(rows: List[Dict[str, Any]]) -> None:
+        raise RuntimeError("supabase down")
+
+    async def handler(rows: List[Dict[str, Any]]) -> None:
+        received.extend(row["payload"]["id"] for row in rows)
+
+    async def run() -> Dict[str, Any]:
+        stopped = DiskSpool(str(tmp_path), drain_interval_seconds=60)
+        stopped.register("event_log", failing)
+        await stopped.open()
+        live = DiskSpool(str(tmp_path), drain_rate=0, drain_interval_seconds=0.1)
+        live.register("event_log", handler)
+        await live.open()
+        stopped.put("event_log", _rows(3))
+        await _settle(stopped)
+        await asyncio.sleep(0.25)
+        assert received == []
+        await stopped.close()
+        await asyncio.sleep(0.25)
+        stats = live.stats()
+        await live.close()
+        return stats
+
+    stats = asyncio.run(run())
+
+    assert received == [0, 1, 2]
+    assert stats["adopted_segments"] == 1
+    assert os.listdir(tmp_path) == []
+
+
+def test_permanent_errors_quarantine_the_chunk_and_keep_draining(tmp_path) -> None:
+    received: List[int] = []
+
+    async def handler(rows: List[Dict[str, Any]]) -> None:
+        if rows[0]["payload"]["id"] == 0:
+            request = httpx.Request("POST", "http://supabase.mock/rest/v1/event_logs")
+            response = httpx.Response(400, request=request)
+            raise httpx.HTTPStatusError("bad request", request=request, response=response)
+        received.extend(row["payload"]["id"] for row in rows)
+
+    async def run() -> Dict[str, Any]:
+        spool = DiskSpool(str(tmp_path), drain_rate=0, drain_interval_seconds=0.1, drain_batch_size=2)
+        spool.register("event_log", handler)
+        await spool.open()
+        spool.put("event_log", _rows(5))
+        await _settle(spool)
+        await asyncio.sleep(0.25)
+        stats = spool.stats()
+        await spool.close()
+        return stats
+
+    stats = asyncio.run(run())
+
+    assert received == [2, 3, 4]
+    assert stats["quarantined"] == 2
+    assert stats["drain_failures"] == 0
+    (quarantined,) = os.listdir(tmp_path / QUARANTINE_DIR)
+    with gzip.open(tmp_path / QUARANTINE_DIR / quarantined, "rt", encoding="utf-8") as handle:
+        assert [json.loads(line)["row"]["payload"]["id"] for line in handle] == [0, 1]
+
+
+def test_truncated_segment_is_recovered_up_to_the_damage(tmp_path) -> None:
+    _write_segment(tmp_path, _rows(200))
+    segment = os.path.join(tmp_path, f"{1:020d}{SEGMENT_SUFFIX}")
+    with open(segment, "rb+") as handle:
+        handle.truncate(os.path.getsize(segment) - 20)
+
+    spool = DiskSpool(str(tmp_path))
+    spool._open_sync()
+    _, records = spool._next_segment_sync()
+
+    assert 0 < len(records) < 200
+    assert [record["row"]["payload"]["id"] for record in records] == list(range(len(records)))
+    assert spool.stats()["corrupt_segments"] == 1
+
+
+class FailingSupabase:
+    async def log_events(self, events: List[Dict[str, Any]]) -> None:
+        raise RuntimeError("supabase down")
+
+
+def test_failed_event_log_batches_are_spooled(tmp_path) -> None:
+    async def run() -> Dict[str, Any]:
+        spool = DiskSpool(str(tmp_path), drain_interval_seconds=60)
+        await spool.open()
+        sink = EventLogSink(FailingSupabase(), batch_size=10, flush_interval_ms=1000, max_buffer=100, spool=spool)
+        for row in _rows(3):
+            sink.emit(row)
+        await sink.stop()
+        await _settle(spool)
+        stats = spool.stats()
+        await spool.close()
+        assert sink.stats()["spooled"] == 3
+        return stats
+
+    assert asyncio.run(run())["spooled"] == 3
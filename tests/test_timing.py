@@ -0,0 +1,47 @@
+import asyncio
+from typing import Any, Dict, List
+
+from app.event_sink import EventLogSink
+from app.timing import StageTimer, current_timer, timed
+from tests.helpers import chatwoot_body, upstreams_ok
+
+
+def test_stages_accumulate_and_total_is_reported() -> None:
+    timer = StageTimer()
+    token = current_timer.set(timer)
+    try:
+        with timed("dedupe_check"):
+            pass
+        with timed("dedupe_check"):
+            pass
+        timer.since_mark("queue_wait")
+    finally:
+        current_timer.reset(token)
+
+    timings = timer.as_dict()
+
+    assert set(timings) == {"dedupe_check", "queue_wait", "total"}
+    assert timings["total"] >= timings["dedupe_check"] >= 0
+
+
+def test_timed_is_a_no_op_without_a_timer() -> None:
+    with timed("unipile_send"):
+        pass
+
+    assert current_timer.get() is None
+
+
+def test_webhook_events_carry_their_stage_timings(bridge, monkeypatch) -> None:
+    events: List[Dict[str, Any]] = []
+    monkeypatch.setattr(EventLogSink, "emit", lambda self, event: events.append(event))
+
+    async def run() -> None:
+        async with bridge(upstreams_ok) as client:
+            await client.post(
+                "/webhook/chatwoot", content=chatwoot_body(1), headers={"content-type": "application/json"}
+            )
+
+    asyncio.run(run())
+
+    sent = [event for event in events if event["decision"] == "sent_to_unipile"]
+    assert sent and {"decode", "unipile_send", "total"} <= set(sent[0]["timings"])
@@ -0,0 +1,104 @@
+import asyncio
+import datetime as dt
+import os
+from typing import Any, Dict, List
+
+import pytest
+
+from app import main
+from app.config import settings
+from app.inbox import WebhookInbox
+from app.models import ChatResolution
+from tests.helpers import ProcessedWebhooks, unipile_body
+
+
+@pytest.fixture
+def created(fake_chatwoot: List[Dict[str, Any]], monkeypatch: pytest.MonkeyPatch, tmp_path) -> List[str]:
+    monkeypatch.setattr(settings, "inbox_path", os.path.join(tmp_path, "inbox.sqlite3"))
+    return fake_chatwoot
+
+
+def test_replay_after_crash_past_delivery_does_not_create_again(
+    bridge, created: List[str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    supabase = ProcessedWebhooks()
+
+    async def crash_before_done() -> None:
+        with monkeypatch.context() as crash:
+            # the worker dies before the inbox entry is committed as done
+            crash.setattr(WebhookInbox, "mark_done", lambda self, entry_id: None)
+            async with bridge(supabase.handle) as client:
+                response = await client.post(
+                    "/webhook/unipile", content=unipile_body("msg_1"), headers={"content-type": "application/json"}
+                )
+                assert response.json()["status"] == "created_incoming"
+
+    async def restart() -> None:
+        async with bridge(supabase.handle):
+            pass
+        assert main.app.state.inbox is not None
+
+    asyncio.run(crash_before_done())
+    assert supabase.rows["unipile:msg_1"]["delivered_at"]
+    asyncio.run(restart())
+
+    assert [message["content"] for message in created] == ["Olá"]
+    assert main.app.state.idempotency.stats()["suppressed_remote"] == 1
+
+
+def test_replay_after_crash_before_delivery_takes_over_the_claim(bridge, created: List[str]) -> None:
+    supabase = ProcessedWebhooks()
+    expires_at = dt.datetime.now(tz=dt.timezone.utc) + dt.timedelta(hours=1)
+    supabase.rows["unipile:msg_2"] = {
+        "webhook_key": "unipile:msg_2",
+        "source": "unipile",
+        "expires_at": expires_at.isoformat(),
+        "delivered_at": None,
+    }
+
+    async def crashed_worker() -> None:
+        inbox = WebhookInbox(settings.inbox_path, replay=lambda entries: None)
+        await inbox.open()
+        await inbox.append("unipile", unipile_body("msg_2"), "application/json", "")
+        await inbox.close()
+
+    async def restart() -> None:
+        async with bridge(supabase.handle):
+            pass
+
+    asyncio.run(crashed_worker())
+    asyncio.run(restart())
+
+    assert [message["content"] for message in created] == ["Olá"]
+    assert supabase.rows["unipile:msg_2"]["delivered_at"]
+    assert main.app.state.idempotency.stats()["reclaimed"] == 1
+
+
+def test_redelivery_is_suppressed_and_failed_delivery_is_released(bridge, monkeypatch) -> None:
+    supabase = ProcessedWebhooks()
+    attempts: List[str] = []
+
+    async def resolve(parsed):
+        attempts.append(parsed.message_id)
+        if len(attempts) == 1:
+            raise RuntimeError("chatwoot down")
+        return ChatResolution(contact_id="10", conversation_id="20", source_id="src")
+
+    async def create(resolution, chat_id, name, email, message_type, content):
+        return {"id": 1}
+
+    monkeypatch.setattr(main, "_resolve_unipile_chat", resolve)
+    monkeypatch.setattr(main, "_create_chatwoot_message", create)
+
+    async def run() -> List[str]:
+        statuses = []
+        async with bridge(supabase.handle) as client:
+            for _ in range(3):
+                response = await client.post(
+                    "/webhook/unipile", content=unipile_body("msg_3"), headers={"content-type": "application/json"}
+                )
+                statuses.append(response.json()["status"])
+        return statuses
+
+    assert asyncio.run(run()) == ["error", "created_incoming", "duplicate"]
+    assert supabase.rows["unipile:msg_3"]["delivered_at"]
@@ -0,0 +1,122 @@
+import json
+import time
+from typing import Optional
+
+import pytest
+
+from app import unipile
+from app.metrics import PARSE_PATHS
+from app.unipile import parse_unipile_webhook
+from bench.parser_bench import check_golden, load_corpus
+
+
+def _occupation_body(fragments: int) -> bytes:
+    strays = "".join(f',"frag{index:06d}"' for index in range(fragments))
+    return (
+        '{"event":"message_received","chat_id":"chat_1","message":"oi","is_sender":false,'
+        '"attendees":[{"attendee_id":"att_1","attendee_name":"Pessoa","occupation":"X":""' + strays + "}]}"
+    ).encode("utf-8")
+
+
+def test_corpus_matches_golden_outputs() -> None:
+    assert check_golden(load_corpus()) == 0
+
+
+def test_corpus_matches_golden_outputs_with_the_stdlib_decoder(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(unipile, "_loads_bytes", json.loads)
+
+    assert check_golden(load_corpus()) == 0
+
+
+_CLEAN = '{"chat_id":"chat_1","message":"oi","is_sender":false}'
+
+
+@pytest.mark.parametrize(
+    "body, content_type, path",
+    [
+        (_CLEAN, "application/json; charset=utf-8", "json_fast"),
+        (_CLEAN, "application/vnd.unipile+json", "json_fast"),
+        (_CLEAN, "text/plain", "json"),
+        (json.dumps(_CLEAN), "application/json", "unwrapped"),
+        ("payload=" + _CLEAN, "application/x-www-form-urlencoded", "form"),
+        ('{"chat_id":"chat_1","message":"oi":"x","is_sender":false}', "application/json", "lenient"),
+        ("chat_id chat_1", None, "fallback"),
+    ],
+)
+def test_bodies_are_routed_by_content_type(body: str, content_type: Optional[str], path: str) -> None:
+    before = PARSE_PATHS._values.get((path,), 0.0)
+
+    parsed = parse_unipile_webhook(body.encode("utf-8"), content_type)
+
+    assert PARSE_PATHS._values.get((path,), 0.0) == before + 1
+    if path != "fallback":
+        assert parsed.chat_id == "chat_1"
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        '{"event":"message_received","chat_id":"chat_1","message":"oi","is_sender":false,"n":01}',
+        '{"event":"message_received","chat_id":"chat_1","timestamp":"2024-05-02T12:01":00.000Z",'
+        '"message":"oi","is_sender":false}',
+    ],
+)
+@pytest.mark.parametrize("content_type", ["application/json", "text/plain", None])
+def test_invalid_literals_fall_back_to_regex(body: str, content_type: str) -> None:
+    parsed = parse_unipile_webhook(body.encode("utf-8"), content_type)
+
+    assert parsed.parse_mode == "regex_fallback"
+    assert parsed.chat_id == "chat_1"
+    assert parsed.message == "oi"
+    assert parsed.is_sender is False
+
+
+def test_broken_provider_chat_id_joins_every_part() -> None:
+    body = b'{"chat_id":"chat_1","provider_chat_id":"2-a":"b":"c","message":"oi"}'
+
+    parsed = parse_unipile_webhook(body, "application/json")
+
+    assert parsed.parse_mode == "json_fixed"
+    assert parsed.raw["provider_chat_id"] == "2-abc"
+    assert parsed.raw_body == body.decode("utf-8")
+
+
+def test_only_repaired_bodies_keep_the_original() -> None:
+    clean = parse_unipile_webhook(b'{"chat_id":"chat_1","message":"oi"}', "text/plain")
+    broken = parse_unipile_webhook(b'{"chat_id":"chat_1","message":"oi":"x"' + b" " * 2000, "text/plain")
+
+    assert clean.parse_mode == "json"
+    assert clean.raw_body is None
+    assert broken.parse_mode == "regex_fallback"
+    assert broken.raw_body == '{"chat_id":"chat_1","message":"oi":"x"'
+
+
+def test_stray_occupation_fragments_are_joined_in_order() -> None:
+    parsed = parse_unipile_webhook(_occupation_body(3), "application/json")
+
+    assert parsed.parse_mode == "json_fixed"
+    assert parsed.raw["attendees"][0]["occupation"] == "Xfrag000000frag000001frag000002"
+
+
+def test_redefined_key_discards_earlier_fragments() -> None:
+    body = b'{"chat_id":"chat_1","occupation":"X":"","Y","occupation":"Z","message":"oi"}'
+
+    parsed = parse_unipile_webhook(body, "application/json")
+
+    assert parsed.raw["occupation"] == "Z"
+
+
+def test_joining_fragments_is_linear_in_body_size() -> None:
+    def elapsed(fragments: int) -> float:
+        body = _occupation_body(fragments)
+        best = float("inf")
+        for _ in range(3):
+            started = time.perf_counter()
+            parse_unipile_webhook(body, "application/json")
+            best = min(best, time.perf_counter() - started)
+        return best
+
+    small, large = elapsed(5000), elapsed(40000)
+
+    # 8x the fragments: linear stays near 8x, the old quadratic join was ~64x
+    assert large / small < 24
@@ -0,0 +1,175 @@
+import asyncio
+from typing import Any, Dict, List
+
+import httpx
+import pytest
+
+from app import main
+from app.config import settings
+from app.dedupe import DedupeGuard
+from tests.helpers import chatwoot_body, unipile_body, upstreams_ok
+
+JSON = {"content-type": "application/json"}
+
+
+def test_sync_mode_answers_after_delivery(bridge, fake_chatwoot: List[Dict[str, Any]]) -> None:
+    async def run() -> httpx.Response:
+        async with bridge(upstreams_ok) as client:
+            return await client.post("/webhook/unipile", content=unipile_body("msg_1"), headers=JSON)
+
+    response = asyncio.run(run())
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "created_incoming"}
+    assert fake_chatwoot[0]["message_type"] == "incoming"
+
+
+def test_async_mode_acknowledges_before_processing(
+    bridge, fake_chatwoot: List[Dict[str, Any]], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "unipile_async_processing", True)
+    create = main._create_chatwoot_message
+
+    async def slow_create(*args: Any, **kwargs: Any) -> Dict[str, Any]:
+        await asyncio.sleep(0.05)
+        return await create(*args, **kwargs)
+
+    monkeypatch.setattr(main, "_create_chatwoot_message", slow_create)
+
+    async def run() -> None:
+        async with bridge(upstreams_ok) as client:
+            response = await client.post("/webhook/unipile", content=unipile_body("msg_1"), headers=JSON)
+            assert response.status_code == 202
+            assert response.json() == {"status": "accepted"}
+            assert fake_chatwoot == []
+        # shutting down drains the lanes
+
+    asyncio.run(run())
+
+    assert [message["content"] for message in fake_chatwoot] == ["Olá"]
+
+
+def test_async_mode_rejects_when_the_lane_is_full(
+    bridge, fake_chatwoot: List[Dict[str, Any]], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "unipile_async_processing", True)
+    monkeypatch.setattr(settings, "dispatch_lanes", 1)
+    monkeypatch.setattr(settings, "lane_queue_size", 1)
+    create = main._create_chatwoot_message
+
+    async def run() -> List[int]:
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def blocked_create(*args: Any, **kwargs: Any) -> Dict[str, Any]:
+            started.set()
+            await release.wait()
+            return await create(*args, **kwargs)
+
+        monkeypatch.setattr(main, "_create_chatwoot_message", blocked_create)
+        statuses = []
+        async with bridge(upstreams_ok) as client:
+            for index in range(3):
+                response = await client.post(
+                    "/webhook/unipile", content=unipile_body(f"msg_{index}"), headers=JSON
+                )
+                statuses.append(response.status_code)
+                if index == 0:
+                    await started.wait()
+            assert main.app.state.dispatcher.stats()["rejected"] == 1
+            release.set()
+        return statuses
+
+    assert asyncio.run(run()) == [202, 202, 503]
+    assert len(fake_chatwoot) == 2
+
+
+def test_echo_of_a_sent_message_is_blocked_by_message_id(bridge, fake_chatwoot: List[Dict[str, Any]]) -> None:
+    async def run() -> httpx.Response:
+        async with bridge(upstreams_ok) as client:
+            sent = await client.post("/webhook/chatwoot", content=chatwoot_body(1), headers=JSON)
+            assert sent.json()["status"] == "sent"
+            # the provider may rewrite the text, so only the message id can match
+            echo = unipile_body("sent_1", is_sender=True, message="texto reescrito")
+            response = await client.post("/webhook/unipile", content=echo, headers=JSON)
+            assert main.app.state.dedupe.stats()["message_id_hits"] == 1
+            return response
+
+    response = asyncio.run(run())
+
+    assert response.json() == {"status": "blocked_echo"}
+    assert fake_chatwoot == []
+
+
+def test_speculative_resolution_is_cancelled_for_echoes(
+    bridge, fake_chatwoot: List[Dict[str, Any]], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "unipile_speculative_resolution", True)
+    resolve = main._resolve_unipile_chat
+    resolved: List[str] = []
+
+    async def slow_resolve(parsed: Any) -> Any:
+        await asyncio.sleep(0.05)
+        resolved.append(parsed.message_id)
+        return await resolve(parsed)
+
+    monkeypatch.setattr(main, "_resolve_unipile_chat", slow_resolve)
+
+    async def run() -> List[Dict[str, Any]]:
+        async with bridge(upstreams_ok) as client:
+            await client.post("/webhook/chatwoot", content=chatwoot_body(1, content="Até amanhã"), headers=JSON)
+            echo = unipile_body("msg_echo", is_sender=True, message="Até  amanhã")
+            own = unipile_body("msg_own", is_sender=True, message="Enviada pelo LinkedIn")
+            responses = [
+                await client.post("/webhook/unipile", content=echo, headers=JSON),
+                await client.post("/webhook/unipile", content=own, headers=JSON),
+            ]
+            await asyncio.sleep(0.1)
+            return [response.json() for response in responses]
+
+    assert asyncio.run(run()) == [{"status": "blocked_echo"}, {"status": "created_outgoing"}]
+    assert resolved == ["msg_own"]
+    assert [message["message_type"] for message in fake_chatwoot] == ["outgoing"]
+
+
+def test_numeric_chat_ids_are_accepted_on_both_webhooks(bridge, fake_chatwoot: List[Dict[str, Any]]) -> None:
+    async def run() -> List[Dict[str, Any]]:
+        async with bridge(upstreams_ok) as client:
+            chatwoot = await client.post("/webhook/chatwoot", content=chatwoot_body(1, chat_id=12345), headers=JSON)
+            unipile = await client.post(
+                "/webhook/unipile", content=unipile_body("msg_1", chat_id=12345), headers=JSON
+            )
+            return [chatwoot.json(), unipile.json()]
+
+    assert asyncio.run(run()) == [{"status": "sent"}, {"status": "created_incoming"}]
+
+
+def test_redelivered_sender_webhook_is_rejected_before_speculating(
+    bridge, fake_chatwoot: List[Dict[str, Any]], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "unipile_speculative_resolution", True)
+    resolve = main._resolve_unipile_chat
+    resolved: List[str] = []
+
+    async def recording_resolve(parsed: Any) -> Any:
+        resolved.append(parsed.message_id)
+        return await resolve(parsed)
+
+    monkeypatch.setattr(main, "_resolve_unipile_chat", recording_resolve)
+    seen = DedupeGuard.seen
+
+    async def remote_seen(self: DedupeGuard, dedupe_key: str) -> bool:
+        await asyncio.sleep(0.01)
+        return await seen(self, dedupe_key)
+
+    monkeypatch.setattr(DedupeGuard, "seen", remote_seen)
+
+    async def run() -> List[Dict[str, Any]]:
+        body = unipile_body("msg_own", is_sender=True, message="Enviada pelo LinkedIn")
+        async with bridge(upstreams_ok) as client:
+            first = await client.post("/webhook/unipile", content=body, headers=JSON)
+            again = await client.post("/webhook/unipile", content=body, headers=JSON)
+            return [first.json(), again.json()]
+
+    assert asyncio.run(run()) == [{"status": "created_outgoing"}, {"status": "duplicate"}]
+    assert resolved == ["msg_own"]